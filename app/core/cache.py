@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class TTLCache:
+    """
+    线程安全的 LRU + TTL 缓存，带请求合并 (single-flight) 与过期后台刷新。
+
+    - 条目数超过 maxsize 时淘汰最久未使用的条目。
+    - 条目在 ttl 秒内为新鲜数据，直接返回。
+    - 过期后 stale_ttl 秒内仍直接返回旧值，同时在后台刷新 (stale-while-revalidate)。
+    - 同一个键同时发生多次未命中时，只有一个线程调用 loader，其余线程等待其结果。
+    - loader 抛出异常或返回 None 时不写入缓存。
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60, stale_ttl: float = 0,
+                 name: str = "cache", clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+        self._clock = clock
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0,
+                       "evictions": 0, "refreshes": 0, "load_errors": 0}
+
+    def get_or_load(self, key, loader):
+        """
+        返回 key 对应的值，缺失或过期时调用 loader() 加载。
+
+        Args:
+            key: 可哈希的缓存键。
+            loader: 无参函数，返回要缓存的值。
+
+        Returns:
+            缓存值或 loader 的返回值；loader 抛出的异常会传递给所有等待中的调用方。
+        """
+        with self._lock:
+            now = self._clock()
+            entry = self._data.get(key)
+            if entry is not None and now < entry.fresh_until:
+                self._data.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry.value
+
+            if entry is not None and now < entry.stale_until:
+                self._data.move_to_end(key)
+                self._stats["stale_hits"] += 1
+                if key not in self._inflight:
+                    future = self._inflight[key] = Future()
+                    self._stats["refreshes"] += 1
+                    threading.Thread(target=self._load, args=(key, loader, future),
+                                     name=f"{self.name}-refresh", daemon=True).start()
+                return entry.value
+
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._inflight[key] = Future()
+                self._stats["misses"] += 1
+                is_loader = True
+            else:
+                self._stats["coalesced"] += 1
+                is_loader = False
+
+        if is_loader:
+            self._load(key, loader, future)
+        return future.result()
+
+    def _load(self, key, loader, future: Future):
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._stats["load_errors"] += 1
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            if value is not None:
+                now = self._clock()
+                fresh_until = now + self.ttl
+                self._data[key] = _Entry(value, fresh_until, fresh_until + self.stale_ttl)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self._stats["evictions"] += 1
+            self._inflight.pop(key, None)
+        future.set_result(value)
+
+    def invalidate(self, key=None):
+        """删除一个键；不传参数时清空整个缓存。"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        """返回命中/未命中/淘汰等计数器的快照。"""
+        with self._lock:
+            return dict(self._stats, size=len(self._data), maxsize=self.maxsize)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
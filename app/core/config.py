@@ -10,6 +10,18 @@ MAIL_FROM = os.getenv("MAIL_FROM", "your-email@example.com")
 
 # 推送目标邮箱
 MAIL_TO = os.getenv("MAIL_TO", "recipient@example.com").split(",")
+# 是否在连接后执行 STARTTLS
+MAIL_USE_TLS = os.getenv("MAIL_USE_TLS", "true").lower() in ("1", "true", "yes")
+
+# SMTP 连接池配置
+# 最多同时保持的已登录连接数
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))
+# 连接、命令的超时时间（秒）
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 30))
+# 空闲超过该时长（秒）的连接直接关闭重建，应小于邮件服务器的空闲断开时间
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", 60))
+# 空闲超过该时长（秒）的连接在复用前先发送 NOOP 探测是否存活
+SMTP_NOOP_AFTER = float(os.getenv("SMTP_NOOP_AFTER", 10))
 
 # X (Twitter) 登录凭据
 # 警告：请务必通过环境变量提供这些值！
@@ -26,3 +38,119 @@ FMP_API_KEY = os.getenv("FMP_API_KEY")
 # 警告：请务必通过环境变量提供这些值！
 TRADINGVIEW_USERNAME = os.getenv("TRADINGVIEW_USERNAME")
 TRADINGVIEW_PASSWORD = os.getenv("TRADINGVIEW_PASSWORD")
+
+# 浏览器池配置
+# 常驻浏览器上下文在此时长（秒）内只做 Cookie 过期检查，超过后才访问页面做完整登录验证
+BROWSER_SESSION_TTL = int(os.getenv("BROWSER_SESSION_TTL", 6 * 3600))
+# X 趋势提取模式: bulk (DOM 单次提取), locator (逐个元素提取), network (拦截接口 JSON)
+X_SCRAPE_MODE = os.getenv("X_SCRAPE_MODE", "bulk")
+
+# SQLite 存储配置
+# 数据库连接地址
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./hotspot.db")
+# 数据库被写事务锁住时，其他连接最多等待的毫秒数（超过后才报 "database is locked"）
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))
+# 同步级别：WAL 模式下 NORMAL 只在检查点时 fsync，断电最多丢失最近的事务，不会损坏数据库
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+# 每个连接的页缓存大小；负数表示 KiB（默认 64 MiB）
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64000))
+# 内存映射读取的最大字节数（默认 256 MiB），0 表示关闭
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+
+# 热度时间序列配置
+# 原始抓取点保留时长（秒），更早的点汇总为每小时一个点
+TREND_RAW_RETENTION = int(os.getenv("TREND_RAW_RETENTION", 2 * 86400))
+# 小时汇总点保留时长（秒），更早的点汇总为每天一个点
+TREND_HOURLY_RETENTION = int(os.getenv("TREND_HOURLY_RETENTION", 30 * 86400))
+# 日汇总点保留时长（秒），更早的数据被删除
+TREND_DAILY_RETENTION = int(os.getenv("TREND_DAILY_RETENTION", 365 * 86400))
+# 热度速度、加速度的衰减半衰期（秒）：越短越偏重最近一次抓取的变化
+TREND_VELOCITY_HALF_LIFE = float(os.getenv("TREND_VELOCITY_HALF_LIFE", 3600))
+# 超过该时长（秒）未再出现在抓取结果中的条目退出 "上升最快" 排行
+TREND_RANK_MAX_AGE = int(os.getenv("TREND_RANK_MAX_AGE", 3 * 3600))
+# "上升最快" 排行保留的条目数
+TREND_RANK_TOP_K = int(os.getenv("TREND_RANK_TOP_K", 20))
+
+# 任务调度配置
+# 阻塞型定时任务（行情、邮件）共享的线程池大小
+JOB_EXECUTOR_WORKERS = int(os.getenv("JOB_EXECUTOR_WORKERS", 4))
+# 每次触发时间的随机抖动（秒），避免多个任务在同一时刻集中触发
+JOB_JITTER_SECONDS = int(os.getenv("JOB_JITTER_SECONDS", 5))
+
+# 多 worker 选主配置
+# 锁文件与数据库放在一起；只有持有该锁的进程会运行定时任务
+LEADER_LOCK_PATH = os.getenv("LEADER_LOCK_PATH", "./hotspot.db.leader")
+# 非 leader 进程重试抢锁的间隔（秒），即 leader 退出后的最长故障切换时间
+LEADER_LEASE_SECONDS = float(os.getenv("LEADER_LEASE_SECONDS", 10))
+
+# 行情抓取并发配置
+# 市场摘要并发抓取历史K线的线程数
+MARKET_FETCH_WORKERS = int(os.getenv("MARKET_FETCH_WORKERS", 8))
+# 同一时刻对 TradingView 发出的最大并发请求数
+TRADINGVIEW_MAX_CONCURRENCY = int(os.getenv("TRADINGVIEW_MAX_CONCURRENCY", 4))
+# 单个标的请求的超时时间（秒）
+MARKET_FETCH_TIMEOUT = float(os.getenv("MARKET_FETCH_TIMEOUT", 10))
+# 市场摘要抓取阶段的总截止时间（秒），超时未返回的标的将被跳过
+MARKET_SUMMARY_DEADLINE = float(os.getenv("MARKET_SUMMARY_DEADLINE", 20))
+# 市场快照的新鲜期（秒）：读取到更旧的快照时立即返回旧数据，同时在后台刷新（同一时刻最多一个刷新）
+MARKET_SNAPSHOT_MAX_AGE = float(os.getenv("MARKET_SNAPSHOT_MAX_AGE", 300))
+# 摘要邮件可接受的最大快照年龄（秒）：刷新失败导致快照更旧时跳过本次邮件，不发送过期行情
+MARKET_SUMMARY_MAX_STALENESS = float(os.getenv("MARKET_SUMMARY_MAX_STALENESS", 1800))
+
+# TradingView 缓存配置
+# 最多缓存的条目数（按最近使用淘汰）
+TV_CACHE_MAXSIZE = int(os.getenv("TV_CACHE_MAXSIZE", 512))
+# 技术分析结果的新鲜期（秒）
+TV_CACHE_TTL = float(os.getenv("TV_CACHE_TTL", 60))
+# 过期后仍可返回旧值并在后台刷新的时长（秒）
+TV_CACHE_STALE_TTL = float(os.getenv("TV_CACHE_STALE_TTL", 300))
+
+# 本地K线存储配置
+# 首次回溯的K线数量（足够计算 SMA_200 等长周期指标）
+BAR_STORE_LOOKBACK = int(os.getenv("BAR_STORE_LOOKBACK", 300))
+# 同一标的两次增量同步之间的最小间隔（秒）
+BAR_SYNC_INTERVAL = float(os.getenv("BAR_SYNC_INTERVAL", 300))
+
+# 增量指标引擎的状态文件，重启后从此恢复各标的的指标运行状态
+INDICATOR_STATE_PATH = os.getenv("INDICATOR_STATE_PATH", "./indicator_state.json")
+# 市场摘要计算指标时使用的进程数，标的较多时可调大以使用多核；1 表示在当前进程内计算
+INDICATOR_PROCESSES = int(os.getenv("INDICATOR_PROCESSES", 1))
+
+# 监控与预警配置文件；文件变化后自动重新加载，校验失败时继续使用上一次的有效配置
+MONITOR_CONFIG_PATH = os.getenv("MONITOR_CONFIG_PATH", "monitor_config.yaml")
+
+# 预警状态配置
+# 规则触发后进入静默，比较值回到阈值另一侧超过该比例（相对阈值的百分比）后才重新启用；规则可用 hysteresis 字段指定绝对值
+ALERT_HYSTERESIS_PERCENT = float(os.getenv("ALERT_HYSTERESIS_PERCENT", 1.0))
+# 已重新启用或已从配置中删除的规则状态，超过该时长（秒）未更新后被清理
+ALERT_STATE_TTL = int(os.getenv("ALERT_STATE_TTL", 7 * 86400))
+
+# 预警报价来源: "poll" 为每分钟批量轮询；"stream" 为连接 QUOTE_STREAM_URL 的 WebSocket 推送源，
+# 断线或长时间无报价期间自动退回轮询；未设置 QUOTE_STREAM_URL 时只使用轮询
+QUOTE_SOURCE = os.getenv("QUOTE_SOURCE", "poll")
+QUOTE_STREAM_URL = os.getenv("QUOTE_STREAM_URL")
+# 推送源断线重连的初始与最大退避时间（秒）
+QUOTE_STREAM_RECONNECT_MIN = float(os.getenv("QUOTE_STREAM_RECONNECT_MIN", 1))
+QUOTE_STREAM_RECONNECT_MAX = float(os.getenv("QUOTE_STREAM_RECONNECT_MAX", 30))
+# 推送源连接后超过该时间（秒）没有收到任何报价即视为失效，轮询任务恢复兜底
+QUOTE_STREAM_STALE_AFTER = float(os.getenv("QUOTE_STREAM_STALE_AFTER", 180))
+
+# 通知发件箱配置
+# 投递线程在没有新消息入队时的轮询间隔（秒）
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 5))
+# 每次从发件箱取出的最大消息数
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 20))
+# 投递失败后的重试退避：首次等待 OUTBOX_RETRY_BASE 秒，之后每次翻倍，最长 OUTBOX_RETRY_MAX 秒
+OUTBOX_RETRY_BASE = float(os.getenv("OUTBOX_RETRY_BASE", 30))
+OUTBOX_RETRY_MAX = float(os.getenv("OUTBOX_RETRY_MAX", 3600))
+# 超过该尝试次数仍失败的消息进入死信状态，不再投递
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+# 已投递消息的保留时长（秒）
+OUTBOX_RETENTION = int(os.getenv("OUTBOX_RETENTION", 7 * 86400))
+
+# 预警合并与限流配置
+# 在该窗口（秒）内触发的普通预警合并为一封汇总邮件；0 表示不合并，逐条发送
+ALERT_COALESCE_WINDOW = float(os.getenv("ALERT_COALESCE_WINDOW", 60))
+# 每个收件人每小时最多收到的邮件数，以及允许的短时突发数；超出的邮件在发件箱中顺延，紧急预警不受限制
+MAIL_RATE_PER_HOUR = float(os.getenv("MAIL_RATE_PER_HOUR", 20))
+MAIL_RATE_BURST = float(os.getenv("MAIL_RATE_BURST", 5))
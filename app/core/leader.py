@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows 等不支持 fcntl 的平台
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElector:
+    """
+    基于 fcntl 文件锁的单机多进程选主。
+
+    同一台机器上的多个 uvicorn worker 竞争同一个锁文件，持有排他锁的进程即为
+    leader，负责运行定时任务；其余进程只提供 HTTP 服务，并每隔 lease_seconds
+    重试一次。leader 进程退出（包括崩溃）时操作系统会自动释放锁，因此故障切换
+    时间不超过 lease_seconds。
+    """
+
+    def __init__(self, lock_path: str, lease_seconds: float = 10):
+        self.lock_path = lock_path
+        self.lease_seconds = lease_seconds
+        self._fd = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """尝试以非阻塞方式获取锁，成功则成为 leader。"""
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            logger.warning("当前平台不支持 fcntl，跳过选主，本进程直接作为 leader。")
+            self._fd = -1
+            return True
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        # 记录当前 leader 的 PID，便于排查
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        logger.info(f"进程 {os.getpid()} 已成为 leader (锁文件: {self.lock_path})。")
+        return True
+
+    def release(self):
+        """释放锁，放弃 leader 身份。"""
+        if self._fd is None:
+            return
+        if self._fd >= 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        self._fd = None
+        logger.info(f"进程 {os.getpid()} 已释放 leader 锁。")
+
+    async def campaign(self, on_elected):
+        """
+        持续竞选直到成为 leader，然后调用 on_elected()。
+        应作为后台任务运行，应用关闭时取消即可。
+        """
+        while not self.try_acquire():
+            await asyncio.sleep(self.lease_seconds)
+        on_elected()
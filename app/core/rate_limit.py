@@ -0,0 +1,69 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    令牌桶：以 rate 个/秒的速度补充令牌，最多积累 capacity 个。
+    force_take 允许透支（令牌数变为负数），用于必须立即发送的高优先级消息，透支部分由之后的普通消息偿还。
+    """
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self, n: float = 1) -> bool:
+        self._refill()
+        if self._tokens >= n:
+            self._tokens -= n
+            return True
+        return False
+
+    def force_take(self, n: float = 1):
+        self._refill()
+        self._tokens -= n
+
+    def wait_time(self, n: float = 1) -> float:
+        """距离可以取出 n 个令牌还需等待的秒数。"""
+        self._refill()
+        if self._tokens >= n:
+            return 0.0
+        return (n - self._tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class KeyedRateLimiter:
+    """按键（例如收件人）各自维护一个令牌桶，线程安全。"""
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, key) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity, self._clock)
+        return bucket
+
+    def acquire(self, key, force: bool = False) -> float:
+        """
+        为 key 取一个令牌。取到（或 force 透支）时返回 0，否则不取并返回还需等待的秒数。
+        """
+        with self._lock:
+            bucket = self._bucket(key)
+            if force:
+                bucket.force_take()
+                return 0.0
+            if bucket.try_take():
+                return 0.0
+            return bucket.wait_time()
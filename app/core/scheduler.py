@@ -0,0 +1,39 @@
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.executors.asyncio import AsyncIOExecutor
+from apscheduler.executors.pool import ThreadPoolExecutor
+from app.core import config
+
+# 阻塞型任务（网络请求、SMTP 等）使用的执行器别名
+BLOCKING_EXECUTOR = "blocking"
+
+# 所有任务的默认行为:
+#   max_instances=1  上一次尚未结束时跳过本次触发，避免任务堆积
+#   coalesce=True    错过的多次触发合并为一次执行
+#   misfire_grace_time 允许的最大延迟，超过则视为错过
+JOB_DEFAULTS = {
+    "max_instances": 1,
+    "coalesce": True,
+    "misfire_grace_time": 30,
+}
+
+
+def create_scheduler(event_loop=None, max_workers: int = None) -> AsyncIOScheduler:
+    """
+    创建运行在 FastAPI 事件循环上的调度器。
+
+    协程任务直接在事件循环上执行；阻塞任务需指定 executor=BLOCKING_EXECUTOR，
+    在一个有界线程池中执行，线程数不会随任务积压而增长。
+
+    Args:
+        event_loop: 调度器使用的事件循环，默认为 start() 时正在运行的循环。
+        max_workers: 阻塞任务线程池的大小，默认为 config.JOB_EXECUTOR_WORKERS。
+    """
+    max_workers = config.JOB_EXECUTOR_WORKERS if max_workers is None else max_workers
+    return AsyncIOScheduler(
+        event_loop=event_loop,
+        executors={
+            "default": AsyncIOExecutor(),
+            BLOCKING_EXECUTOR: ThreadPoolExecutor(max_workers=max_workers),
+        },
+        job_defaults=JOB_DEFAULTS,
+    )
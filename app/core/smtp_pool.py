@@ -0,0 +1,161 @@
+import logging
+import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def is_connection_error(e: Exception) -> bool:
+    """连接本身已不可用（断开、超时、网络错误），换一条新连接重试即可。SMTPException 也是 OSError 的子类，需区分。"""
+    if isinstance(e, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(e, OSError) and not isinstance(e, smtplib.SMTPException)
+
+
+class _PooledConnection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+
+
+class SMTPPool:
+    """
+    线程安全的 SMTP 连接池。
+
+    连接建立后完成 STARTTLS 与登录并保留在池中复用；借出前若已空闲超过 noop_after 秒，先用 NOOP 探测，
+    空闲超过 idle_timeout 秒的连接直接关闭。发送时如果连接已被服务器断开，会透明地重连并重试一次。
+    最多同时保持 max_size 条连接，更多的并发发送会等待空闲连接。
+    """
+
+    def __init__(self, host: str, port: int, username: str = None, password: str = None,
+                 use_tls: bool = True, max_size: int = 2, timeout: float = 30,
+                 idle_timeout: float = 60, noop_after: float = 10, smtp_factory=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.noop_after = noop_after
+        self._factory = smtp_factory
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._stats = {"connects": 0, "reuses": 0, "reconnects": 0}
+
+    def _connect(self) -> _PooledConnection:
+        logger.info(f"正在连接邮件服务器: {self.host}:{self.port}")
+        smtp = self._factory(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._quit(smtp)
+            raise
+        with self._lock:
+            self._stats["connects"] += 1
+        logger.info("SMTP 连接已建立并完成登录。")
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _quit(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, conn: _PooledConnection, now: float) -> bool:
+        idle = now - conn.last_used
+        if idle > self.idle_timeout:
+            return False
+        if idle <= self.noop_after:
+            return True
+        try:
+            return conn.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self) -> _PooledConnection:
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            if self._is_alive(conn, time.monotonic()):
+                with self._lock:
+                    self._stats["reuses"] += 1
+                return conn
+            self._quit(conn.smtp)
+
+    def _checkin(self, conn: _PooledConnection):
+        conn.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(conn)
+
+    @contextmanager
+    def connection(self):
+        """借出一条已登录的 SMTP 连接；块内抛出连接类异常时该连接被丢弃。"""
+        with self._slots:
+            conn = self._checkout()
+            try:
+                yield conn.smtp
+            except Exception as e:
+                if is_connection_error(e):
+                    self._quit(conn.smtp)
+                    raise
+                # 协议层错误（如收件人被拒）后重置会话，连接仍可复用
+                try:
+                    conn.smtp.rset()
+                except Exception:
+                    self._quit(conn.smtp)
+                    raise
+                self._checkin(conn)
+                raise
+            else:
+                self._checkin(conn)
+
+    def send_many(self, messages):
+        """
+        通过同一个会话依次发送多封邮件。连接中途断开时换一条新连接，从未发送的邮件继续，只重试一次。
+
+        Args:
+            messages: [(from_addr, to_addrs, msg_string)] 列表。
+        """
+        pending = list(messages)
+        for attempt in range(2):
+            try:
+                with self.connection() as smtp:
+                    while pending:
+                        from_addr, to_addrs, msg = pending[0]
+                        smtp.sendmail(from_addr, to_addrs, msg)
+                        pending.pop(0)
+                return
+            except Exception as e:
+                if attempt or not is_connection_error(e):
+                    raise
+                with self._lock:
+                    self._stats["reconnects"] += 1
+                logger.warning(f"SMTP 连接已失效 ({e})，正在重新连接...")
+
+    def send(self, from_addr, to_addrs, msg: str):
+        self.send_many([(from_addr, to_addrs, msg)])
+
+    def close(self):
+        """关闭所有空闲连接。"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn in idle:
+            self._quit(conn.smtp)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, idle=len(self._idle))
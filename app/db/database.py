@@ -1,8 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
+from app.core import config
 
 # 使用SQLite数据库
-SQLALCHEMY_DATABASE_URL = "sqlite:///./hotspot.db"
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
@@ -11,3 +12,40 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
+
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    """
+    每个新连接都设置一遍：busy_timeout、synchronous、cache_size、mmap_size 只对当前连接生效。
+    WAL 是数据库文件级别的设置，让读取不再被写事务阻塞，写入也不必等待读取结束；内存数据库不支持 WAL。
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(config.SQLITE_BUSY_TIMEOUT)}")
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute(f"PRAGMA synchronous = {config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size = {int(config.SQLITE_CACHE_SIZE)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(config.SQLITE_MMAP_SIZE)}")
+    finally:
+        cursor.close()
+
+
+def configure_sqlite(target_engine):
+    """为 SQLite 引擎注册连接参数设置，其他数据库不做处理。"""
+    if target_engine.dialect.name == "sqlite":
+        event.listen(target_engine, "connect", _apply_pragmas)
+    return target_engine
+
+
+configure_sqlite(engine)
+
+
+def init_db():
+    """
+    创建所有尚不存在的数据表并执行未应用的迁移。应在应用启动时显式调用，而不是在导入时执行。
+    """
+    # 导入模型以便将其注册到 Base.metadata
+    from app.models import item, bar, alert_state, outbox, trend  # noqa: F401
+    from app.db.migrations import run_migrations
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
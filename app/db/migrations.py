@@ -0,0 +1,60 @@
+import logging
+from sqlalchemy import text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 已应用的迁移版本记录在 SQLite 的 PRAGMA user_version 中。
+# 新建的数据库由 create_all 直接按当前模型建表，迁移必须可以在这样的数据库上重复执行而不出错。
+
+
+def _columns(conn, table: str) -> set:
+    return {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+
+
+def _add_outbox_priority(conn):
+    if "priority" not in _columns(conn, "outbox"):
+        conn.execute(text("ALTER TABLE outbox ADD COLUMN priority INTEGER NOT NULL DEFAULT 0"))
+
+
+def _item_query_indexes(conn):
+    # 仪表盘与条目接口按 created_at 倒序分页（SQLite 的二级索引隐含 rowid，覆盖 (created_at, id) 排序）；
+    # 来源过滤走 (source, created_at)；热点推送按 updated_at 过滤、按 hot_score 排序
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_items_created_at ON items (created_at)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_items_source_created_at ON items (source, created_at)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_items_updated_at_hot_score ON items (updated_at, hot_score)"))
+    # 没有按标题查询的场景；source 单列索引是 (source, created_at) 的前缀；id 是主键本身
+    conn.execute(text("DROP INDEX IF EXISTS ix_items_title"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_items_source"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_items_id"))
+
+
+# (版本号, 说明, 迁移函数)，版本号严格递增，已发布的迁移不要修改
+MIGRATIONS = [
+    (1, "outbox 增加 priority 列", _add_outbox_priority),
+    (2, "items 按查询模式调整索引", _item_query_indexes),
+]
+
+
+def schema_version(conn) -> int:
+    return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def run_migrations(engine) -> int:
+    """
+    依次执行尚未应用的迁移，每个迁移完成后更新版本号；中途失败的迁移会在下次启动时重新执行。
+
+    Returns:
+        执行后的版本号。
+    """
+    with engine.connect() as conn:
+        version = schema_version(conn)
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(text(f"PRAGMA user_version = {number}"))
+        logger.info(f"数据库迁移 {number} 已完成: {description}")
+        version = number
+    return version
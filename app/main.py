@@ -1,34 +1,84 @@
-from fastapi import FastAPI, Request
+import asyncio
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.templating import Jinja2Templates
 from contextlib import asynccontextmanager
-from apscheduler.schedulers.background import BackgroundScheduler
-from app.db.database import engine, Base, SessionLocal
-from app.models.item import Item
-from app.services.scraper import run_scrape_x
-from app.services.pusher import push_market_summary
-from app.services.alerter import check_price_alerts
-from app.services.market_data_fetcher import get_market_summary
+from app.core import config
+from app.core.scheduler import create_scheduler, BLOCKING_EXECUTOR
+from app.core.leader import LeaderElector
+from app.services.browser_pool import browser_pool
 from datetime import datetime, timedelta
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+# 数据库、Playwright、pandas、TradingView 等重量级依赖都在首次使用时才导入，
+# 以缩短 worker 启动时间并降低不运行定时任务的 worker 的内存占用。
 
 # 配置模板
 templates = Jinja2Templates(directory="app/templates")
 
+def _register_jobs(scheduler):
+    # 任务以 "模块:函数" 的文本形式引用，只有成为 leader 的进程才会导入对应模块
+    jitter = config.JOB_JITTER_SECONDS
+    # 协程任务直接运行在当前事件循环上
+    scheduler.add_job("app.services.scraper:run_scrape_x_async", 'interval', hours=1, jitter=jitter, id="scrape_x")
+    scheduler.add_job("app.services.scraper:run_scrape_x_async", 'date', run_date=datetime.now() + timedelta(seconds=2), id="scrape_x_initial")
+    # 阻塞任务进入有界线程池；上一次未结束时本次触发会被跳过
+    scheduler.add_job("app.services.pusher:push_market_summary", 'interval', minutes=15, jitter=jitter,
+                      executor=BLOCKING_EXECUTOR, id="push_market_summary")
+    scheduler.add_job("app.services.alerter:check_price_alerts", 'interval', minutes=1, jitter=jitter,
+                      executor=BLOCKING_EXECUTOR, id="check_price_alerts")
+    # 指标引擎在求值之外按K线同步间隔推进，启动后立即预热一次
+    scheduler.add_job("app.services.alerter:warm_indicator_engine", 'interval', seconds=config.BAR_SYNC_INTERVAL,
+                      jitter=jitter, executor=BLOCKING_EXECUTOR, id="warm_indicator_engine")
+    scheduler.add_job("app.services.alerter:warm_indicator_engine", 'date',
+                      run_date=datetime.now() + timedelta(seconds=1), executor=BLOCKING_EXECUTOR,
+                      id="warm_indicator_engine_initial")
+    scheduler.add_job("app.services.trend_store:run_rollup", 'interval', hours=1, jitter=jitter,
+                      executor=BLOCKING_EXECUTOR, id="trend_rollup")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("应用启动...")
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(run_scrape_x, 'interval', hours=1, id="scrape_x")
-    scheduler.add_job(push_market_summary, 'interval', minutes=15, id="push_market_summary")
-    scheduler.add_job(check_price_alerts, 'interval', minutes=1, id="check_price_alerts")
-    scheduler.add_job(run_scrape_x, 'date', run_date=datetime.now() + timedelta(seconds=2), id="scrape_x_initial")
-    scheduler.start()
-    print("调度器已启动，所有定时任务已安排。")
+    from app.db.database import init_db
+    init_db()
+    scheduler = create_scheduler()
+    elector = LeaderElector(config.LEADER_LOCK_PATH, config.LEADER_LEASE_SECONDS)
+
+    stream_tasks = []
+    workers = []
+
+    def start_jobs():
+        # 邮件由发件箱投递线程统一发送，任务只负责入队
+        # 待合并的价格预警保存在数据库中，同样由投递线程在合并窗口结束后发出
+        from app.services.outbox import outbox_worker
+        outbox_worker.start()
+        workers.append(outbox_worker)
+        _register_jobs(scheduler)
+        scheduler.start()
+        print("本进程已成为 leader，调度器已启动，所有定时任务已安排。")
+        if config.QUOTE_SOURCE == "stream" and not config.QUOTE_STREAM_URL:
+            print("QUOTE_SOURCE=stream 但未设置 QUOTE_STREAM_URL，价格预警退回每分钟轮询。")
+        elif config.QUOTE_SOURCE == "stream":
+            # 推送报价逐笔进入预警求值；每分钟的轮询任务在推送源断线或无报价期间兜底
+            from app.services.alerter import run_alert_stream
+            from app.services.quote_source import create_quote_source
+            stream_tasks.append(asyncio.create_task(run_alert_stream(create_quote_source())))
+
+    # 多 worker 部署时只有一个进程运行定时任务，其余进程只提供 HTTP 服务
+    campaign = asyncio.create_task(elector.campaign(start_jobs))
     yield
     print("应用关闭...")
-    scheduler.shutdown()
+    campaign.cancel()
+    for task in stream_tasks:
+        task.cancel()
+    if scheduler.running:
+        scheduler.shutdown()
+    for worker in workers:
+        worker.stop()
+    if workers:
+        # 只有 leader 进程计算过指标；保存增量指标状态，重启后无需从头预热
+        from app.services.indicator_engine import save_indicator_engine
+        save_indicator_engine()
+    elector.release()
+    browser_pool.close()
 
 app = FastAPI(
     title="实时热点聚合与推送系统",
@@ -41,36 +91,125 @@ app = FastAPI(
 async def read_root():
     return {"message": "欢迎使用实时热点聚合与推送系统"}
 
-@app.get("/dashboard", tags=["管理后台"])
-async def view_dashboard(request: Request):
+def _list_items(limit: int, cursor: str = None, source: str = None):
+    # SQLite 查询是阻塞的，由调用方放到线程池中执行，避免卡住事件循环
+    from app.db.database import SessionLocal
+    from app.models.item import list_items
     db = SessionLocal()
     try:
-        items = db.query(Item).order_by(Item.created_at.desc()).limit(50).all()
-        return templates.TemplateResponse(request, "index.html", {"items": items})
+        return list_items(db, limit=limit, cursor=cursor, source=source)
     finally:
         db.close()
 
-@app.get("/financials", tags=["管理后台"])
-def view_financials(request: Request):
+def _rising_items(limit: int):
+    from app.db.database import SessionLocal
+    from app.services.trend_ranking import rising_items
+    db = SessionLocal()
     try:
-        summary_data = get_market_summary()
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        return templates.TemplateResponse(
-            request,
-            "financial_dashboard.html",
+        return rising_items(db, limit=limit)
+    finally:
+        db.close()
+
+@app.get("/dashboard", tags=["管理后台"])
+async def view_dashboard(request: Request):
+    items, _ = await asyncio.to_thread(_list_items, 50)
+    rising = await asyncio.to_thread(_rising_items, 10)
+    return templates.TemplateResponse(request, "index.html", {"items": items, "rising": rising})
+
+@app.get("/api/trends/rising", tags=["数据接口"])
+async def rising_trends_api(limit: int = Query(20, ge=1, le=100)):
+    rising = await asyncio.to_thread(_rising_items, limit)
+    return {
+        "items": [
             {
-                "summary": summary_data,
-                "timestamp": timestamp,
-                "error": None
+                "id": item.id,
+                "title": item.title,
+                "url": item.url,
+                "source": item.source,
+                "hot_score": stat.hot_score,
+                "velocity": stat.velocity,
+                "acceleration": stat.acceleration,
+                "updated_at": stat.updated_at,
             }
-        )
-    except Exception as e:
+            for item, stat in rising
+        ],
+    }
+
+@app.get("/api/items", tags=["数据接口"])
+async def list_items_api(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str = Query(None, description="上一页返回的 next_cursor"),
+    source: str = Query(None, description="只返回该来源的条目"),
+):
+    try:
+        items, next_cursor = await asyncio.to_thread(_list_items, limit, cursor, source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "items": [
+            {
+                "id": item.id,
+                "title": item.title,
+                "url": item.url,
+                "source": item.source,
+                "hot_score": item.hot_score,
+                "created_at": item.created_at.isoformat() if item.created_at else None,
+                "updated_at": item.updated_at.isoformat() if item.updated_at else None,
+            }
+            for item in items
+        ],
+        "next_cursor": next_cursor,
+    }
+
+def _get_trend_series(item_id: int, start: int = None, end: int = None):
+    from app.db.database import SessionLocal
+    from app.services.trend_store import get_series
+    db = SessionLocal()
+    try:
+        return get_series(db, item_id, start, end)
+    finally:
+        db.close()
+
+@app.get("/api/items/{item_id}/trend", tags=["数据接口"])
+async def item_trend_api(
+    item_id: int,
+    start: int = Query(None, description="起始时间 (UTC 秒级时间戳)"),
+    end: int = Query(None, description="结束时间 (UTC 秒级时间戳)"),
+):
+    points = await asyncio.to_thread(_get_trend_series, item_id, start, end)
+    return {
+        "item_id": item_id,
+        "points": [{"ts": ts, "hot_score": hot_score, "resolution": resolution}
+                   for ts, hot_score, resolution in points],
+    }
+
+@app.get("/financials", tags=["管理后台"])
+async def view_financials(request: Request):
+    # 页面只读取后台刷新的市场快照，不在请求中抓取行情；快照过期时返回旧数据并在后台刷新
+    from app.services.market_snapshot import market_snapshot
+    snapshot = market_snapshot.get()
+    if snapshot is None:
+        # 进程内首次访问：在线程中等待第一次刷新，不阻塞事件循环
+        snapshot = await asyncio.to_thread(market_snapshot.get_fresh, None, config.MARKET_SUMMARY_DEADLINE * 2)
+    if snapshot is None:
         return templates.TemplateResponse(
             request,
             "financial_dashboard.html",
             {
                 "summary": None,
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "error": str(e)
+                "error": market_snapshot.last_error
             }
-        )
\ No newline at end of file
+        )
+    return templates.TemplateResponse(
+        request,
+        "financial_dashboard.html",
+        {
+            "summary": snapshot.data,
+            "timestamp": datetime.fromtimestamp(snapshot.fetched_at).strftime("%Y-%m-%d %H:%M:%S"),
+            "data_age": int(snapshot.age()),
+            "version": snapshot.version,
+            "refreshing": market_snapshot.refreshing,
+            "error": None
+        }
+    )
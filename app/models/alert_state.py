@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Float, Boolean
+from app.db.database import Base
+
+class AlertState(Base):
+    __tablename__ = "alert_states"
+
+    rule_id = Column(String, primary_key=True, comment="预警规则 id")
+    symbol = Column(String, index=True, comment="标的代码")
+    armed = Column(Boolean, default=True, index=True, comment="是否处于待触发状态")
+    last_fired_at = Column(Integer, comment="最近一次触发时间 (UTC 秒级时间戳)")
+    last_value = Column(Float, comment="最近一次触发或重新启用时的规则比较值")
+    last_price = Column(Float, comment="最近一次触发或重新启用时的价格")
+    updated_at = Column(Integer, index=True, comment="状态更新时间 (UTC 秒级时间戳)，用于过期清理")
+
+    def __repr__(self):
+        return f"<AlertState(rule_id={self.rule_id}, armed={self.armed})>"
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Float
+from app.db.database import Base
+
+class Bar(Base):
+    __tablename__ = "bars"
+
+    symbol = Column(String, primary_key=True, comment="标的代码")
+    exchange = Column(String, primary_key=True, comment="交易所")
+    interval = Column(String, primary_key=True, comment="K线周期")
+    ts = Column(Integer, primary_key=True, comment="K线开始时间 (UTC 秒级时间戳)")
+    open = Column(Float, comment="开盘价")
+    high = Column(Float, comment="最高价")
+    low = Column(Float, comment="最低价")
+    close = Column(Float, comment="收盘价")
+    volume = Column(Float, comment="成交量")
+
+    def __repr__(self):
+        return f"<Bar(symbol={self.symbol}, interval={self.interval}, ts={self.ts})>"
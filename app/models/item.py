@@ -1,17 +1,119 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float
+import base64
+import json
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index, select, tuple_, type_coerce, update
 from sqlalchemy.sql import func
 from app.db.database import Base
 
 class Item(Base):
     __tablename__ = "items"
 
-    id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, index=True, comment="标题")
+    id = Column(Integer, primary_key=True)
+    title = Column(String, comment="标题")
     url = Column(String, unique=True, index=True, comment="链接")
-    source = Column(String, index=True, comment="来源")
+    source = Column(String, comment="来源")
     hot_score = Column(Float, default=0.0, comment="热度指数")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), comment="更新时间")
 
+    # 与 app.db.migrations 中的索引迁移保持一致
+    __table_args__ = (
+        Index("ix_items_created_at", "created_at"),
+        Index("ix_items_source_created_at", "source", "created_at"),
+        Index("ix_items_updated_at_hot_score", "updated_at", "hot_score"),
+    )
+
     def __repr__(self):
         return f"<Item(title={self.title}, source={self.source})>"
+
+
+# SQLite 单条语句的绑定参数个数有上限，IN 查询按此大小分批
+_IN_CHUNK_SIZE = 500
+
+def bulk_upsert_items(db, records: list[dict]) -> tuple[list[Item], int]:
+    """
+    批量写入条目：一次 IN 查询解析已存在的链接，已存在的更新热度，不存在的插入。
+    不在此处提交事务，由调用方决定何时 commit。
+
+    Args:
+        db: SQLAlchemy数据库会话
+        records: 至少包含 title/url/source/hot_score 的字典列表，同一链接以最后一条为准。
+
+    Returns:
+        (新插入的条目列表, 被更新的条目数)
+    """
+    by_url = {}
+    for record in records:
+        by_url[record["url"]] = record
+    if not by_url:
+        return [], 0
+
+    urls = list(by_url)
+    existing = {}
+    for i in range(0, len(urls), _IN_CHUNK_SIZE):
+        chunk = urls[i:i + _IN_CHUNK_SIZE]
+        rows = db.execute(select(Item.id, Item.url).where(Item.url.in_(chunk))).all()
+        existing.update({url: item_id for item_id, url in rows})
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    updates = [
+        {"id": existing[url], "hot_score": record.get("hot_score", 0.0), "updated_at": now}
+        for url, record in by_url.items() if url in existing
+    ]
+    if updates:
+        db.execute(update(Item), updates)
+
+    new_items = [
+        Item(
+            title=record["title"],
+            url=url,
+            source=record["source"],
+            hot_score=record.get("hot_score", 0.0),
+        )
+        for url, record in by_url.items() if url not in existing
+    ]
+    db.add_all(new_items)
+    return new_items, len(updates)
+
+
+# created_at 在 SQLite 中以文本保存，且服务端默认值不带微秒；游标直接使用库中的原始文本比较，
+# 避免与绑定参数格式不一致导致翻页时重复或遗漏
+_created_at_text = type_coerce(Item.created_at, String)
+
+
+def encode_cursor(created_at_text: str, item_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at_text, item_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """解析翻页游标，格式不合法时抛出 ValueError。"""
+    try:
+        created_at_text, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError(f"无效的游标: {cursor!r}")
+    if not isinstance(created_at_text, str) or not isinstance(item_id, int):
+        raise ValueError(f"无效的游标: {cursor!r}")
+    return created_at_text, item_id
+
+
+def list_items(db, limit: int = 50, cursor: str = None, source: str = None) -> tuple[list[Item], str]:
+    """
+    按 (created_at, id) 倒序分页查询条目（keyset 分页），翻页代价与页码无关。
+
+    Args:
+        db: SQLAlchemy数据库会话
+        limit: 每页条数。
+        cursor: 上一页返回的游标，为 None 时从最新的条目开始。
+        source: 只返回该来源的条目。
+
+    Returns:
+        (条目列表, 下一页游标)；没有更多数据时游标为 None。
+    """
+    stmt = select(Item, _created_at_text.label("cursor_created_at")).order_by(Item.created_at.desc(), Item.id.desc()).limit(limit + 1)
+    if source is not None:
+        stmt = stmt.where(Item.source == source)
+    if cursor is not None:
+        stmt = stmt.where(tuple_(_created_at_text, Item.id) < tuple_(*decode_cursor(cursor)))
+    rows = db.execute(stmt).all()
+    next_cursor = encode_cursor(rows[limit - 1][1], rows[limit - 1][0].id) if len(rows) > limit else None
+    return [item for item, _ in rows[:limit]], next_cursor
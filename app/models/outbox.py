@@ -0,0 +1,51 @@
+from sqlalchemy import Column, Integer, String, Text, Index
+from app.db.database import Base
+
+# 发件箱消息状态
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+DEAD = "dead"
+
+# 消息优先级：紧急消息优先投递且不受收件人限流约束
+PRIORITY_NORMAL = 0
+PRIORITY_CRITICAL = 10
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True)
+    idempotency_key = Column(String, unique=True, nullable=False, comment="幂等键，相同键的消息只入队一次")
+    subject = Column(String, nullable=False, comment="邮件主题")
+    content = Column(Text, nullable=False, comment="已渲染的邮件 HTML 正文")
+    recipients = Column(String, nullable=False, comment="收件人（入队时按收件人拆分，每条消息一个）")
+    priority = Column(Integer, nullable=False, default=PRIORITY_NORMAL, comment="优先级，数值越大越先投递")
+    status = Column(String, nullable=False, default=PENDING, comment="pending / sending / sent / dead")
+    attempts = Column(Integer, nullable=False, default=0, comment="已尝试投递次数")
+    next_attempt_at = Column(Integer, nullable=False, comment="下次可投递时间 (UTC 秒级时间戳)")
+    last_error = Column(Text, comment="最近一次投递失败的原因")
+    created_at = Column(Integer, nullable=False, comment="入队时间 (UTC 秒级时间戳)")
+    sent_at = Column(Integer, comment="投递成功时间 (UTC 秒级时间戳)")
+
+    __table_args__ = (
+        # 投递线程按 (status, next_attempt_at) 取到期消息
+        Index("ix_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<OutboxMessage(id={self.id}, status={self.status}, subject={self.subject})>"
+
+
+class PendingAlert(Base):
+    """
+    等待合并的普通价格预警。预警触发时与预警状态在同一事务中写入，
+    合并窗口结束后由发件箱投递线程渲染为一封汇总邮件并删除，进程重启或 leader 切换都不会丢失。
+    """
+    __tablename__ = "pending_alerts"
+
+    id = Column(Integer, primary_key=True)
+    payload = Column(Text, nullable=False, comment="预警详情 (JSON)")
+    created_at = Column(Integer, nullable=False, comment="触发时间 (UTC 秒级时间戳)")
+
+    def __repr__(self):
+        return f"<PendingAlert(id={self.id}, created_at={self.created_at})>"
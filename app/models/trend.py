@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, Float, Index
+from app.db.database import Base
+
+# 数据点的时间粒度（秒）：原始抓取点、小时汇总、日汇总
+RAW = 0
+HOURLY = 3600
+DAILY = 86400
+
+
+class TrendPoint(Base):
+    """
+    热点热度的时间序列，只追加不修改。每行只有四个整数，主键 (item_id, ts) 即聚簇顺序（WITHOUT ROWID），
+    取一个条目某段时间的序列是一次主键范围扫描。旧数据被逐级汇总为小时、日粒度后删除原始点。
+    """
+    __tablename__ = "trend_points"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    item_id = Column(Integer, primary_key=True, autoincrement=False, comment="条目 id")
+    ts = Column(Integer, primary_key=True, comment="抓取时间或汇总区间起点 (UTC 秒级时间戳)")
+    resolution = Column(Integer, nullable=False, default=RAW, comment="时间粒度（秒），0 为原始抓取点")
+    hot_score = Column(Integer, nullable=False, comment="热度（帖子数），汇总点取区间内最后一次抓取的值")
+
+    def __repr__(self):
+        return f"<TrendPoint(item_id={self.item_id}, ts={self.ts}, hot_score={self.hot_score})>"
+
+
+class TrendStat(Base):
+    """
+    每个活跃条目的热度动量（最近一次抓取的热度及其指数衰减的变化速度、加速度），每次抓取时增量更新。
+    按 velocity 建索引，"上升最快" 列表只需读取索引头部的 K 行。
+    """
+    __tablename__ = "trend_stats"
+    __table_args__ = (Index("ix_trend_stats_velocity", "velocity"),)
+
+    item_id = Column(Integer, primary_key=True, autoincrement=False, comment="条目 id")
+    updated_at = Column(Integer, nullable=False, comment="最近一次抓取时间 (UTC 秒级时间戳)")
+    hot_score = Column(Integer, nullable=False, comment="最近一次抓取的热度")
+    velocity = Column(Float, nullable=False, default=0.0, comment="热度变化速度（帖子数/小时），指数衰减平均")
+    acceleration = Column(Float, nullable=False, default=0.0, comment="速度变化率（帖子数/小时²），指数衰减平均")
+
+    def __repr__(self):
+        return f"<TrendStat(item_id={self.item_id}, velocity={self.velocity:.1f})>"
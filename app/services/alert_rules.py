@@ -0,0 +1,224 @@
+import logging
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 规则比较的指标名：价格、相对前收盘的涨跌幅 (%)，其余为 IndicatorEngine 输出的指标列名
+PRICE = "price"
+PERCENT = "percent"
+
+LEVEL_CONDITIONS = ("above", "below")
+CROSS_CONDITIONS = ("cross_above", "cross_below")
+MOVE_CONDITIONS = ("move_up", "move_down")
+
+# 规则优先级：critical 规则的预警不参与合并，立即发送且不受收件人限流约束
+PRIORITY_NORMAL = "normal"
+PRIORITY_CRITICAL = "critical"
+PRIORITIES = (PRIORITY_NORMAL, PRIORITY_CRITICAL)
+
+CONDITION_LABELS = {
+    "above": "高于",
+    "below": "低于",
+    "cross_above": "上穿",
+    "cross_below": "下穿",
+    "move_up": "涨幅超过",
+    "move_down": "跌幅超过",
+}
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    """
+    一条编译后的预警规则。
+
+    metric 为比较对象：PRICE、PERCENT、指标名，或 (指标A, 指标B) 表示两条指标之差（用于均线交叉，阈值为 0）。
+    condition 为 above / below（电平触发）或 cross_above / cross_below（上一次值到本次值穿越阈值时触发）。
+    """
+    id: str
+    symbol: str
+    screener: str
+    metric: object
+    condition: str
+    threshold: float
+    label: str
+    hysteresis: float = None
+    priority: str = PRIORITY_NORMAL
+
+    @property
+    def critical(self) -> bool:
+        return self.priority == PRIORITY_CRITICAL
+
+    @property
+    def needs_indicators(self) -> bool:
+        return self.metric not in (PRICE, PERCENT)
+
+    @property
+    def direction(self) -> str:
+        return "below" if self.condition in ("below", "cross_below") else "above"
+
+
+def _number(raw: dict, field: str) -> float:
+    value = raw.get(field)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"字段 '{field}' 必须是数字: {raw}")
+    return float(value)
+
+
+def parse_rule(raw: dict) -> AlertRule:
+    """
+    将配置文件中的一条规则解析为 AlertRule，字段不合法时抛出 ValueError。
+
+    支持的写法:
+        {symbol, condition: above|below|cross_above|cross_below, target_price}
+        {symbol, condition: move_up|move_down, percent}            相对前收盘的涨跌幅
+        {symbol, indicator, condition: above|below|cross_*, value}  例如 RSI_14 above 70
+        {symbol, indicator, condition: cross_above|cross_below, reference}  例如 SMA_20 上穿 SMA_50
+    可选字段: id（默认由规则内容生成）、screener（默认 america；其他 screener 的 symbol 必须带交易所前缀）、hysteresis（触发后重新启用所需的回撤幅度）、
+    priority（normal 或 critical）。
+    """
+    if not isinstance(raw, dict):
+        raise ValueError(f"规则必须是字典: {raw!r}")
+    symbol = raw.get("symbol")
+    condition = raw.get("condition")
+    if not symbol or not isinstance(symbol, str):
+        raise ValueError(f"缺少 symbol: {raw}")
+    if condition not in CONDITION_LABELS:
+        raise ValueError(f"不支持的 condition '{condition}': {raw}")
+    screener = raw.get("screener")
+    if screener is not None and not isinstance(screener, str):
+        raise ValueError(f"screener 必须是字符串: {raw}")
+    # 不带交易所前缀的代码默认补为 NASDAQ，只对美股 screener 成立；其他市场必须写明交易所
+    if screener and screener.lower() != "america" and ":" not in symbol:
+        raise ValueError(f"screener '{screener}' 的 symbol 必须写成 'EXCHANGE:SYMBOL'（例如 BINANCE:BTCUSDT）: {raw}")
+
+    indicator = raw.get("indicator")
+    reference = raw.get("reference")
+    if indicator:
+        if condition in MOVE_CONDITIONS:
+            raise ValueError(f"指标规则不支持 condition '{condition}': {raw}")
+        if reference:
+            if condition not in CROSS_CONDITIONS:
+                raise ValueError(f"指标交叉规则的 condition 必须是 cross_above/cross_below: {raw}")
+            metric, threshold = (indicator, reference), 0.0
+            label = f"{indicator} {CONDITION_LABELS[condition]} {reference}"
+        else:
+            metric, threshold = indicator, _number(raw, "value")
+            label = f"{indicator} {CONDITION_LABELS[condition]} {threshold:g}"
+    elif condition in MOVE_CONDITIONS:
+        percent = abs(_number(raw, "percent"))
+        # 涨跌幅规则等价于 PERCENT 指标上的电平规则
+        metric, threshold = PERCENT, percent if condition == "move_up" else -percent
+        condition = "above" if condition == "move_up" else "below"
+        label = f"{CONDITION_LABELS[raw['condition']]} {percent:g}%"
+    else:
+        metric, threshold = PRICE, _number(raw, "target_price")
+        label = f"价格 {CONDITION_LABELS[condition]} {threshold:g}"
+
+    rule_id = raw.get("id") or f"{symbol}:{raw.get('indicator') or PRICE}:{raw['condition']}:" \
+                               f"{reference or raw.get('value', raw.get('percent', raw.get('target_price')))}"
+    hysteresis = abs(_number(raw, "hysteresis")) if raw.get("hysteresis") is not None else None
+    priority = raw.get("priority", PRIORITY_NORMAL)
+    if priority not in PRIORITIES:
+        raise ValueError(f"不支持的 priority '{priority}': {raw}")
+    return AlertRule(id=str(rule_id), symbol=symbol, screener=screener, metric=metric,
+                     condition=condition, threshold=threshold, label=label, hysteresis=hysteresis,
+                     priority=priority)
+
+
+class _ThresholdIndex:
+    """同一 (标的, 指标) 下按条件分组、按阈值排序的规则列表，通过二分查找定位被触发的规则。"""
+
+    def __init__(self):
+        self._keys = {condition: [] for condition in LEVEL_CONDITIONS + CROSS_CONDITIONS}
+        self._rules = {condition: [] for condition in LEVEL_CONDITIONS + CROSS_CONDITIONS}
+
+    def add(self, rule: AlertRule):
+        keys, rules = self._keys[rule.condition], self._rules[rule.condition]
+        pos = bisect_right(keys, rule.threshold)
+        keys.insert(pos, rule.threshold)
+        rules.insert(pos, rule)
+
+    def match(self, current: float, previous: float = None) -> list:
+        triggered = []
+        # above: 阈值 < current；below: 阈值 > current
+        triggered += self._rules["above"][:bisect_left(self._keys["above"], current)]
+        triggered += self._rules["below"][bisect_right(self._keys["below"], current):]
+        if previous is not None:
+            if current > previous:
+                # 上穿: previous <= 阈值 < current
+                keys = self._keys["cross_above"]
+                triggered += self._rules["cross_above"][bisect_left(keys, previous):bisect_left(keys, current)]
+            elif current < previous:
+                # 下穿: current < 阈值 <= previous
+                keys = self._keys["cross_below"]
+                triggered += self._rules["cross_below"][bisect_right(keys, current):bisect_right(keys, previous)]
+        return triggered
+
+
+def metric_value(metric, metrics: dict):
+    """从指标字典中取出规则的比较值；两条指标之差任一缺失时返回 None。"""
+    if isinstance(metric, tuple):
+        a, b = metrics.get(metric[0]), metrics.get(metric[1])
+        return a - b if a is not None and b is not None else None
+    return metrics.get(metric)
+
+
+class RuleSet:
+    """
+    编译后的规则集合：按标的、指标建立阈值索引。构建后只读，可在线程间共享。
+    """
+
+    def __init__(self, rules=()):
+        self.rules = []
+        self._index = {}  # symbol -> {metric: _ThresholdIndex}
+        self._by_id = {}
+        self._symbols = None
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: AlertRule):
+        if rule.id in self._by_id:
+            raise ValueError(f"规则 id 重复: {rule.id}")
+        self._by_id[rule.id] = rule
+        self._symbols = None
+        self.rules.append(rule)
+        self._index.setdefault(rule.symbol, {}).setdefault(rule.metric, _ThresholdIndex()).add(rule)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def get(self, rule_id: str) -> AlertRule:
+        return self._by_id.get(rule_id)
+
+    def symbols(self) -> list:
+        """需要报价的 (symbol, screener) 列表，顺序稳定。"""
+        if self._symbols is None:
+            self._symbols = sorted({(rule.symbol, rule.screener) for rule in self.rules},
+                                   key=lambda s: (s[0], s[1] or ""))
+        return self._symbols
+
+    def needs_indicators(self, symbol: str) -> bool:
+        return any(metric not in (PRICE, PERCENT) for metric in self._index.get(symbol, ()))
+
+    def evaluate(self, symbol: str, metrics: dict, previous: dict = None) -> list:
+        """
+        对某个标的的一次更新求值。
+
+        Args:
+            symbol: 标的，与规则中的 symbol 一致。
+            metrics: 本次的指标值，如 {"price": 231.5, "percent": 2.1, "RSI_14": 71.2}。
+            previous: 上一次的指标值，用于穿越判断；为 None 时穿越规则不会触发。
+
+        Returns:
+            [(rule, value)] 被触发的规则与对应的当前值。
+        """
+        triggered = []
+        for metric, index in self._index.get(symbol, {}).items():
+            current = metric_value(metric, metrics)
+            if current is None:
+                continue
+            before = metric_value(metric, previous) if previous else None
+            triggered.extend((rule, current) for rule in index.match(current, before))
+        return triggered
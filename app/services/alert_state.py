@@ -0,0 +1,101 @@
+import logging
+import time
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from app.core import config
+from app.models.alert_state import AlertState
+from app.services.alert_rules import AlertRule, RuleSet, metric_value
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# SQLite 单条语句的绑定参数个数有上限，按此大小分批删除
+_DELETE_CHUNK_SIZE = 500
+
+
+def rearm_band(rule: AlertRule) -> float:
+    """规则重新启用所需的回撤幅度：优先使用规则自身的 hysteresis，否则为阈值的 ALERT_HYSTERESIS_PERCENT%。"""
+    if rule.hysteresis is not None:
+        return rule.hysteresis
+    return abs(rule.threshold) * config.ALERT_HYSTERESIS_PERCENT / 100.0
+
+
+def should_rearm(rule: AlertRule, value: float) -> bool:
+    """比较值回到阈值另一侧并超出回撤带时返回 True。"""
+    band = rearm_band(rule)
+    if rule.direction == "above":
+        return value < rule.threshold - band
+    return value > rule.threshold + band
+
+
+class AlertStateStore:
+    """
+    保存在 SQLite 中的预警状态。规则触发后置为静默 (armed=False)，直到比较值回撤超过滞后带才重新启用，
+    因此进程重启或多个 worker 之间不会重复发送。只在构造时读取一次静默中的规则，写入由调用方提交。
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._disarmed = {}  # symbol -> {rule_id: AlertState}
+        for state in db.execute(select(AlertState).where(AlertState.armed.is_(False))).scalars():
+            self._disarmed.setdefault(state.symbol, {})[state.rule_id] = state
+
+    def is_armed(self, rule: AlertRule) -> bool:
+        return rule.id not in self._disarmed.get(rule.symbol, {})
+
+    def rearm(self, ruleset: RuleSet, symbol: str, metrics: dict, now: float = None) -> list:
+        """检查该标的下静默中的规则，满足回撤条件的重新启用。返回重新启用的规则 id。"""
+        disarmed = self._disarmed.get(symbol)
+        if not disarmed:
+            return []
+        now = int(time.time() if now is None else now)
+        rearmed = []
+        for rule_id, state in list(disarmed.items()):
+            rule = ruleset.get(rule_id)
+            if rule is None:
+                continue
+            value = metric_value(rule.metric, metrics)
+            if value is None or not should_rearm(rule, value):
+                continue
+            state.armed = True
+            state.last_value = value
+            state.last_price = metrics.get("price")
+            state.updated_at = now
+            del disarmed[rule_id]
+            rearmed.append(rule_id)
+            logger.info(f"预警 '{rule_id}' 的比较值已回撤至 {value}，重新启用。")
+        return rearmed
+
+    def mark_fired(self, rule: AlertRule, value: float, price: float, now: float = None):
+        """记录一次触发并将规则置为静默。"""
+        now = int(time.time() if now is None else now)
+        state = self.db.get(AlertState, rule.id)
+        if state is None:
+            state = AlertState(rule_id=rule.id)
+            self.db.add(state)
+        state.symbol = rule.symbol
+        state.armed = False
+        state.last_fired_at = now
+        state.last_value = value
+        state.last_price = price
+        state.updated_at = now
+        self._disarmed.setdefault(rule.symbol, {})[rule.id] = state
+
+    def cleanup(self, ruleset: RuleSet, now: float = None, ttl: float = None) -> int:
+        """
+        删除超过 ttl 未更新、且已重新启用或已不在配置中的规则状态。
+        仍处于静默的有效规则会一直保留，避免过期后重复触发。返回删除的行数。
+        """
+        now = time.time() if now is None else now
+        ttl = config.ALERT_STATE_TTL if ttl is None else ttl
+        expired = self.db.execute(
+            select(AlertState.rule_id, AlertState.armed).where(AlertState.updated_at < int(now - ttl))
+        ).all()
+        stale_ids = [rule_id for rule_id, armed in expired if armed or ruleset.get(rule_id) is None]
+        deleted = 0
+        for i in range(0, len(stale_ids), _DELETE_CHUNK_SIZE):
+            chunk = stale_ids[i:i + _DELETE_CHUNK_SIZE]
+            deleted += self.db.execute(delete(AlertState).where(AlertState.rule_id.in_(chunk))).rowcount
+        if deleted:
+            logger.info(f"已清理 {deleted} 条过期的预警状态。")
+        return deleted
@@ -1,97 +1,200 @@
-import yaml
+import asyncio
 import logging
-from datetime import datetime, timedelta
-from app.services.tradingview_fetcher import get_stock_data
+import threading
+from datetime import datetime
+from app.core import config
+from app.db.database import SessionLocal
+from app.services.alert_rules import PRICE, PERCENT, RuleSet
+from app.services.alert_state import AlertStateStore
+from app.services.monitor_config import get_monitor_config, monitor_config
+from app.services.tradingview_fetcher import get_multiple_quotes, normalize_symbol
+from app.services.outbox import outbox_worker
 from app.services.pusher import push_price_alert
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-CONFIG_PATH = "monitor_config.yaml"
-# 用于防止重复发送预警的简单缓存
-_alert_cache = {}
-CACHE_DURATION = timedelta(hours=24) # 预警触发后，24小时内不再对同一规则发送
-
-def _is_in_cache(symbol: str, condition: str) -> bool:
-    """检查一个预警是否在缓存中且未过期。"""
-    key = f"{symbol}_{condition}"
-    if key in _alert_cache:
-        if datetime.now() - _alert_cache[key] < CACHE_DURATION:
-            return True
-    return False
-
-def _add_to_cache(symbol: str, condition: str):
-    """将一个预警添加到缓存中。"""
-    key = f"{symbol}_{condition}"
-    _alert_cache[key] = datetime.now()
-    logger.info(f"预警 '{key}' 已添加到缓存，在 {CACHE_DURATION} 内不再重复发送。")
+# 每个标的上一次的指标值，用于判断穿越类规则
+_last_metrics = {}
+# 轮询任务与推送流可能同时求值，用锁保证同一时刻只有一处在更新指标与预警状态
+_evaluate_lock = threading.Lock()
+# 正在运行的推送报价源；其连接正常时轮询任务跳过，断线期间轮询作为兜底
+_stream_source = None
 
-def check_price_alerts():
+def _on_config_reload(new_config):
     """
-    检查所有在配置文件中定义的股票价格预警。
+    监控配置重新加载后，丢弃已删除标的的上一次指标值。
+    否则标的删除后再加入时，会拿很久以前的值判断穿越，误报一次预警。
     """
-    logger.info("开始执行价格预警检查任务...")
+    configured = set(new_config.symbols)
+    for symbol in list(_last_metrics):
+        if symbol not in configured:
+            _last_metrics.pop(symbol, None)
+
+monitor_config.subscribe(_on_config_reload)
+
+def _indicator_metrics(symbol: str, price: float) -> dict:
+    """
+    按当前价格计算盘中指标值，只做 O(1) 的 engine.tick，不访问数据库或网络。
+    引擎由 warm_indicator_engine 定时推进；尚未预热的标的指标值为 None，指标规则不会触发。
+    """
+    from app.services.indicator_engine import get_indicator_engine
+    return get_indicator_engine().tick(normalize_symbol(symbol), price)
+
+def warm_indicator_engine():
+    """
+    定时任务：为带指标规则的标的增量同步本地K线并推进指标引擎，推进后保存引擎状态。
+    最后一根日K线尚未收盘，不推进引擎状态。在预警求值之外运行，不占用求值锁。
+    """
+    from app.services.bar_store import get_bars_df
+    from app.services.indicator_engine import get_indicator_engine, save_indicator_engine
+
+    ruleset = get_monitor_config().rules
+    engine = get_indicator_engine()
+    advanced = False
+    for symbol, screener in ruleset.symbols():
+        if not ruleset.needs_indicators(symbol):
+            continue
+        tv_symbol = normalize_symbol(symbol)
+        try:
+            df = get_bars_df(tv_symbol, screener or "america", timeout=config.MARKET_FETCH_TIMEOUT)
+        except Exception as e:
+            logger.error(f"预热 '{symbol}' 的技术指标时出错: {e}")
+            continue
+        if df is not None and len(df) > 1:
+            closed = df.iloc[:-1]
+            if engine.warm_up(tv_symbol, closed["Close"].to_numpy(), closed.index.as_unit("s").asi8) is not None:
+                advanced = True
+    if advanced:
+        # 推进到了新收盘的K线，立即落盘，进程异常退出时也不会丢失
+        save_indicator_engine()
+
+def evaluate_quote(ruleset: RuleSet, symbol: str, screener: str, quote: dict) -> list:
+    """
+    对一个标的的最新报价求值，返回 [(rule, value)]，并记录本次指标值供下一次穿越判断。
+    """
+    price = quote['last_price']
+    metrics = {PRICE: price, PERCENT: quote.get('change_percent')}
+    if ruleset.needs_indicators(symbol):
+        try:
+            metrics.update(_indicator_metrics(symbol, price))
+        except Exception as e:
+            logger.error(f"计算 '{symbol}' 的技术指标时出错，跳过指标规则: {e}")
+    previous = _last_metrics.get(symbol)
+    _last_metrics[symbol] = metrics
+    return ruleset.evaluate(symbol, metrics, previous)
+
+def process_quotes(ruleset: RuleSet, symbols: list, quotes: dict):
+    """
+    对一批报价求值并发送触发的预警。轮询任务与推送流共用此入口。
+
+    Args:
+        ruleset: 当前生效的规则集。
+        symbols: 本批需要求值的 (symbol, screener) 列表。
+        quotes: 以 normalize_symbol 后的 'EXCHANGE:SYMBOL' 为键的报价字典。
+    """
+    with _evaluate_lock:
+        _process_quotes(ruleset, symbols, quotes)
+
+def _process_quotes(ruleset: RuleSet, symbols: list, quotes: dict):
+    # 静默状态保存在数据库中：触发过的规则在比较值回撤超过滞后带之前不会重复发送
+    db = SessionLocal()
     try:
-        with open(CONFIG_PATH, 'r') as f:
-            config = yaml.safe_load(f)
-    except FileNotFoundError:
-        logger.warning(f"预警配置文件 '{CONFIG_PATH}' 未找到，跳过检查。")
-        return
+        store = AlertStateStore(db)
+        for symbol, screener in symbols:
+            try:
+                quote = quotes.get(normalize_symbol(symbol))
+
+                if not quote or quote.get('last_price') is None:
+                    logger.warning(f"未能获取到 '{symbol}' 的有效价格数据，跳过。")
+                    continue
+
+                current_price = quote['last_price']
+                logger.debug(f"'{symbol}' 的当前价格是: {current_price}")
+
+                triggered = evaluate_quote(ruleset, symbol, screener, quote)
+                store.rearm(ruleset, symbol, _last_metrics[symbol])
+                for rule, value in triggered:
+                    if not store.is_armed(rule):
+                        logger.info(f"预警 '{rule.id}' 处于静默状态，本次跳过。")
+                        continue
+                    logger.warning(f"触发预警！'{symbol}' {rule.label}，当前值 {value}。")
+                    alert_details = {
+                        "rule_id": rule.id,
+                        "symbol": symbol,
+                        "condition": rule.direction,
+                        "description": rule.label,
+                        "priority": rule.priority,
+                        "target_price": rule.threshold,
+                        "current_price": current_price,
+                        "current_value": value,
+                        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    }
+                    # 预警与静默状态在同一事务中提交：要么都写入，要么规则保持待触发，下次重新求值
+                    push_price_alert(alert_details, db)
+                    store.mark_fired(rule, value, current_price) # 推送后置为静默
+                db.commit()
+                if triggered:
+                    outbox_worker.wake()
+
+            except Exception as e:
+                db.rollback()
+                logger.error(f"处理 '{symbol}' 的预警时出错: {e}", exc_info=False) # 设置为False避免过多日志
+    finally:
+        db.close()
+
+def _cleanup_states(ruleset: RuleSet):
+    db = SessionLocal()
+    try:
+        AlertStateStore(db).cleanup(ruleset)
+        db.commit()
     except Exception as e:
-        logger.error(f"读取或解析配置文件 '{CONFIG_PATH}' 时出错: {e}")
-        return
+        db.rollback()
+        logger.error(f"清理预警状态时出错: {e}")
+    finally:
+        db.close()
 
-    alerts = config.get('price_alerts', [])
-    if not alerts:
+def check_price_alerts():
+    """
+    检查所有在配置文件中定义的预警规则。
+    """
+    logger.info("开始执行价格预警检查任务...")
+    ruleset = get_monitor_config().rules
+    if not ruleset:
         logger.info("配置文件中没有定义任何价格预警。")
         return
+    _cleanup_states(ruleset)
 
-    for alert_rule in alerts:
-        symbol = alert_rule.get('symbol')
-        condition = alert_rule.get('condition')
-        target_price = alert_rule.get('target_price')
-
-        if not all([symbol, condition, target_price]):
-            logger.warning(f"发现一条无效的预警规则，缺少关键字段: {alert_rule}")
-            continue
-
-        # 检查此预警是否在缓存中
-        if _is_in_cache(symbol, condition):
-            logger.info(f"预警 '{symbol} {condition} {target_price}' 已在缓存中，本次跳过。")
-            continue
+    if _stream_source is not None and _stream_source.is_healthy():
+        logger.info("推送报价源连接正常，跳过本次轮询。")
+        return
 
-        try:
-            logger.info(f"[TradingView] 正在获取 '{symbol}' 的最新价格...")
-            quote = get_stock_data(symbol)
-
-            if not quote or quote.get('last_price') is None:
-                logger.warning(f"未能获取到 '{symbol}' 的有效价格数据，跳过。")
-                continue
-
-            current_price = quote['last_price']
-            logger.info(f"'{symbol}' 的当前价格是: {current_price}")
-
-            triggered = False
-            if condition == 'above' and current_price > target_price:
-                triggered = True
-            elif condition == 'below' and current_price < target_price:
-                triggered = True
-
-            if triggered:
-                logger.warning(f"触发预警！'{symbol}' 当前价格 {current_price} 已 {condition} 目标价格 {target_price}。")
-                alert_details = {
-                    "symbol": symbol,
-                    "condition": condition,
-                    "target_price": target_price,
-                    "current_price": current_price,
-                    "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                push_price_alert(alert_details)
-                _add_to_cache(symbol, condition) # 推送成功后添加到缓存
+    # 所有规则共用同一份报价快照，每个 screener 只请求一次
+    symbols = ruleset.symbols()
+    logger.info(f"[TradingView] 正在批量获取 {len(symbols)} 个标的的最新价格...")
+    quotes = get_multiple_quotes(symbols)
+    process_quotes(ruleset, symbols, quotes)
 
-        except Exception as e:
-            logger.error(f"处理 '{symbol}' 的预警时出错: {e}", exc_info=False) # 设置为False避免过多日志
+async def run_alert_stream(source):
+    """
+    消费报价来源推送的报价，每批报价到达后立即在线程池中求值，不阻塞事件循环。
+    求值期间到达的报价由来源按标的合并，只保留最新一笔。
+    """
+    global _stream_source
+    _stream_source = source
+    logger.info(f"预警报价来源: {source.name}")
+    try:
+        async for quotes in source.ticks(lambda: get_monitor_config().rules.symbols()):
+            # 推送源按订阅时的原始代码返回报价，统一为与轮询相同的键
+            quotes = {normalize_symbol(symbol): quote for symbol, quote in quotes.items()}
+            ruleset = get_monitor_config().rules
+            symbols = [(symbol, screener) for symbol, screener in ruleset.symbols()
+                       if normalize_symbol(symbol) in quotes]
+            if symbols:
+                await asyncio.to_thread(process_quotes, ruleset, symbols, quotes)
+    finally:
+        _stream_source = None
 
 if __name__ == '__main__':
     # 用于直接运行测试
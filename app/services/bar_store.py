@@ -0,0 +1,162 @@
+import logging
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from tradingview_ta import Interval
+from app.core import config
+from app.core.cache import TTLCache
+from app.db.database import SessionLocal
+from app.models.bar import Bar
+from app.services import tradingview_fetcher
+from app.services.tradingview_fetcher import DEFAULT_SCREENER, DEFAULT_EXCHANGE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INTERVAL_SECONDS = {
+    Interval.INTERVAL_1_MINUTE: 60,
+    Interval.INTERVAL_5_MINUTES: 5 * 60,
+    Interval.INTERVAL_15_MINUTES: 15 * 60,
+    Interval.INTERVAL_30_MINUTES: 30 * 60,
+    Interval.INTERVAL_1_HOUR: 3600,
+    Interval.INTERVAL_2_HOURS: 2 * 3600,
+    Interval.INTERVAL_4_HOURS: 4 * 3600,
+    Interval.INTERVAL_1_DAY: 86400,
+    Interval.INTERVAL_1_WEEK: 7 * 86400,
+    Interval.INTERVAL_1_MONTH: 28 * 86400,
+}
+
+# 每次增量同步时额外重取的K线数，用于覆盖最后一根尚未收盘的K线
+TAIL_OVERLAP_BARS = 2
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# 同一标的在 BAR_SYNC_INTERVAL 内只同步一次，并发的同步请求会被合并
+_sync_cache = TTLCache(maxsize=config.TV_CACHE_MAXSIZE, ttl=config.BAR_SYNC_INTERVAL, name="bar-sync")
+
+
+def _last_ts(db: Session, symbol: str, exchange: str, interval: str):
+    return db.execute(
+        select(func.max(Bar.ts)).where(
+            Bar.symbol == symbol, Bar.exchange == exchange, Bar.interval == interval)
+    ).scalar()
+
+
+def _bars_needed(last_ts, interval: str, lookback: int, now: float) -> int:
+    """计算需要从上游获取的K线数：首次为完整回溯，之后只取缺失的尾部。"""
+    if last_ts is None:
+        return lookback
+    missing = int((now - last_ts) // INTERVAL_SECONDS[interval])
+    return max(1, min(lookback, missing + TAIL_OVERLAP_BARS))
+
+
+def _frame_to_rows(df: pd.DataFrame, symbol: str, exchange: str, interval: str) -> list[dict]:
+    index = pd.to_datetime(df.index)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    timestamps = index.as_unit("s").asi8
+    rows = []
+    for ts, values in zip(timestamps, df[PRICE_COLUMNS].itertuples(index=False, name=None)):
+        open_, high, low, close, volume = values
+        rows.append({
+            "symbol": symbol, "exchange": exchange, "interval": interval, "ts": int(ts),
+            "open": open_, "high": high, "low": low, "close": close, "volume": volume,
+        })
+    return rows
+
+
+def upsert_bars(db: Session, df: pd.DataFrame, symbol: str, exchange: str, interval: str) -> int:
+    """将K线写入本地存储，相同时间戳的K线被新数据覆盖。返回写入的行数，不提交事务。"""
+    rows = _frame_to_rows(df, symbol, exchange, interval)
+    if not rows:
+        return 0
+    stmt = sqlite_insert(Bar)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Bar.symbol, Bar.exchange, Bar.interval, Bar.ts],
+        set_={c: stmt.excluded[c] for c in ("open", "high", "low", "close", "volume")},
+    )
+    db.execute(stmt, rows)
+    return len(rows)
+
+
+def sync_bars(db: Session, symbol: str, screener=DEFAULT_SCREENER, exchange=DEFAULT_EXCHANGE,
+              interval=Interval.INTERVAL_1_DAY, lookback: int = None, timeout=None, now: float = None) -> int:
+    """
+    同步某个标的的本地K线：首次回溯 lookback 根，之后只获取缺失的尾部并合并。
+
+    Returns:
+        本次写入（新增或覆盖）的K线数。
+    """
+    lookback = config.BAR_STORE_LOOKBACK if lookback is None else lookback
+    now = time.time() if now is None else now
+    n_bars = _bars_needed(_last_ts(db, symbol, exchange, interval), interval, lookback, now)
+
+    df = tradingview_fetcher.fetch_hist(symbol, screener, exchange, interval, n_bars=n_bars, timeout=timeout)
+    if df is None:
+        return 0
+    written = upsert_bars(db, df, symbol, exchange, interval)
+    db.commit()
+    logger.info(f"[BarStore] {symbol} {interval}: 请求 {n_bars} 根，写入 {written} 根。")
+    return written
+
+
+def _select_bars(db: Session, symbol: str, exchange: str, interval: str, limit: int = None):
+    stmt = (select(Bar.ts, Bar.open, Bar.high, Bar.low, Bar.close, Bar.volume)
+            .where(Bar.symbol == symbol, Bar.exchange == exchange, Bar.interval == interval)
+            .order_by(Bar.ts.desc()))
+    if limit:
+        stmt = stmt.limit(limit)
+    rows = db.execute(stmt).all()
+    rows.reverse()
+    return rows
+
+
+def read_bars_array(db: Session, symbol: str, exchange=DEFAULT_EXCHANGE,
+                    interval=Interval.INTERVAL_1_DAY, limit: int = None):
+    """
+    从本地存储读取K线，不访问网络。
+
+    Returns:
+        (ts, ohlcv)：ts 为 int64 时间戳数组，ohlcv 为形状 (n, 5) 的 float64 数组。
+    """
+    rows = _select_bars(db, symbol, exchange, interval, limit)
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.float64)
+    data = np.asarray(rows, dtype=np.float64)
+    return data[:, 0].astype(np.int64), data[:, 1:]
+
+
+def read_bars(db: Session, symbol: str, exchange=DEFAULT_EXCHANGE,
+              interval=Interval.INTERVAL_1_DAY, limit: int = None) -> pd.DataFrame:
+    """从本地存储读取K线为 DataFrame（以 UTC 时间为索引），不访问网络。无数据时返回 None。"""
+    ts, ohlcv = read_bars_array(db, symbol, exchange, interval, limit)
+    if len(ts) == 0:
+        return None
+    index = pd.to_datetime(ts, unit="s")
+    index.name = "datetime"
+    return pd.DataFrame(ohlcv, index=index, columns=PRICE_COLUMNS)
+
+
+def get_bars_df(symbol: str, screener=DEFAULT_SCREENER, exchange=DEFAULT_EXCHANGE,
+                interval=Interval.INTERVAL_1_DAY, limit: int = None, timeout=None) -> pd.DataFrame:
+    """
+    返回某个标的最近 limit 根K线。必要时先做一次增量同步（每个标的每 BAR_SYNC_INTERVAL 秒最多一次），
+    同步失败时仍返回本地已有的数据。limit 默认为 BAR_STORE_LOOKBACK。
+    symbol 可以带交易所前缀（'NYSE:DOCN'），此时以前缀为准，exchange 参数只用于不带前缀的代码。
+    """
+    limit = config.BAR_STORE_LOOKBACK if limit is None else limit
+    exchange, _, symbol = tradingview_fetcher.normalize_symbol(symbol, exchange).partition(":")
+    key = (symbol, exchange, interval)
+    db = SessionLocal()
+    try:
+        try:
+            _sync_cache.get_or_load(key, lambda: sync_bars(db, symbol, screener, exchange, interval, timeout=timeout))
+        except Exception as e:
+            db.rollback()
+            logger.error(f"[BarStore] 同步 {symbol} 的K线失败，使用本地数据: {e}")
+        return read_bars(db, symbol, exchange, interval, limit)
+    finally:
+        db.close()
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from app.core import config
+from app.services.login_manager import SESSION_DIR, login_to_x
+
+logger = logging.getLogger(__name__)
+
+# 各站点用于判断登录态的关键 Cookie
+AUTH_COOKIES = {
+    'x': 'auth_token',
+}
+
+# 各站点的完整登录态验证方式: (访问地址, 代表已登录的元素)
+VERIFY_TARGETS = {
+    'x': ("https://x.com", '[data-testid="primaryColumn"]'),
+}
+
+
+def is_session_state_valid(storage_state: dict, site_name: str, now: float = None) -> bool:
+    """
+    仅根据会话状态中的 Cookie 判断登录是否可能仍然有效，不发起任何网络请求。
+
+    Args:
+        storage_state: Playwright 的 storage_state 字典。
+        site_name: 网站标识符 (例如, 'x')。
+        now: 当前时间戳，默认为 time.time()。
+
+    Returns:
+        关键 Cookie 存在且未过期时返回 True。
+    """
+    cookie_name = AUTH_COOKIES.get(site_name)
+    if not cookie_name or not storage_state:
+        return False
+    now = time.time() if now is None else now
+    for cookie in storage_state.get('cookies', []):
+        if cookie.get('name') != cookie_name or not cookie.get('value'):
+            continue
+        expires = cookie.get('expires', -1)
+        # expires 为 -1 表示会话 Cookie，只要浏览器上下文存活就有效
+        if expires is None or expires < 0 or expires > now:
+            return True
+    return False
+
+
+class BrowserPool:
+    """
+    与进程同生命周期的 Playwright 浏览器池。
+
+    浏览器只启动一次，每个站点保留一个已登录的浏览器上下文。所有 Playwright
+    对象都绑定在池自己的后台事件循环上，调用方通过 run() 提交协程。
+    """
+
+    def __init__(self, headless: bool = True, session_ttl: int = None):
+        self.headless = headless
+        self.session_ttl = config.BROWSER_SESSION_TTL if session_ttl is None else session_ttl
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        self._contexts = {}  # site_name -> {"context": ..., "verified_at": ...}
+        self._start_lock = threading.Lock()
+        self._context_lock = None
+
+    # --- 事件循环管理 ---
+
+    def start(self):
+        """启动后台事件循环线程（幂等）。"""
+        with self._start_lock:
+            if self._loop is not None and self._loop.is_running():
+                return
+            self._loop = asyncio.new_event_loop()
+            self._context_lock = None
+            ready = threading.Event()
+
+            def _run_loop():
+                asyncio.set_event_loop(self._loop)
+                self._loop.call_soon(ready.set)
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(target=_run_loop, name="browser-pool", daemon=True)
+            self._thread.start()
+            ready.wait()
+            logger.info("浏览器池事件循环已启动。")
+
+    def submit(self, coro):
+        """将协程提交到池的事件循环，返回 concurrent.futures.Future。"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro, timeout: float = None):
+        """在池的事件循环上执行协程并阻塞等待结果。"""
+        return self.submit(coro).result(timeout)
+
+    # --- 浏览器与上下文 ---
+
+    async def _ensure_browser(self):
+        if self._browser is not None and self._browser.is_connected():
+            return self._browser
+        if self._browser is not None:
+            logger.warning("浏览器连接已断开，正在重新启动...")
+            self._contexts.clear()
+        if self._playwright is None:
+            # Playwright 较重，首次启动浏览器时才导入
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        logger.info("Chromium 已启动。")
+        return self._browser
+
+    async def _verify_login(self, context, site_name: str) -> bool:
+        """完整验证：打开站点首页并等待已登录元素出现。"""
+        url, selector = VERIFY_TARGETS[site_name]
+        page = await context.new_page()
+        try:
+            await page.goto(url, wait_until='domcontentloaded')
+            await page.wait_for_selector(selector, timeout=30000)
+            return True
+        except Exception as e:
+            logger.warning(f"{site_name} 会话验证失败: {e}")
+            return False
+        finally:
+            await page.close()
+
+    async def _login(self, browser, site_name: str, session_path: str):
+        if site_name != 'x':
+            raise ValueError(f"不支持的网站: {site_name}")
+        context = await browser.new_context()
+        page = await context.new_page()
+        try:
+            await login_to_x(page)
+        except Exception:
+            await context.close()
+            raise
+        await page.close()
+        os.makedirs(SESSION_DIR, exist_ok=True)
+        await context.storage_state(path=session_path)
+        logger.info(f"新的 {site_name} 会话已保存到 {session_path}")
+        return context
+
+    async def _get_context(self, site_name: str):
+        if self._context_lock is None:
+            self._context_lock = asyncio.Lock()
+        async with self._context_lock:
+            browser = await self._ensure_browser()
+            session_path = os.path.join(SESSION_DIR, f"{site_name}_session.json")
+            entry = self._contexts.get(site_name)
+            now = time.time()
+
+            if entry is not None:
+                state = await entry["context"].storage_state()
+                if is_session_state_valid(state, site_name, now):
+                    if now - entry["verified_at"] < self.session_ttl:
+                        return entry["context"]
+                    # TTL 到期，做一次完整验证
+                    if await self._verify_login(entry["context"], site_name):
+                        entry["verified_at"] = now
+                        return entry["context"]
+                logger.info(f"{site_name} 的常驻会话已失效，重新建立...")
+                await self._drop_context(site_name)
+
+            context = None
+            if os.path.exists(session_path):
+                logger.info(f"找到 {site_name} 的会话文件，正在加载...")
+                context = await browser.new_context(storage_state=session_path)
+                state = await context.storage_state()
+                if not (is_session_state_valid(state, site_name, now)
+                        and await self._verify_login(context, site_name)):
+                    await context.close()
+                    context = None
+
+            if context is None:
+                logger.info("未找到有效会话，开始执行登录...")
+                context = await self._login(browser, site_name, session_path)
+
+            self._contexts[site_name] = {"context": context, "verified_at": time.time()}
+            return context
+
+    async def _drop_context(self, site_name: str):
+        entry = self._contexts.pop(site_name, None)
+        if entry is not None:
+            try:
+                await entry["context"].close()
+            except Exception as e:
+                logger.warning(f"关闭 {site_name} 浏览器上下文时出错: {e}")
+
+    @asynccontextmanager
+    async def page(self, site_name: str):
+        """
+        从池中借出一个已登录站点的新页面，使用完毕后自动关闭页面（上下文保留）。
+        必须在池的事件循环上使用。
+        """
+        context = await self._get_context(site_name)
+        page = await context.new_page()
+        try:
+            yield page
+        finally:
+            if not page.is_closed():
+                await page.close()
+
+    async def invalidate(self, site_name: str):
+        """丢弃某站点的常驻上下文，下次借用时重新验证或登录。"""
+        await self._drop_context(site_name)
+
+    async def _close(self):
+        for site_name in list(self._contexts):
+            await self._drop_context(site_name)
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def close(self):
+        """关闭浏览器并停止后台事件循环。"""
+        with self._start_lock:
+            if self._loop is None:
+                return
+            if self._loop.is_running():
+                try:
+                    asyncio.run_coroutine_threadsafe(self._close(), self._loop).result(30)
+                except Exception as e:
+                    logger.error(f"关闭浏览器池时出错: {e}")
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+            logger.info("浏览器池已关闭。")
+
+
+# 进程级单例
+browser_pool = BrowserPool()
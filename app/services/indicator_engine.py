@@ -0,0 +1,270 @@
+import json
+import logging
+import os
+import threading
+from collections import deque
+from app.core import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 各指标的计算方式与 pandas_ta 保持一致:
+#   RSI  -> rma (ewm(alpha=1/length, adjust=True, min_periods=length)) 平滑的涨跌幅
+#   MACD -> 以前 length 个值的 SMA 为种子、之后按 ewm(span=length, adjust=False) 递推的 EMA
+#   SMA  -> rolling(length).mean()
+RSI_LENGTH = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+SMA_LENGTHS = (20, 50)
+
+
+class _AdjustedEwm:
+    """ewm(alpha, adjust=True) 的增量版本：分别累积加权和与权重和。"""
+
+    def __init__(self, alpha: float, min_periods: int, num: float = 0.0, den: float = 0.0, count: int = 0):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.num = num
+        self.den = den
+        self.count = count
+
+    def _next(self, x: float):
+        decay = 1.0 - self.alpha
+        return x + decay * self.num, 1.0 + decay * self.den, self.count + 1
+
+    def _value(self, num, den, count):
+        return num / den if count >= self.min_periods else None
+
+    def update(self, x: float):
+        self.num, self.den, self.count = self._next(x)
+        return self._value(self.num, self.den, self.count)
+
+    def peek(self, x: float):
+        return self._value(*self._next(x))
+
+    def to_dict(self):
+        return {"num": self.num, "den": self.den, "count": self.count}
+
+
+class _SeededEma:
+    """以前 length 个值的简单平均作为种子的 EMA (pandas_ta 的 ema 默认行为)。"""
+
+    def __init__(self, length: int, value: float = None, seed_sum: float = 0.0, count: int = 0):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.value = value
+        self.seed_sum = seed_sum
+        self.count = count
+
+    def _next(self, x: float):
+        count = self.count + 1
+        if count < self.length:
+            return None, self.seed_sum + x, count
+        if count == self.length:
+            seed_sum = self.seed_sum + x
+            return seed_sum / self.length, seed_sum, count
+        return self.value + self.alpha * (x - self.value), self.seed_sum, count
+
+    def update(self, x: float):
+        self.value, self.seed_sum, self.count = self._next(x)
+        return self.value
+
+    def peek(self, x: float):
+        return self._next(x)[0]
+
+    def to_dict(self):
+        return {"value": self.value, "seed_sum": self.seed_sum, "count": self.count}
+
+
+class _RollingMean:
+    """固定窗口的滑动平均，维护窗口内的累加和。"""
+
+    def __init__(self, length: int, window=None):
+        self.length = length
+        self.window = deque(window or [], maxlen=length)
+        self.total = sum(self.window)
+
+    def _next_total(self, x: float):
+        evicted = self.window[0] if len(self.window) == self.length else 0.0
+        return self.total + x - evicted, min(len(self.window) + 1, self.length)
+
+    def update(self, x: float):
+        self.total, size = self._next_total(x)
+        self.window.append(x)
+        return self.total / self.length if size == self.length else None
+
+    def peek(self, x: float):
+        total, size = self._next_total(x)
+        return total / self.length if size == self.length else None
+
+    def to_dict(self):
+        return {"window": list(self.window)}
+
+
+class IndicatorState:
+    """
+    单个标的的技术指标运行状态。每根新K线 update() 一次，盘中报价用 peek() 计算，均为 O(1)。
+    """
+
+    def __init__(self):
+        self.last_ts = None
+        self.prev_close = None
+        self.gain = _AdjustedEwm(1.0 / RSI_LENGTH, RSI_LENGTH)
+        self.loss = _AdjustedEwm(1.0 / RSI_LENGTH, RSI_LENGTH)
+        self.fast = _SeededEma(MACD_FAST)
+        self.slow = _SeededEma(MACD_SLOW)
+        self.signal = _SeededEma(MACD_SIGNAL)
+        self.smas = {length: _RollingMean(length) for length in SMA_LENGTHS}
+
+    @staticmethod
+    def _result(close, gain, loss, fast, slow, signal_of, smas):
+        rsi = None
+        if gain is not None and loss is not None and gain + loss > 0:
+            rsi = 100.0 * gain / (gain + loss)
+        macd = fast - slow if fast is not None and slow is not None else None
+        signal = signal_of(macd) if macd is not None else None
+        result = {
+            "Close": close,
+            f"RSI_{RSI_LENGTH}": rsi,
+            f"MACD_{MACD_FAST}_{MACD_SLOW}_{MACD_SIGNAL}": macd,
+            f"MACDh_{MACD_FAST}_{MACD_SLOW}_{MACD_SIGNAL}": macd - signal if signal is not None else None,
+            f"MACDs_{MACD_FAST}_{MACD_SLOW}_{MACD_SIGNAL}": signal,
+        }
+        result.update({f"SMA_{length}": value for length, value in smas.items()})
+        return result
+
+    def update(self, close: float, ts: int = None) -> dict:
+        """以一根已收盘的K线推进状态。ts 不大于上一根K线时间的数据被忽略并返回 None。"""
+        if ts is not None and self.last_ts is not None and ts <= self.last_ts:
+            return None
+        gain = loss = None
+        if self.prev_close is not None:
+            change = close - self.prev_close
+            gain = self.gain.update(max(change, 0.0))
+            loss = self.loss.update(max(-change, 0.0))
+        self.prev_close = close
+        if ts is not None:
+            self.last_ts = ts
+        return self._result(
+            close, gain, loss, self.fast.update(close), self.slow.update(close),
+            self.signal.update, {length: sma.update(close) for length, sma in self.smas.items()})
+
+    def peek(self, price: float) -> dict:
+        """假设当前K线以 price 收盘时的指标值，不改变状态（用于盘中报价）。"""
+        gain = loss = None
+        if self.prev_close is not None:
+            change = price - self.prev_close
+            gain = self.gain.peek(max(change, 0.0))
+            loss = self.loss.peek(max(-change, 0.0))
+        return self._result(
+            price, gain, loss, self.fast.peek(price), self.slow.peek(price),
+            self.signal.peek, {length: sma.peek(price) for length, sma in self.smas.items()})
+
+    def to_dict(self) -> dict:
+        return {
+            "last_ts": self.last_ts,
+            "prev_close": self.prev_close,
+            "gain": self.gain.to_dict(),
+            "loss": self.loss.to_dict(),
+            "fast": self.fast.to_dict(),
+            "slow": self.slow.to_dict(),
+            "signal": self.signal.to_dict(),
+            "smas": {str(length): sma.to_dict() for length, sma in self.smas.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IndicatorState":
+        state = cls()
+        state.last_ts = data["last_ts"]
+        state.prev_close = data["prev_close"]
+        state.gain = _AdjustedEwm(1.0 / RSI_LENGTH, RSI_LENGTH, **data["gain"])
+        state.loss = _AdjustedEwm(1.0 / RSI_LENGTH, RSI_LENGTH, **data["loss"])
+        state.fast = _SeededEma(MACD_FAST, **data["fast"])
+        state.slow = _SeededEma(MACD_SLOW, **data["slow"])
+        state.signal = _SeededEma(MACD_SIGNAL, **data["signal"])
+        state.smas = {length: _RollingMean(length, data["smas"][str(length)]["window"])
+                      for length in SMA_LENGTHS}
+        return state
+
+
+class IndicatorEngine:
+    """按标的维护 IndicatorState，线程安全，可保存为 JSON 文件以便重启后恢复。"""
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _state(self, symbol: str) -> IndicatorState:
+        state = self._states.get(symbol)
+        if state is None:
+            state = self._states[symbol] = IndicatorState()
+        return state
+
+    def update(self, symbol: str, close: float, ts: int = None) -> dict:
+        """推进一根已收盘的K线，返回最新指标。"""
+        with self._lock:
+            return self._state(symbol).update(close, ts)
+
+    def tick(self, symbol: str, price: float) -> dict:
+        """基于盘中报价计算指标，不改变状态。"""
+        with self._lock:
+            return self._state(symbol).peek(price)
+
+    def warm_up(self, symbol: str, closes, timestamps=None) -> dict:
+        """用历史收盘价推进状态；带时间戳时只处理比已有状态更新的K线。返回最后一次有效结果。"""
+        result = None
+        with self._lock:
+            state = self._state(symbol)
+            if timestamps is None:
+                timestamps = [None] * len(closes)
+            for ts, close in zip(timestamps, closes):
+                latest = state.update(float(close), None if ts is None else int(ts))
+                if latest is not None:
+                    result = latest
+        return result
+
+    def last_ts(self, symbol: str):
+        with self._lock:
+            state = self._states.get(symbol)
+            return state.last_ts if state else None
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {symbol: state.to_dict() for symbol, state in self._states.items()}
+
+    def save(self, path: str):
+        """原子地将所有标的的状态写入 JSON 文件。"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IndicatorEngine":
+        """从 JSON 文件恢复；文件不存在或损坏时返回空引擎。"""
+        engine = cls()
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            engine._states = {symbol: IndicatorState.from_dict(state) for symbol, state in data.items()}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"加载指标状态文件 '{path}' 失败，将从空状态开始: {e}")
+        return engine
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_indicator_engine() -> IndicatorEngine:
+    """返回进程内共享的指标引擎，首次调用时从 INDICATOR_STATE_PATH 恢复状态。"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = IndicatorEngine.load(config.INDICATOR_STATE_PATH)
+        return _engine
+
+def save_indicator_engine():
+    """将共享指标引擎的状态写回 INDICATOR_STATE_PATH。"""
+    if _engine is not None:
+        _engine.save(config.INDICATOR_STATE_PATH)
@@ -1,53 +1,9 @@
 import os
-from playwright.async_api import async_playwright, Browser
 from app.core import config
 
+# 登录会话文件的保存目录，由 browser_pool 读写
 SESSION_DIR = "sessions"
 
-async def get_logged_in_page(playwright, site_name: str) -> Browser:
-    """
-    获取一个已登录的Playwright页面对象。
-    如果存在有效的会话文件，则加载它；否则，执行登录并保存会话。
-
-    Args:
-        playwright: async_playwright的实例。
-        site_name: 网站标识符 (例如, 'x')。
-
-    Returns:
-        一个已经登录的Playwright页面对象。
-    """
-    session_path = os.path.join(SESSION_DIR, f"{site_name}_session.json")
-    browser = await playwright.chromium.launch(headless=True)
-    context = None
-
-    if os.path.exists(session_path):
-        print(f"找到 {site_name} 的会话文件，正在加载...")
-        try:
-            context = await browser.new_context(storage_state=session_path)
-            page = await context.new_page()
-            # 验证登录是否仍然有效
-            await page.goto("https://x.com", wait_until='domcontentloaded')
-            # 等待一个明确的、代表已登录的元素出现，比如“主页”时间线
-            await page.wait_for_selector('[data-testid="primaryColumn"]', timeout=30000)
-            print("会话有效，登录成功！")
-            return page
-        except Exception as e:
-            print(f"加载会话失败: {e}，将执行手动登录。")
-            if context:
-                await context.close()
-
-    # 如果没有有效的会话，执行登录
-    print("未找到有效会话，开始执行首次登录...")
-    if site_name == 'x':
-        page = await browser.new_page()
-        await login_to_x(page)
-        # 保存会话状态
-        await page.context.storage_state(path=session_path)
-        print(f"新的 {site_name} 会话已保存到 {session_path}")
-        return page
-    else:
-        raise ValueError(f"不支持的网站: {site_name}")
-
 import logging
 from datetime import datetime
 
@@ -55,8 +11,6 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-# ... (get_logged_in_page function)
-
 async def login_to_x(page):
     """
     执行登录X的具体操作，采用模拟键盘回车的方式进行提交。
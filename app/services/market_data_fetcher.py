@@ -1,67 +1,141 @@
 import logging
-import yaml
-from app.services.tradingview_fetcher import get_index_data, get_stock_data_as_df
-from app.services.quant_analyzer import add_technical_indicators
+import math
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait
+from app.core import config
+from app.services.tradingview_fetcher import get_index_data
+from app.services.bar_store import get_bars_df
+from app.services.monitor_config import get_monitor_config
+from app.services.quant_analyzer import build_close_panel, compute_indicator_panel
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 市场摘要共用的抓取线程池；对 TradingView 的实际并发由 tradingview_fetcher 限制
+_fetch_executor = ThreadPoolExecutor(max_workers=config.MARKET_FETCH_WORKERS,
+                                     thread_name_prefix="market-fetch")
+
+INDICES = {
+    "S&P 500": ("SPX", "america", "TVC"),
+    "Nasdaq 100": ("NDX", "america", "TVC"),
+}
+
+def _gather(tasks: dict, deadline: float) -> dict:
+    """
+    并发执行一组任务，在截止时间内收集结果。
+    超时或出错的任务结果为 None，不会拖慢其他任务。
+
+    Args:
+        tasks: {key: (func, args, kwargs)}
+        deadline: 整个阶段的截止时间（秒）。
+    """
+    futures = {_fetch_executor.submit(func, *args, **kwargs): key
+               for key, (func, args, kwargs) in tasks.items()}
+    done, not_done = wait(futures, timeout=deadline)
+
+    results = {key: None for key in tasks}
+    for future in done:
+        key = futures[future]
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            logger.error(f"获取 '{key}' 的数据时出错: {e}")
+    for future in not_done:
+        future.cancel()
+        logger.warning(f"获取 '{futures[future]}' 的数据超过 {deadline} 秒，本次跳过。")
+    return results
+
+def fetch_histories(symbols, timeout: float = None, deadline: float = None) -> dict:
+    """
+    并发获取多个标的的历史K线（经由本地K线存储，只增量同步缺失的尾部）。
+
+    Args:
+        symbols: 标的列表。
+        timeout: 单个标的请求的超时时间（秒），默认为 config.MARKET_FETCH_TIMEOUT。
+        deadline: 整个抓取阶段的截止时间（秒），默认为 config.MARKET_SUMMARY_DEADLINE。
+
+    Returns:
+        {symbol: DataFrame 或 None}
+    """
+    timeout = config.MARKET_FETCH_TIMEOUT if timeout is None else timeout
+    deadline = config.MARKET_SUMMARY_DEADLINE if deadline is None else deadline
+    tasks = {symbol: (get_bars_df, (symbol,), {"timeout": timeout}) for symbol in symbols}
+    return _gather(tasks, deadline)
+
+def _to_float(value):
+    """将 NumPy 数值转换为模板可直接使用的 float，NaN 转为 None。"""
+    value = float(value)
+    return None if math.isnan(value) else value
+
+def _daily_change(closes: np.ndarray):
+    """
+    由价格面板最后两列计算每个标的的涨跌额与涨跌幅（百分比，与 TradingView 的 change 一致）。
+    K线不足两根或前一收盘价为 0 时结果为 NaN。
+    """
+    if closes.shape[1] < 2:
+        missing = np.full(closes.shape[0], np.nan)
+        return missing, missing
+    last, prev = closes[:, -1], closes[:, -2]
+    change = last - prev
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_percent = np.where(prev != 0, change / prev * 100, np.nan)
+    return change, change_percent
+
 def get_market_summary():
     """
     获取市场摘要数据，包括主要指数和用户监控的个股。
+    指数与个股历史数据并发获取，单个标的超时只会使其缺失，不会阻塞整个摘要。
     """
     try:
         logger.info("正在通过 TradingView 获取市场摘要...")
 
-        # --- 获取主要股指信息 ---
-        sp500_data = get_index_data("SPX", "america", "TVC")
-        nasdaq_data = get_index_data("NDX", "america", "TVC")
+        symbols = get_monitor_config().symbols
 
-        indices = {
-            "S&P 500": sp500_data,
-            "Nasdaq 100": nasdaq_data,
-        }
+        # --- 并发获取主要股指信息与个股历史K线 ---
+        # 每个请求都带超时：_gather 只能取消尚未开始的任务，已在运行的请求必须自行超时才能释放线程与并发名额
+        tasks = {name: (get_index_data, args, {"timeout": config.MARKET_FETCH_TIMEOUT})
+                 for name, args in INDICES.items()}
+        tasks.update({("stock", symbol): (get_bars_df, (symbol,), {"timeout": config.MARKET_FETCH_TIMEOUT})
+                      for symbol in symbols})
+        results = _gather(tasks, config.MARKET_SUMMARY_DEADLINE)
+
+        indices = {name: results[name] for name in INDICES}
 
-        # --- 获取用户监控的个股信息并计算指标 ---
+        # --- 计算个股技术指标：所有标的组成价格面板后一次性向量化计算 ---
         logger.info("获取用户监控的个股列表并计算技术指标...")
         monitored_stocks = []
         try:
-            with open("monitor_config.yaml", 'r') as f:
-                config = yaml.safe_load(f)
-                symbols = [alert['symbol'] for alert in config.get('price_alerts', [])]
-                for symbol in symbols:
-                    df = get_stock_data_as_df(symbol)
-                    if df is not None and not df.empty:
-                        df_with_indicators = add_technical_indicators(df)
-                        if df_with_indicators is not None:
-                            latest_data = df_with_indicators.iloc[-1].to_dict()
-                            # 提取并格式化需要的数据
-                            monitored_stocks.append({
-                                "symbol": symbol,
-                                "name": latest_data.get("description", symbol), # TradingView TA 库可能不直接提供 name
-                                "last_price": latest_data.get("Close"),
-                                "change": latest_data.get("change"),
-                                "change_percent": latest_data.get("change_percent|1D"),
-                                "RSI": latest_data.get("RSI_14"),
-                                "MACD": latest_data.get("MACD_12_26_9"),
-                                "MACD_signal": latest_data.get("MACDs_12_26_9"),
-                                "SMA_20": latest_data.get("SMA_20"),
-                                "SMA_50": latest_data.get("SMA_50"),
-                            })
-        except FileNotFoundError:
-            logger.warning("monitor_config.yaml 未找到，不加载个股数据。")
+            frames = {symbol: results[("stock", symbol)] for symbol in symbols}
+            valid_symbols, closes = build_close_panel(frames)
+            latest = compute_indicator_panel(closes, latest_only=True,
+                                             processes=config.INDICATOR_PROCESSES)
+            change, change_percent = _daily_change(closes)
+            for row, symbol in enumerate(valid_symbols):
+                # 提取并格式化需要的数据
+                monitored_stocks.append({
+                    "symbol": symbol,
+                    "name": symbol, # TradingView TA 库可能不直接提供 name
+                    "last_price": _to_float(closes[row, -1]),
+                    "change": _to_float(change[row]),
+                    "change_percent": _to_float(change_percent[row]),
+                    "RSI": _to_float(latest["RSI_14"][row]),
+                    "MACD": _to_float(latest["MACD_12_26_9"][row]),
+                    "MACD_signal": _to_float(latest["MACDs_12_26_9"][row]),
+                    "SMA_20": _to_float(latest["SMA_20"][row]),
+                    "SMA_50": _to_float(latest["SMA_50"][row]),
+                })
         except Exception as e:
-            logger.error(f"加载或获取个股数据时出错: {e}", exc_info=True)
+            logger.error(f"计算个股技术指标时出错: {e}", exc_info=True)
 
         logger.info("成功获取到市场摘要数据。")
-        
+
         summary_data = {
             "indices": indices,
             "monitored_stocks": monitored_stocks,
         }
-        
+
         return summary_data
 
     except Exception as e:
         logger.error(f"获取市场摘要失败: {e}", exc_info=True)
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from app.core import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    """一次成功计算的市场摘要。version 每次刷新成功后递增，fetched_at 为计算完成的时间戳。"""
+    data: dict
+    version: int
+    fetched_at: float
+
+    def age(self, now: float = None) -> float:
+        """数据年龄（秒）。"""
+        return max(0.0, (time.time() if now is None else now) - self.fetched_at)
+
+
+def _load_market_summary():
+    # pandas、TradingView 等依赖只在第一次刷新时导入
+    from app.services.market_data_fetcher import get_market_summary
+    return get_market_summary()
+
+
+class MarketSnapshotService:
+    """
+    后台刷新的市场摘要快照，仪表盘与邮件任务共用。
+
+    读取方立即得到最近一次成功的快照；快照过期时触发后台刷新（stale-while-revalidate）。
+    同一时刻最多只有一个刷新在运行，并发的读取方共享它的结果；刷新失败时保留上一次的快照。
+    """
+
+    def __init__(self, loader=_load_market_summary, max_age: float = None, clock=time.time):
+        self._loader = loader
+        self.max_age = config.MARKET_SNAPSHOT_MAX_AGE if max_age is None else max_age
+        self._clock = clock
+        self._snapshot = None
+        self._version = 0
+        self._inflight = None  # 正在运行的刷新完成时置位的 Event
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.last_error = None
+
+    def current(self) -> MarketSnapshot:
+        """最近一次成功的快照，不触发刷新；从未成功时为 None。"""
+        return self._snapshot
+
+    @property
+    def refreshing(self) -> bool:
+        return self._inflight is not None
+
+    def get(self) -> MarketSnapshot:
+        """立即返回当前快照（可能为 None 或已过期）；过期或缺失时在后台启动刷新。"""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.age(self._clock()) > self.max_age:
+            self._start_refresh()
+        return snapshot
+
+    def get_fresh(self, max_age: float = None, timeout: float = None) -> MarketSnapshot:
+        """
+        返回不超过 max_age 秒的快照；当前快照过期时等待一次刷新（最多 timeout 秒）。
+        刷新失败或超时时返回上一次的快照。
+        """
+        max_age = self.max_age if max_age is None else max_age
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.age(self._clock()) <= max_age:
+            return snapshot
+        return self.refresh(timeout)
+
+    def refresh(self, timeout: float = None) -> MarketSnapshot:
+        """启动（或加入正在运行的）刷新并等待其完成，最多 timeout 秒。"""
+        self._start_refresh().wait(timeout)
+        return self._snapshot
+
+    def _start_refresh(self) -> threading.Event:
+        with self._lock:
+            if self._inflight is None:
+                self._inflight = threading.Event()
+                threading.Thread(target=self._run, args=(self._inflight,),
+                                 name="market-snapshot", daemon=True).start()
+            return self._inflight
+
+    def _run(self, done: threading.Event):
+        try:
+            self.refreshes += 1
+            data = self._loader()
+            if data is None:
+                raise RuntimeError("未能获取市场摘要数据")
+            with self._lock:
+                self._version += 1
+                self._snapshot = MarketSnapshot(data, self._version, self._clock())
+            self.last_error = None
+            logger.info(f"市场快照已刷新至版本 {self._version}。")
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"刷新市场快照失败，继续使用上一次的快照: {e}")
+        finally:
+            with self._lock:
+                self._inflight = None
+            done.set()
+
+
+# 进程级单例
+market_snapshot = MarketSnapshotService()
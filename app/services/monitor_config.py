@@ -0,0 +1,118 @@
+import logging
+import os
+import threading
+import time
+import yaml
+from app.core import config
+from app.services.alert_rules import RuleSet, parse_rule
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 有 libyaml 时使用 C 实现的安全加载器，大规则文件的解析速度快数倍
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class MonitorConfig:
+    """
+    一次成功加载的 monitor_config.yaml 快照。发布后不再修改，消费者可以放心地长期持有。
+    """
+
+    def __init__(self, rules: RuleSet, version: int = 0, loaded_at: float = None):
+        self.rules = rules
+        self.version = version
+        self.loaded_at = time.time() if loaded_at is None else loaded_at
+        # 保持配置中的顺序并去重
+        self.symbols = list(dict.fromkeys(rule.symbol for rule in rules.rules))
+
+
+EMPTY_CONFIG = MonitorConfig(RuleSet(), version=0, loaded_at=0.0)
+
+
+def parse_monitor_config(data, version: int = 0) -> MonitorConfig:
+    """
+    校验并编译配置内容。任意一条规则不合法时抛出 ValueError，错误信息包含所有问题，
+    避免一条坏规则让其他规则悄悄失效。
+    """
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        raise ValueError("配置文件顶层必须是字典")
+    raw_rules = data.get('price_alerts') or []
+    if not isinstance(raw_rules, list):
+        raise ValueError("'price_alerts' 必须是列表")
+
+    rules, errors = RuleSet(), []
+    for i, raw in enumerate(raw_rules):
+        try:
+            rules.add(parse_rule(raw))
+        except ValueError as e:
+            errors.append(f"price_alerts[{i}]: {e}")
+    if errors:
+        raise ValueError("; ".join(errors))
+    return MonitorConfig(rules, version)
+
+
+class MonitorConfigService:
+    """
+    按需加载 monitor_config.yaml：只有文件的 (inode, mtime, size) 变化时才重新解析，
+    新配置校验通过后整体替换并通知订阅者；校验失败时记录错误，继续使用上一次的有效配置。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._current = EMPTY_CONFIG
+        self._signature = None
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    @staticmethod
+    def _stat_signature(path: str):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def get(self) -> MonitorConfig:
+        """返回当前有效配置；文件有变化时先重新加载。"""
+        signature = self._stat_signature(self.path)
+        if signature != self._signature:
+            self._reload(signature)
+        return self._current
+
+    def subscribe(self, callback):
+        """注册回调，每次发布新配置时以新的 MonitorConfig 调用。"""
+        self._subscribers.append(callback)
+
+    def _reload(self, signature):
+        with self._lock:
+            # 等锁期间可能已被其他线程加载
+            if signature == self._signature:
+                return
+            self._signature = signature
+            if signature is None:
+                logger.warning(f"监控配置文件 '{self.path}' 不存在，继续使用当前配置。")
+                return
+            try:
+                with open(self.path, 'r') as f:
+                    data = yaml.load(f, Loader=_YAML_LOADER)
+                new_config = parse_monitor_config(data, self._current.version + 1)
+            except Exception as e:
+                logger.error(f"监控配置文件 '{self.path}' 无效，继续使用版本 {self._current.version} 的配置: {e}")
+                return
+            self._current = new_config
+            logger.info(f"已加载监控配置版本 {new_config.version}，共 {len(new_config.rules)} 条预警规则。")
+        for callback in list(self._subscribers):
+            try:
+                callback(new_config)
+            except Exception as e:
+                logger.error(f"通知监控配置订阅者时出错: {e}")
+
+
+# 进程级单例
+monitor_config = MonitorConfigService(config.MONITOR_CONFIG_PATH)
+
+def get_monitor_config() -> MonitorConfig:
+    """返回当前有效的监控配置。"""
+    return monitor_config.get()
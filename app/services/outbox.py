@@ -0,0 +1,231 @@
+import logging
+import threading
+import time
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.core import config
+from app.core.rate_limit import KeyedRateLimiter
+from app.db.database import SessionLocal
+from app.models.outbox import OutboxMessage, PENDING, SENDING, SENT, DEAD, PRIORITY_NORMAL, PRIORITY_CRITICAL
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(subject: str, content: str, idempotency_key: str, recipients=None,
+                  db: Session = None, now: float = None, priority: int = PRIORITY_NORMAL) -> bool:
+    """
+    将一封已渲染的邮件写入发件箱并唤醒投递线程，不做任何网络操作。
+    每个收件人一条消息，以便按收件人限流；相同幂等键的邮件只会入队一次。
+    传入 db 时只写入、不提交，由调用方与其他修改一起提交后再调用 outbox_worker.wake()。
+
+    Returns:
+        本次是否有新消息入队。
+    """
+    recipients = config.MAIL_TO if recipients is None else recipients
+    now = int(time.time() if now is None else now)
+    own_session = db is None
+    db = SessionLocal() if own_session else db
+    try:
+        stmt = sqlite_insert(OutboxMessage).on_conflict_do_nothing(index_elements=[OutboxMessage.idempotency_key])
+        rows = [{
+            "idempotency_key": f"{idempotency_key}:{recipient}", "subject": subject, "content": content,
+            "recipients": recipient, "priority": priority, "status": PENDING, "attempts": 0,
+            "next_attempt_at": now, "created_at": now,
+        } for recipient in recipients]
+        inserted = sum(db.execute(stmt.values(row)).rowcount for row in rows) > 0
+        if own_session:
+            db.commit()
+    finally:
+        if own_session:
+            db.close()
+    if inserted:
+        logger.info(f"邮件 '{subject}' 已进入发件箱。")
+        if own_session:
+            outbox_worker.wake()
+    else:
+        logger.info(f"幂等键 '{idempotency_key}' 的邮件已在发件箱中，跳过。")
+    return inserted
+
+
+def retry_delay(attempts: int) -> float:
+    """第 attempts 次失败后的等待时间：指数退避，有上限。"""
+    return min(config.OUTBOX_RETRY_BASE * 2 ** (attempts - 1), config.OUTBOX_RETRY_MAX)
+
+
+def _deliver_via_smtp(subject: str, content: str, recipients: list):
+    from app.services.pusher import build_message, get_smtp_pool
+    get_smtp_pool().send(config.MAIL_FROM, recipients, build_message(subject, content, recipients))
+
+
+def create_recipient_limiter() -> KeyedRateLimiter:
+    """每个收件人每小时最多 MAIL_RATE_PER_HOUR 封，可短时突发 MAIL_RATE_BURST 封。"""
+    return KeyedRateLimiter(config.MAIL_RATE_PER_HOUR / 3600.0, config.MAIL_RATE_BURST)
+
+
+def deliver_due(db: Session, send=None, now: float = None, limit: int = None, limiter: KeyedRateLimiter = None) -> dict:
+    """
+    按优先级投递到期的待发送消息。失败的消息按指数退避重新排期，超过最大尝试次数后进入死信。
+    给定 limiter 时按收件人限流：超出额度的普通消息推迟到有令牌时再发，紧急消息直接发送（透支额度）。
+
+    Args:
+        db: 数据库会话。
+        send: 投递函数 send(subject, content, recipients)，失败时抛出异常；默认通过 SMTP 连接池发送。
+        now: 当前时间戳。
+        limit: 本次最多处理的消息数，默认为 OUTBOX_BATCH_SIZE。
+        limiter: 收件人限流器，为 None 时不限流。
+
+    Returns:
+        {"sent": n, "retry": n, "dead": n, "throttled": n}
+    """
+    send = _deliver_via_smtp if send is None else send
+    now = time.time() if now is None else now
+    limit = config.OUTBOX_BATCH_SIZE if limit is None else limit
+    result = {"sent": 0, "retry": 0, "dead": 0, "throttled": 0}
+
+    due = db.execute(
+        select(OutboxMessage)
+        .where(OutboxMessage.status == PENDING, OutboxMessage.next_attempt_at <= int(now))
+        .order_by(OutboxMessage.priority.desc(), OutboxMessage.next_attempt_at, OutboxMessage.id)
+        .limit(limit)
+    ).scalars().all()
+
+    for message in due:
+        if limiter is not None:
+            wait = limiter.acquire(message.recipients, force=message.priority >= PRIORITY_CRITICAL)
+            if wait > 0:
+                # 超出收件人额度：推迟而不计为失败
+                message.next_attempt_at = int(now + max(1.0, wait))
+                db.commit()
+                result["throttled"] += 1
+                continue
+        # 先标记为发送中再投递；进程在投递过程中退出的消息会在下次启动时重新排队
+        claimed = db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id == message.id, OutboxMessage.status == PENDING)
+            .values(status=SENDING)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            continue
+        try:
+            send(message.subject, message.content, message.recipients.split(","))
+        except Exception as e:
+            message.attempts += 1
+            message.last_error = str(e)[:1000]
+            if message.attempts >= config.OUTBOX_MAX_ATTEMPTS:
+                message.status = DEAD
+                result["dead"] += 1
+                logger.error(f"邮件 '{message.subject}' 投递 {message.attempts} 次均失败，已转入死信: {e}")
+            else:
+                message.status = PENDING
+                message.next_attempt_at = int(now + retry_delay(message.attempts))
+                result["retry"] += 1
+                logger.warning(f"邮件 '{message.subject}' 第 {message.attempts} 次投递失败，"
+                               f"{retry_delay(message.attempts):.0f} 秒后重试: {e}")
+        else:
+            message.status = SENT
+            message.sent_at = int(now)
+            result["sent"] += 1
+            logger.info(f"邮件 '{message.subject}' 投递成功。")
+        db.commit()
+    return result
+
+
+def requeue_in_flight(db: Session) -> int:
+    """将上次进程退出时仍处于发送中的消息重新排队（至少投递一次）。"""
+    count = db.execute(update(OutboxMessage).where(OutboxMessage.status == SENDING).values(status=PENDING)).rowcount
+    db.commit()
+    if count:
+        logger.warning(f"{count} 条上次未完成投递的邮件已重新排队。")
+    return count
+
+
+def purge_sent(db: Session, now: float = None, retention: float = None) -> int:
+    """删除超过保留期的已投递消息。死信保留，便于排查。"""
+    now = time.time() if now is None else now
+    retention = config.OUTBOX_RETENTION if retention is None else retention
+    count = db.execute(
+        delete(OutboxMessage).where(OutboxMessage.status == SENT, OutboxMessage.sent_at < int(now - retention))
+    ).rowcount
+    db.commit()
+    return count
+
+
+class OutboxWorker:
+    """
+    后台投递线程。有新消息入队时立即被唤醒，否则每 OUTBOX_POLL_INTERVAL 秒检查一次到期的重试。
+    每轮投递前先调用 collect(db)，把合并窗口已结束的待合并预警渲染为邮件入队。
+    只应在 leader 进程中启动。
+    """
+
+    def __init__(self, session_factory=SessionLocal, send=None, poll_interval: float = None, limiter=None,
+                 collect=None):
+        self._session_factory = session_factory
+        self._send = send
+        self._collect = collect
+        self._limiter = create_recipient_limiter() if limiter is None else limiter
+        self.poll_interval = config.OUTBOX_POLL_INTERVAL if poll_interval is None else poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        db = self._session_factory()
+        try:
+            requeue_in_flight(db)
+        finally:
+            db.close()
+        self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+        self._thread.start()
+        logger.info("发件箱投递线程已启动。")
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout: float = 10):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("发件箱投递线程已停止。")
+
+    def _collect_pending(self, db: Session):
+        # 合并失败（例如模板渲染出错）不影响已入队邮件的投递，待合并记录保留到下一轮重试
+        collect = self._collect
+        if collect is None:
+            from app.services.pusher import flush_pending_alerts as collect
+        try:
+            collect(db)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"合并待发送的价格预警出错: {e}", exc_info=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            db = self._session_factory()
+            try:
+                self._collect_pending(db)
+                # 一批处理满时说明可能还有积压，继续处理
+                while not self._stop.is_set():
+                    result = deliver_due(db, self._send, limiter=self._limiter)
+                    if result["sent"] + result["retry"] + result["dead"] < config.OUTBOX_BATCH_SIZE:
+                        break
+                purge_sent(db)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"发件箱投递出错: {e}", exc_info=True)
+            finally:
+                db.close()
+            self._wake.wait(self.poll_interval)
+
+
+# 进程级单例
+outbox_worker = OutboxWorker()
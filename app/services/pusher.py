@@ -1,12 +1,21 @@
-import smtplib
+import hashlib
+import json
 import logging
+import threading
+import time
 from email.mime.text import MIMEText
 from email.header import Header
 from jinja2 import Environment, FileSystemLoader
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
 from app.core import config
+from app.core.smtp_pool import SMTPPool
+from app.services import alert_rules
+from app.services.outbox import enqueue_email, outbox_worker
+from app.models.outbox import PendingAlert, PRIORITY_CRITICAL
 from app.db.database import SessionLocal
 from app.models.item import Item
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -15,34 +24,45 @@ logger = logging.getLogger(__name__)
 # 初始化Jinja2环境
 env = Environment(loader=FileSystemLoader('app/templates'))
 
-def send_email(subject, content):
-    """
-    发送邮件
-    """
+_smtp_pool = None
+_smtp_pool_lock = threading.Lock()
+
+def get_smtp_pool() -> SMTPPool:
+    """返回进程内共享的 SMTP 连接池，首次调用时按配置创建。"""
+    global _smtp_pool
+    with _smtp_pool_lock:
+        if _smtp_pool is None:
+            _smtp_pool = SMTPPool(
+                config.MAIL_SERVER, config.MAIL_PORT, config.MAIL_USERNAME, config.MAIL_PASSWORD,
+                use_tls=config.MAIL_USE_TLS, max_size=config.SMTP_POOL_SIZE, timeout=config.SMTP_TIMEOUT,
+                idle_timeout=config.SMTP_IDLE_TIMEOUT, noop_after=config.SMTP_NOOP_AFTER,
+            )
+        return _smtp_pool
+
+def build_message(subject, content, to_addrs=None) -> str:
+    """构造 HTML 邮件正文。"""
+    to_addrs = config.MAIL_TO if to_addrs is None else to_addrs
+    message = MIMEText(content, 'html', 'utf-8')
+    message['From'] = Header(f"热点推送 <{config.MAIL_FROM}>", 'utf-8')
+    message['To'] = Header(",".join(to_addrs), 'utf-8')
+    message['Subject'] = Header(subject, 'utf-8')
+    return message.as_string()
+
+def _enqueue(subject, content, idempotency_key):
+    """将渲染好的邮件放入发件箱，由后台投递线程发送；本函数不等待网络。"""
     try:
-        logger.info(f"准备发送邮件至: {', '.join(config.MAIL_TO)}")
-        message = MIMEText(content, 'html', 'utf-8')
-        message['From'] = Header(f"热点推送 <{config.MAIL_FROM}>", 'utf-8')
-        message['To'] = Header(",".join(config.MAIL_TO), 'utf-8')
-        message['Subject'] = Header(subject, 'utf-8')
-
-        logger.info(f"正在连接邮件服务器: {config.MAIL_SERVER}:{config.MAIL_PORT}")
-        # 增加超时设置 (例如, 30秒)
-        with smtplib.SMTP(config.MAIL_SERVER, config.MAIL_PORT, timeout=30) as server:
-            logger.info("服务器连接成功，启动TLS...")
-            server.starttls()
-            logger.info("TLS启动成功，正在登录...")
-            server.login(config.MAIL_USERNAME, config.MAIL_PASSWORD)
-            logger.info("登录成功，正在发送邮件...")
-            server.sendmail(config.MAIL_FROM, config.MAIL_TO, message.as_string())
-            logger.info("邮件发送成功！")
+        enqueue_email(subject, content, idempotency_key)
     except Exception as e:
-        logger.error(f"邮件发送失败: {e}", exc_info=True)
+        logger.error(f"邮件 '{subject}' 写入发件箱失败: {e}", exc_info=True)
 
-def push_email(items: list[Item]):
+def push_email(items: list[Item], rising: list = None):
     """
-    接收一个项目列表，并使用Jinja2模板发送邮件。
+    接收一个项目列表，使用Jinja2模板渲染后放入发件箱。
     这个函数现在是 scraper 直接调用的函数。
+
+    Args:
+        items: 新条目列表。
+        rising: 可选的上升最快条目 [(Item, 动量)]，动量需有 velocity 属性。
     """
     if not items:
         logger.info("没有新的热点条目需要推送。")
@@ -58,11 +78,14 @@ def push_email(items: list[Item]):
         content = template.render(
             subject=subject,
             items=items,
+            rising=rising or [],
             timestamp=timestamp
         )
         logger.info("邮件内容渲染完成。")
 
-        send_email(subject, content)
+        # 同一批条目只推送一次
+        digest = hashlib.sha1("\n".join(sorted(item.url for item in items)).encode()).hexdigest()
+        _enqueue(subject, content, f"hotspots:{digest}")
 
     except Exception as e:
         logger.error(f"创建邮件内容失败: {e}", exc_info=True)
@@ -73,45 +96,50 @@ def _push_hotspots_from_db():
     (内部测试用)查询数据库中的热点并发送邮件。
     """
     logger.info("开始执行邮件推送任务...")
+    from app.services.trend_ranking import rising_items
     db = SessionLocal()
     try:
-        logger.info("正在查询数据库中的热点...")
-        one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-        items = (db.query(Item)
-            .filter(Item.updated_at >= one_hour_ago)
-            .order_by(Item.hot_score.desc())
-            .limit(30).all())
-        logger.info(f"查询到 {len(items)} 条热点。")
-
-        if not items:
+        # 按热度上升速度而不是累计热度排序，让正在爆发的话题排在常青话题之前
+        logger.info("正在查询上升最快的热点...")
+        rising = rising_items(db, limit=30)
+        logger.info(f"查询到 {len(rising)} 条热点。")
+
+        if not rising:
             logger.info("无新热点，任务结束。")
             return
         
-        push_email(items)
+        push_email([item for item, _ in rising], rising=rising)
 
     finally:
         logger.info("关闭数据库会话。")
         db.close()
 
-from app.services.market_data_fetcher import get_market_summary
-
-
 def push_market_summary():
     """
-    获取市场摘要并发送邮件。
+    获取市场摘要，渲染后放入发件箱。
     """
+    # 与金融仪表盘共用同一份快照：快照足够新时直接使用，否则等待一次刷新
+    from app.services.market_snapshot import market_snapshot
+
     logger.info("开始执行每日市场摘要推送任务...")
-    summary_data = get_market_summary()
+    snapshot = market_snapshot.get_fresh(timeout=config.MARKET_SUMMARY_DEADLINE * 2)
 
-    if not summary_data:
-        logger.warning("未能获取市场摘要数据，任务终止。")
+    if snapshot is None:
+        logger.warning(f"未能获取市场摘要数据，任务终止。最近一次刷新错误: {market_snapshot.last_error}")
+        return
+    # 刷新失败或超时时 get_fresh 返回上一次的快照，过旧时不发送
+    age = snapshot.age()
+    if age > config.MARKET_SUMMARY_MAX_STALENESS:
+        logger.warning(f"市场快照已有 {age:.0f} 秒未更新，跳过本次摘要邮件。"
+                       f"最近一次刷新错误: {market_snapshot.last_error}")
         return
+    summary_data = snapshot.data
 
     try:
         logger.info("正在使用Jinja2模板渲染市场摘要邮件...")
         template = env.get_template('market_summary_email.html')
         subject = f"[{datetime.now().strftime('%Y-%m-%d')}] 每日市场摘要"
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        timestamp = datetime.fromtimestamp(snapshot.fetched_at).strftime('%Y-%m-%d %H:%M:%S')
 
         content = template.render(
             subject=subject,
@@ -120,28 +148,83 @@ def push_market_summary():
         )
         logger.info("市场摘要邮件内容渲染完成。")
 
-        send_email(subject, content)
+        # 同一分钟内重复触发的摘要只推送一次
+        _enqueue(subject, content, f"market_summary:{datetime.now().strftime('%Y-%m-%d %H:%M')}")
 
     except Exception as e:
         logger.error(f"创建市场摘要邮件失败: {e}", exc_info=True)
 
 
-def push_price_alert(alert: dict):
+def _price_alert_email(alerts: list) -> tuple:
+    """单条预警使用原有模板，多条预警渲染为汇总邮件。返回 (subject, content, idempotency_key)。"""
+    if len(alerts) == 1:
+        alert = alerts[0]
+        template = env.get_template('price_alert_email.html')
+        if alert.get('description'):
+            subject = f"价格预警: {alert['symbol']} {alert['description']}"
+        else:
+            subject = f"价格预警: {alert['symbol']} 已 {alert['condition']} {alert['target_price']}"
+        content = template.render(alert=alert)
+        return subject, content, f"price_alert:{alert.get('rule_id', alert['symbol'])}:{alert['timestamp']}"
+
+    template = env.get_template('price_alert_digest_email.html')
+    symbols = sorted({alert['symbol'] for alert in alerts})
+    subject = f"价格预警汇总: {len(alerts)} 条预警 ({', '.join(symbols[:5])}{' 等' if len(symbols) > 5 else ''})"
+    content = template.render(alerts=alerts, subject=subject,
+                              timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    digest = hashlib.sha1("\n".join(
+        f"{alert.get('rule_id', alert['symbol'])}:{alert['timestamp']}" for alert in alerts).encode()).hexdigest()
+    return subject, content, f"price_alert_digest:{digest}"
+
+
+def push_price_alert(alert: dict, db: Session = None):
     """
-    接收一个价格预警字典，并使用Jinja2模板发送邮件。
+    接收一个价格预警字典，写入持久化存储。critical 预警立即以高优先级放入发件箱；
+    普通预警写入 pending_alerts，由投递线程在 ALERT_COALESCE_WINDOW 结束后合并为一封汇总邮件。
+
+    传入 db 时只写入、不提交：调用方应把预警与预警状态（静默）放在同一个事务中提交，
+    提交后调用 outbox_worker.wake()，这样进程在任何时刻退出都不会出现规则已静默而预警丢失的情况。
     """
-    logger.info(f"准备推送价格预警邮件: {alert['symbol']}")
+    own_session = db is None
+    db = SessionLocal() if own_session else db
     try:
-        template = env.get_template('price_alert_email.html')
-        subject = f"价格预警: {alert['symbol']} 已 {alert['condition']} {alert['target_price']}"
-        
-        content = template.render(alert=alert)
-        logger.info("价格预警邮件内容渲染完成。")
+        if alert.get('priority') == alert_rules.PRIORITY_CRITICAL:
+            subject, content, idempotency_key = _price_alert_email([alert])
+            enqueue_email(subject, content, idempotency_key, db=db, priority=PRIORITY_CRITICAL)
+        else:
+            db.add(PendingAlert(payload=json.dumps(alert, ensure_ascii=False), created_at=int(time.time())))
+        logger.info(f"价格预警 '{alert.get('rule_id', alert['symbol'])}' 已记录，等待发送。")
+        if own_session:
+            db.commit()
+    finally:
+        if own_session:
+            db.close()
+    if own_session:
+        outbox_worker.wake()
 
-        send_email(subject, content)
 
-    except Exception as e:
-        logger.error(f"创建价格预警邮件失败: {e}", exc_info=True)
+def flush_pending_alerts(db: Session, now: float = None, window: float = None) -> int:
+    """
+    合并窗口（从最早一条待合并预警触发时起算）结束后，把所有待合并预警渲染为一封邮件写入发件箱，
+    并在同一事务中删除这些记录。window 为 0 时逐条发送。由发件箱投递线程每轮调用。
+
+    Returns:
+        本次发出的预警条数。
+    """
+    now = int(time.time() if now is None else now)
+    window = config.ALERT_COALESCE_WINDOW if window is None else window
+    rows = db.execute(select(PendingAlert).order_by(PendingAlert.id)).scalars().all()
+    if not rows or rows[0].created_at > now - window:
+        return 0
+    alerts = [json.loads(row.payload) for row in rows]
+    batches = [[alert] for alert in alerts] if window <= 0 else [alerts]
+    for batch in batches:
+        subject, content, idempotency_key = _price_alert_email(batch)
+        enqueue_email(subject, content, idempotency_key, db=db, now=now)
+    db.execute(delete(PendingAlert).where(PendingAlert.id.in_([row.id for row in rows])))
+    db.commit()
+    logger.info(f"{len(alerts)} 条价格预警已合并为 {len(batches)} 封邮件放入发件箱。")
+    return len(alerts)
 
 
 if __name__ == '__main__':
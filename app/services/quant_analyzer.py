@@ -1,6 +1,7 @@
 import pandas as pd
-import pandas_ta as ta
+import numpy as np
 import logging
+from concurrent.futures import ProcessPoolExecutor
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -18,7 +19,10 @@ def add_technical_indicators(df: pd.DataFrame):
     """
     if df is None or df.empty:
         return None
-        
+
+    # 导入 pandas_ta 时才会注册 df.ta 访问器；该库加载较慢，只在首次使用时导入
+    import pandas_ta  # noqa: F401
+
     try:
         # 计算 RSI (14)
         df.ta.rsi(length=14, append=True)
@@ -37,6 +41,127 @@ def add_technical_indicators(df: pd.DataFrame):
         logger.error(f"计算技术指标时出错: {e}", exc_info=True)
         return None
 
+# --- 多标的向量化指标计算 ---
+#
+# 价格面板为形状 (标的数, K线数) 的二维数组，历史较短的标的在左侧以 NaN 填充。
+# 沿时间轴逐列递推，每一步对所有标的同时做数组运算；计算公式与 pandas_ta 一致。
+
+PANEL_COLUMNS = ["RSI_14", "MACD_12_26_9", "MACDh_12_26_9", "MACDs_12_26_9", "SMA_20", "SMA_50"]
+
+def build_close_panel(frames: dict, column: str = "Close"):
+    """
+    将 {symbol: DataFrame} 的收盘价右对齐拼成价格面板。
+
+    Returns:
+        (symbols, panel)：symbols 为标的列表，panel 为 (len(symbols), 最长K线数) 的 float64 数组。
+    """
+    symbols = [symbol for symbol, df in frames.items() if df is not None and not df.empty]
+    width = max((len(frames[symbol]) for symbol in symbols), default=0)
+    panel = np.full((len(symbols), width), np.nan)
+    for row, symbol in enumerate(symbols):
+        values = frames[symbol][column].to_numpy(dtype=np.float64)
+        panel[row, width - len(values):] = values
+    return symbols, panel
+
+def _rma_panel(x: np.ndarray, length: int) -> np.ndarray:
+    """ewm(alpha=1/length, adjust=True, min_periods=length)，逐行忽略 NaN。"""
+    decay = 1.0 - 1.0 / length
+    out = np.full(x.shape, np.nan)
+    num = np.zeros(x.shape[0])
+    den = np.zeros(x.shape[0])
+    count = np.zeros(x.shape[0], dtype=np.int64)
+    for t in range(x.shape[1]):
+        col = x[:, t]
+        valid = ~np.isnan(col)
+        num = np.where(valid, np.where(valid, col, 0.0) + decay * num, num)
+        den = np.where(valid, 1.0 + decay * den, den)
+        count += valid
+        ready = valid & (count >= length)
+        out[ready, t] = num[ready] / den[ready]
+    return out
+
+def _ema_panel(x: np.ndarray, length: int) -> np.ndarray:
+    """以每行前 length 个有效值的 SMA 为种子、再按 span=length 递推的 EMA。"""
+    alpha = 2.0 / (length + 1)
+    out = np.full(x.shape, np.nan)
+    value = np.full(x.shape[0], np.nan)
+    seed_sum = np.zeros(x.shape[0])
+    count = np.zeros(x.shape[0], dtype=np.int64)
+    for t in range(x.shape[1]):
+        col = x[:, t]
+        valid = ~np.isnan(col)
+        count += valid
+        seeding = valid & (count <= length)
+        seed_sum[seeding] += col[seeding]
+        seeded = valid & (count == length)
+        value[seeded] = seed_sum[seeded] / length
+        running = valid & (count > length)
+        value[running] += alpha * (col[running] - value[running])
+        ready = valid & (count >= length)
+        out[ready, t] = value[ready]
+    return out
+
+def _sma_panel(x: np.ndarray, length: int) -> np.ndarray:
+    """滑动平均，窗口内必须全部为有效值。"""
+    valid = ~np.isnan(x)
+    padded = np.zeros((x.shape[0], x.shape[1] + 1))
+    padded[:, 1:] = np.cumsum(np.where(valid, x, 0.0), axis=1)
+    counts = np.zeros_like(padded)
+    counts[:, 1:] = np.cumsum(valid, axis=1)
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= length:
+        window_sum = padded[:, length:] - padded[:, :-length]
+        window_count = counts[:, length:] - counts[:, :-length]
+        out[:, length - 1:] = np.where(window_count == length, window_sum / length, np.nan)
+    return out
+
+def _compute_panel(closes: np.ndarray) -> dict:
+    diff = np.diff(closes, axis=1, prepend=np.nan)
+    gain = np.where(np.isnan(diff), np.nan, np.clip(diff, 0.0, None))
+    loss = np.where(np.isnan(diff), np.nan, np.clip(-diff, 0.0, None))
+    avg_gain = _rma_panel(gain, 14)
+    avg_loss = _rma_panel(loss, 14)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rsi = 100.0 * avg_gain / (avg_gain + avg_loss)
+
+    macd = _ema_panel(closes, 12) - _ema_panel(closes, 26)
+    signal = _ema_panel(macd, 9)
+    return {
+        "RSI_14": rsi,
+        "MACD_12_26_9": macd,
+        "MACDh_12_26_9": macd - signal,
+        "MACDs_12_26_9": signal,
+        "SMA_20": _sma_panel(closes, 20),
+        "SMA_50": _sma_panel(closes, 50),
+    }
+
+def compute_indicator_panel(closes, latest_only: bool = False, processes: int = None,
+                            chunk_size: int = 64) -> dict:
+    """
+    对 (标的数, K线数) 的收盘价面板一次性计算 RSI、MACD、信号线与 SMA。
+
+    Args:
+        closes: 二维收盘价数组，左侧可用 NaN 填充。
+        latest_only: 为 True 时每个指标只返回最后一根K线的值，形状为 (标的数,)。
+        processes: 大于 1 时按 chunk_size 个标的一组分发到进程池并行计算。
+        chunk_size: 进程池模式下每个任务包含的标的数。
+
+    Returns:
+        {指标列名: ndarray}，列名与 pandas_ta 一致 (见 PANEL_COLUMNS)。
+    """
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    if processes and processes > 1 and closes.shape[0] > chunk_size:
+        chunks = [closes[i:i + chunk_size] for i in range(0, closes.shape[0], chunk_size)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            parts = list(pool.map(_compute_panel, chunks))
+        result = {name: np.concatenate([part[name] for part in parts]) for name in PANEL_COLUMNS}
+    else:
+        result = _compute_panel(closes)
+
+    if latest_only:
+        return {name: values[:, -1] for name, values in result.items()}
+    return result
+
 if __name__ == '__main__':
     # 用于直接运行测试的示例代码
     data = {
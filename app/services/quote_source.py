@@ -0,0 +1,213 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from app.core import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class QuoteSource(ABC):
+    """
+    报价来源接口。
+
+    ticks(symbols_provider) 是一个异步迭代器，持续产出 {symbol: quote} 批次，quote 与
+    tradingview_fetcher.get_multiple_quotes 返回的格式相同。symbols_provider 每次调用返回当前需要的
+    (symbol, screener) 列表，配置变化后来源会自动调整订阅。
+    """
+
+    name = "base"
+
+    def is_healthy(self) -> bool:
+        """来源当前是否能及时提供报价；不健康时调用方应退回轮询。"""
+        return False
+
+    @abstractmethod
+    def ticks(self, symbols_provider):
+        """持续产出报价批次的异步迭代器。"""
+
+
+class PollingQuoteSource(QuoteSource):
+    """按固定间隔批量请求 TradingView 报价。"""
+
+    name = "poll"
+
+    def __init__(self, interval: float = 60, fetch=None):
+        self.interval = interval
+        self._fetch = fetch
+
+    def get_quotes(self, symbols) -> dict:
+        fetch = self._fetch
+        if fetch is None:
+            from app.services.tradingview_fetcher import get_multiple_quotes as fetch
+        return fetch(symbols)
+
+    def is_healthy(self) -> bool:
+        return True
+
+    async def ticks(self, symbols_provider):
+        while True:
+            symbols = symbols_provider()
+            if symbols:
+                yield await asyncio.to_thread(self.get_quotes, symbols)
+            await asyncio.sleep(self.interval)
+
+
+def parse_tick(message) -> dict:
+    """
+    解析推送源的一条消息为报价字典，不是报价的消息（如订阅确认、心跳）返回 None。
+    报价消息格式: {"symbol": "AAPL", "price": 231.5, "change_percent": 1.2, "ts": 1718000000}
+    """
+    try:
+        data = json.loads(message)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(data, dict) or not data.get("symbol"):
+        return None
+    price = data.get("price", data.get("last_price"))
+    if not isinstance(price, (int, float)) or isinstance(price, bool):
+        return None
+    return {
+        "symbol": data["symbol"],
+        "last_price": float(price),
+        "change": data.get("change"),
+        "change_percent": data.get("change_percent"),
+        "ts": data.get("ts"),
+    }
+
+
+class _ConflatingBuffer:
+    """
+    推送源与求值之间的缓冲区。每个标的只保留最新一笔报价，求值跟不上推送速度时旧报价被合并丢弃，
+    因此内存占用以订阅的标的数为上限，读取连接的协程永远不会被求值阻塞。
+    """
+
+    def __init__(self):
+        self._latest = {}
+        self._ready = asyncio.Event()
+        self.conflated = 0
+
+    def put(self, quote: dict):
+        if quote["symbol"] in self._latest:
+            self.conflated += 1
+        self._latest[quote["symbol"]] = quote
+        self._ready.set()
+
+    async def drain(self) -> dict:
+        await self._ready.wait()
+        batch, self._latest = self._latest, {}
+        self._ready.clear()
+        return batch
+
+
+class StreamingQuoteSource(QuoteSource):
+    """
+    基于 WebSocket 推送的报价来源。
+
+    连接后发送 {"action": "subscribe", "symbols": [...]}，之后服务器逐笔推送报价。断线后按指数退避
+    （带随机抖动）自动重连并重新订阅；订阅的标的集合变化时发送新的订阅消息。
+    """
+
+    name = "stream"
+
+    def __init__(self, url: str, reconnect_min: float = None, reconnect_max: float = None,
+                 resubscribe_interval: float = 1.0, stale_after: float = None):
+        self.url = url
+        self.reconnect_min = config.QUOTE_STREAM_RECONNECT_MIN if reconnect_min is None else reconnect_min
+        self.reconnect_max = config.QUOTE_STREAM_RECONNECT_MAX if reconnect_max is None else reconnect_max
+        self.resubscribe_interval = resubscribe_interval
+        self.stale_after = config.QUOTE_STREAM_STALE_AFTER if stale_after is None else stale_after
+        self.connected = False
+        self.connected_at = None
+        self.connections = 0
+        self.last_tick_at = None
+
+    def is_healthy(self, now: float = None) -> bool:
+        """
+        连接正常且最近 stale_after 秒内收到过报价（刚连接时从连接时刻起算）。
+        连接还在但推送已停止时同样视为不健康，以免轮询被一直跳过。
+        """
+        if not self.connected:
+            return False
+        now = time.time() if now is None else now
+        last_seen = max(self.connected_at or 0, self.last_tick_at or 0)
+        return now - last_seen <= self.stale_after
+
+    @staticmethod
+    def _subscription(symbols) -> list:
+        return sorted({symbol for symbol, _ in symbols})
+
+    async def _follow_subscription(self, ws, symbols_provider, subscribed: list):
+        """定期检查需要的标的，有变化时重新发送订阅消息。"""
+        while True:
+            await asyncio.sleep(self.resubscribe_interval)
+            wanted = self._subscription(symbols_provider())
+            if wanted != subscribed:
+                await ws.send(json.dumps({"action": "subscribe", "symbols": wanted}))
+                logger.info(f"[QuoteStream] 订阅更新为 {len(wanted)} 个标的。")
+                subscribed = wanted
+
+    async def _read(self, buffer: _ConflatingBuffer, symbols_provider):
+        from websockets.asyncio.client import connect
+
+        delay = self.reconnect_min
+        while True:
+            try:
+                async with connect(self.url, open_timeout=10) as ws:
+                    subscribed = self._subscription(symbols_provider())
+                    await ws.send(json.dumps({"action": "subscribe", "symbols": subscribed}))
+                    self.connected = True
+                    self.connected_at = time.time()
+                    self.connections += 1
+                    delay = self.reconnect_min
+                    logger.info(f"[QuoteStream] 已连接 {self.url}，订阅 {len(subscribed)} 个标的。")
+                    follower = asyncio.create_task(self._follow_subscription(ws, symbols_provider, subscribed))
+                    try:
+                        async for message in ws:
+                            quote = parse_tick(message)
+                            if quote is not None:
+                                self.last_tick_at = time.time()
+                                buffer.put(quote)
+                    finally:
+                        follower.cancel()
+                logger.warning("[QuoteStream] 连接被服务器关闭。")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[QuoteStream] 连接 {self.url} 出错: {e}")
+            finally:
+                self.connected = False
+            # 指数退避，加入抖动以免多个客户端同时重连
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, self.reconnect_max)
+
+    async def ticks(self, symbols_provider):
+        buffer = _ConflatingBuffer()
+        reader = asyncio.create_task(self._read(buffer, symbols_provider))
+        try:
+            while True:
+                drain = asyncio.ensure_future(buffer.drain())
+                await asyncio.wait({drain, reader}, return_when=asyncio.FIRST_COMPLETED)
+                if not drain.done():
+                    # 读取协程意外退出（例如缺少 websockets 库），把异常抛给调用方
+                    drain.cancel()
+                    reader.result()
+                yield drain.result()
+        finally:
+            reader.cancel()
+            try:
+                await reader
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+def create_quote_source() -> QuoteSource:
+    """按 QUOTE_SOURCE 配置创建报价来源。"""
+    if config.QUOTE_SOURCE == "stream":
+        if not config.QUOTE_STREAM_URL:
+            raise ValueError("QUOTE_SOURCE=stream 时必须设置 QUOTE_STREAM_URL")
+        return StreamingQuoteSource(config.QUOTE_STREAM_URL)
+    return PollingQuoteSource()
@@ -1,16 +1,43 @@
 import asyncio
-from playwright.async_api import async_playwright
+import json
 from sqlalchemy.orm import Session
 from app.db.database import SessionLocal
-from app.models.item import Item
-from app.services.login_manager import get_logged_in_page
-from sqlalchemy import func # 导入 func
+from app.models.item import bulk_upsert_items
+from app.services.browser_pool import browser_pool
+from app.services.trend_store import record_scrape
+from app.services.trend_ranking import trend_ranker, load_ranked_items
+from app.core import config
+from urllib.parse import quote, urlparse
 
 # X 探索/趋势页面
 X_TRENDS_URL = "https://x.com/explore/tabs/trending"
 
+TIMELINE_SELECTOR = 'div[aria-label="时间线：探索"]'
+TREND_SELECTOR = 'div[data-testid="trend"]'
+TREND_TITLE_SELECTOR = 'div.r-b88u0q > span'
+
+# 帖子数文本的关键字（英文界面为 "posts"，中文界面为 "条帖子"）
+POST_COUNT_KEYWORDS = ('posts', '帖子')
+
+# 在浏览器端一次性提取所有趋势容器的数据，整个列表只需一次 IPC 往返
+EXTRACT_TRENDS_JS = """
+(containers) => containers.map((el) => {
+    const titleEl = el.querySelector('div.r-b88u0q > span');
+    const spans = Array.from(el.querySelectorAll('span'), (s) => (s.textContent || '').trim());
+    const postCount = spans.find((t) => /posts|帖子/i.test(t)) || '';
+    const dot = spans.indexOf('·');
+    return {
+        title: titleEl ? (titleEl.textContent || '').trim() : '',
+        post_count_text: postCount,
+        rank: /^\\d+$/.test(spans[0] || '') ? parseInt(spans[0], 10) : null,
+        category: dot >= 0 && dot + 1 < spans.length ? spans[dot + 1] : '',
+        spans: spans.filter((t) => t && t !== '·'),
+    };
+})
+"""
+
 def _parse_hot_score(text: str) -> float:
-    """将 '5,123 posts' 或 '45.1K posts' 这样的文本解析为浮点数。"""
+    """将 '5,123 posts'、'45.1K posts' 或 '18.9万 条帖子' 这样的文本解析为浮点数。"""
     if not text:
         return 0.0
     
@@ -22,7 +49,13 @@ def _parse_hot_score(text: str) -> float:
     text = text.replace(',', '')
     
     multiplier = 1
-    if 'k' in text:
+    if '亿' in text:
+        multiplier = 100_000_000
+        text = text.replace('亿', '')
+    elif '万' in text:
+        multiplier = 10_000
+        text = text.replace('万', '')
+    elif 'k' in text:
         multiplier = 1000
         text = text.replace('k', '')
     elif 'm' in text:
@@ -34,117 +67,296 @@ def _parse_hot_score(text: str) -> float:
     except (ValueError, TypeError):
         return 0.0
 
+def parse_trend_records(records: list[dict], source: str = "X 趋势") -> list[dict]:
+    """
+    批量处理从页面提取的原始趋势记录：过滤空标题、解析热度、生成搜索链接，并按链接去重。
+
+    Args:
+        records: extract_trend_records 返回的原始记录列表。
+        source: 写入条目的来源名称。
+
+    Returns:
+        包含 title/url/source/hot_score 以及原始元数据的字典列表，保持页面顺序。
+    """
+    parsed = []
+    seen_urls = set()
+    for record in records:
+        title = (record.get('title') or '').strip()
+        if not title:
+            continue
+        url = f"https://x.com/search?q={quote(title)}"
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+        parsed.append({
+            "title": title,
+            "url": url,
+            "source": source,
+            "hot_score": _parse_hot_score(record.get('post_count_text', '')),
+            "rank": record.get('rank'),
+            "category": record.get('category', ''),
+        })
+    return parsed
+
+async def extract_trend_records(timeline) -> list[dict]:
+    """单次 evaluate_all 调用提取时间线中所有趋势的标题、帖子数文本及元数据。"""
+    return await timeline.locator(TREND_SELECTOR).evaluate_all(EXTRACT_TRENDS_JS)
+
+async def extract_trend_records_per_locator(timeline) -> list[dict]:
+    """
+    逐个容器提取趋势记录（旧方式，每个容器两次 IPC 往返）。
+    保留用于校验批量提取的结果，以及在 evaluate 受限时回退使用。
+    """
+    records = []
+    for container in await timeline.locator(TREND_SELECTOR).all():
+        title = await container.locator(TREND_TITLE_SELECTOR).first.text_content()
+        spans = [t.strip() for t in await container.locator('span').all_text_contents()]
+        post_count_text = next(
+            (t for t in spans if any(k in t.lower() for k in POST_COUNT_KEYWORDS)), "")
+        dot = spans.index('·') if '·' in spans else -1
+        records.append({
+            "title": (title or "").strip(),
+            "post_count_text": post_count_text,
+            "rank": int(spans[0]) if spans and spans[0].isdigit() else None,
+            "category": spans[dot + 1] if 0 <= dot < len(spans) - 1 else "",
+            "spans": [t for t in spans if t and t != '·'],
+        })
+    return records
+
+EXTRACTORS = {
+    "bulk": extract_trend_records,
+    "locator": extract_trend_records_per_locator,
+}
+
+# --- 网络拦截模式：屏蔽无关资源，直接解析探索页时间线的 JSON 响应 ---
+
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+BLOCKED_HOST_SUFFIXES = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "ads-twitter.com",
+    "analytics.twitter.com",
+)
+# 埋点上报接口
+BLOCKED_PATH_KEYWORDS = ("/jot/", "client_event", "/1.1/live_pipeline/")
+# 探索页时间线接口：旧版 guide.json 与 GraphQL 版本
+TRENDS_API_KEYWORDS = ("/i/api/2/guide.json", "ExplorePage", "GenericTimelineById", "ExploreSidebar")
+
+def should_block_request(url: str, resource_type: str) -> bool:
+    """判断一个请求是否属于可以直接中止的图片、媒体、字体或统计请求。"""
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    parsed = urlparse(url)
+    host = parsed.hostname or ""
+    if any(host == suffix or host.endswith("." + suffix) for suffix in BLOCKED_HOST_SUFFIXES):
+        return True
+    return any(keyword in parsed.path for keyword in BLOCKED_PATH_KEYWORDS)
+
+def is_trends_api_response(url: str) -> bool:
+    """判断响应是否来自探索页时间线接口。"""
+    return "/i/api/" in url and any(keyword in url for keyword in TRENDS_API_KEYWORDS)
+
+def _walk_trend_nodes(node):
+    """递归查找负载中的趋势节点，兼容 GraphQL (trend_metadata) 与 guide.json (trendMetadata) 两种结构。"""
+    if isinstance(node, dict):
+        if isinstance(node.get("name"), str) and ("trend_metadata" in node or "trendMetadata" in node):
+            yield node
+            return
+        for value in node.values():
+            yield from _walk_trend_nodes(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk_trend_nodes(value)
+
+def parse_trend_payload(payload) -> list[dict]:
+    """
+    从探索页接口的 JSON 负载中解析趋势，返回与 DOM 提取相同结构的原始记录。
+    """
+    if isinstance(payload, (str, bytes)):
+        payload = json.loads(payload)
+    records = []
+    for node in _walk_trend_nodes(payload):
+        metadata = node.get("trend_metadata") or node.get("trendMetadata") or {}
+        post_count_text = metadata.get("meta_description") or metadata.get("metaDescription") or ""
+        rank = node.get("rank")
+        records.append({
+            "title": node["name"].strip(),
+            "post_count_text": post_count_text,
+            "rank": int(rank) if str(rank).isdigit() else None,
+            "category": metadata.get("domain_context") or metadata.get("domainContext") or "",
+            "spans": [],
+        })
+    return records
+
+async def _block_unneeded_resources(route):
+    request = route.request
+    if should_block_request(request.url, request.resource_type):
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def capture_trend_records(page, timeout: float = 30000) -> list[dict]:
+    """
+    打开探索页并从网络响应中截获趋势数据，不等待页面渲染。
+
+    Args:
+        page: 已登录的 Playwright 页面。
+        timeout: 等待趋势接口响应的超时时间（毫秒）。
+
+    Returns:
+        原始趋势记录列表。
+    """
+    records = []
+    received = asyncio.Event()
+
+    async def on_response(response):
+        if received.is_set() or not is_trends_api_response(response.url):
+            return
+        try:
+            payload = await response.json()
+        except Exception as e:
+            print(f"解析趋势接口响应失败: {e}")
+            return
+        parsed = parse_trend_payload(payload)
+        if parsed:
+            records.extend(parsed)
+            received.set()
+
+    await page.route("**/*", _block_unneeded_resources)
+    page.on("response", on_response)
+    try:
+        print(f"正在访问 (网络拦截模式): {X_TRENDS_URL}")
+        await page.goto(X_TRENDS_URL, wait_until='commit', timeout=60000)
+        await asyncio.wait_for(received.wait(), timeout / 1000)
+    finally:
+        page.remove_listener("response", on_response)
+        await page.unroute("**/*", _block_unneeded_resources)
+    return records
+
+async def render_and_extract_trend_records(page, extract) -> list[dict]:
+    """打开探索页，等待时间线渲染完成后从 DOM 中提取趋势记录。"""
+    print(f"正在访问: {X_TRENDS_URL}")
+    await page.goto(X_TRENDS_URL, wait_until='domcontentloaded', timeout=60000)
+    print("页面导航完成，等待趋势数据...")
+
+    await page.wait_for_selector(TIMELINE_SELECTOR, timeout=30000)
+    print("主时间线已加载。")
+
+    timeline = page.locator(TIMELINE_SELECTOR)
+    await timeline.locator(TREND_SELECTOR).first.wait_for(timeout=30000)
+    print("第一个趋势项目已渲染。")
+
+    return await extract(timeline)
+
 from app.services.pusher import push_email
 
-async def scrape_x_trends(db: Session):
+def validate_extraction_mode(extraction_mode: str):
+    """检查提取模式是否受支持，不支持时抛出 ValueError。"""
+    if extraction_mode != "network" and extraction_mode not in EXTRACTORS:
+        raise ValueError(f"不支持的提取模式: {extraction_mode}")
+
+def _is_extraction_timeout(error: Exception) -> bool:
+    """等待页面元素（Playwright）或接口响应（asyncio）超时。"""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+    return isinstance(error, PlaywrightTimeoutError)
+
+async def scrape_x_trends(db: Session, extraction_mode: str = "bulk"):
     """
     使用Playwright抓取X的趋势，更新或创建条目，并推送新条目。
     Args:
         db: SQLAlchemy数据库会话
+        extraction_mode: 'bulk' 一次性从 DOM 提取所有趋势；'locator' 逐个容器提取；
+            'network' 屏蔽无关资源并直接解析时间线接口的 JSON 响应
     """
+    validate_extraction_mode(extraction_mode)
     print("开始使用Playwright抓取X趋势...")
-    new_items_for_push = []  # 用于收集新条目以进行推送
-    async with async_playwright() as p:
-        page = None
+    async with browser_pool.page('x') as page:
         try:
-            page = await get_logged_in_page(p, 'x')
-            
-            print(f"正在访问: {X_TRENDS_URL}")
-            await page.goto(X_TRENDS_URL, wait_until='domcontentloaded', timeout=60000)
-            print("页面导航完成，等待趋势数据...")
-
-            timeline_selector = 'div[aria-label="时间线：探索"]'
-            await page.wait_for_selector(timeline_selector, timeout=30000)
-            print("主时间线已加载。")
-
-            trend_selector = 'div[data-testid="trend"]'
-            await page.locator(timeline_selector).locator(trend_selector).first.wait_for(timeout=30000)
-            print("第一个趋势项目已渲染。")
+            if extraction_mode == "network":
+                records = await capture_trend_records(page)
+            else:
+                records = await render_and_extract_trend_records(page, EXTRACTORS[extraction_mode])
 
-            timeline = page.locator(timeline_selector)
-            trend_containers = await timeline.locator(trend_selector).all()
+            trends = parse_trend_records(records)
 
-            if not trend_containers:
+            if not trends:
                 print("未找到趋势容器，可能是页面结构已更改。")
                 await page.screenshot(path="/tmp/x_scrape_no_elements.png")
                 print("已在 /tmp/x_scrape_no_elements.png 保存截图。")
                 return
 
-            items_added = 0
-            items_updated = 0
-            for container in trend_containers:
-                try:
-                    title_element = container.locator('div.r-b88u0q > span').first
-                    title = await title_element.text_content()
-                    title = title.strip() if title else ""
-
-                    if not title:
-                        continue
-
-                    post_count_text = ""
-                    all_spans = await container.locator('span').all_text_contents()
-                    for text in all_spans:
-                        if text and 'posts' in text.lower():
-                            post_count_text = text
-                            break
-                    
-                    hot_score = _parse_hot_score(post_count_text)
-
-                    from urllib.parse import quote
-                    query = quote(title)
-                    url = f"https://x.com/search?q={query}"
-                    
-                    item = db.query(Item).filter(Item.url == url).first()
-
-                    if item:
-                        item.hot_score = hot_score
-                        item.updated_at = func.now()
-                        items_updated += 1
-                        print(f"[更新] '{title}' (热度: {hot_score})")
-                    else:
-                        new_item = Item(
-                            title=title,
-                            url=url,
-                            source="X 趋势",
-                            hot_score=hot_score
-                        )
-                        db.add(new_item)
-                        new_items_for_push.append(new_item) # 收集新条目
-                        items_added += 1
-                        print(f"[新增] '{title}' (热度: {hot_score})")
-
-                except Exception as e:
-                    print(f"解析单个趋势时出错: {e}")
+            new_items_for_push, items_updated = bulk_upsert_items(db, trends)
+            items_added = len(new_items_for_push)
+            for item in new_items_for_push:
+                print(f"[新增] '{item.title}' (热度: {item.hot_score})")
 
+            # 新条目需要先拿到 id，再与热度更新在同一个事务中追加时间序列点、更新热度动量
+            db.flush()
+            scores = record_scrape(db, trends)
+            ranked = trend_ranker.observe(db, scores)
             db.commit()
             print(f"抓取完成，新增 {items_added} 条，更新 {items_updated} 条。")
 
             # 如果有新条目，则触发邮件推送
             if new_items_for_push:
                 print(f"发现 {len(new_items_for_push)} 个新条目，准备推送...")
-                push_email(new_items_for_push)
+                push_email(new_items_for_push, rising=load_ranked_items(db, ranked))
             else:
                 print("没有发现新条目，本次不推送。")
 
         except Exception as e:
-            print(f"使用Playwright抓取时发生严重错误: {e}")
-            if page and not page.is_closed():
+            timed_out = _is_extraction_timeout(e)
+            if timed_out:
+                print(f"等待趋势数据超时: {e}")
+            else:
+                print(f"使用Playwright抓取时发生严重错误: {e}")
+            if not page.is_closed():
                 await page.screenshot(path="/tmp/x_scrape_error.png")
                 print("已在 /tmp/x_scrape_error.png 保存错误截图。")
             db.rollback()
-        finally:
-            if page and not page.is_closed():
-                await page.context.browser.close()
-                print("Playwright浏览器已关闭。")
+            if timed_out:
+                # 超时多为网络或页面加载缓慢，登录态仍然有效，保留常驻上下文，下次抓取时重试
+                return
+            # 可能是登录态失效，丢弃常驻上下文，下次抓取时重新验证
+            await browser_pool.invalidate('x')
 
-def run_scrape_x():
-    """创建一个新的会话来异步运行X爬虫"""
+async def _scrape_x_with_session():
     db = SessionLocal()
     try:
-        asyncio.run(scrape_x_trends(db))
+        await scrape_x_trends(db, config.X_SCRAPE_MODE)
     finally:
         db.close()
 
+async def run_scrape_x_async():
+    """
+    供应用事件循环上的调度器直接 await 的抓取任务。
+    实际抓取在浏览器池的事件循环上执行，这里只是非阻塞地等待其完成。
+    """
+    try:
+        validate_extraction_mode(config.X_SCRAPE_MODE)
+    except ValueError as e:
+        print(f"X_SCRAPE_MODE 配置错误，跳过本次抓取: {e}")
+        return
+    try:
+        await asyncio.wrap_future(browser_pool.submit(_scrape_x_with_session()))
+    except Exception as e:
+        print(f"无法从浏览器池获取已登录页面: {e}")
+
+def run_scrape_x():
+    """创建一个新的会话，在常驻浏览器池的事件循环上运行X爬虫（阻塞直到完成）"""
+    try:
+        validate_extraction_mode(config.X_SCRAPE_MODE)
+    except ValueError as e:
+        print(f"X_SCRAPE_MODE 配置错误，跳过本次抓取: {e}")
+        return
+    try:
+        browser_pool.run(_scrape_x_with_session())
+    except Exception as e:
+        print(f"无法从浏览器池获取已登录页面: {e}")
+
 if __name__ == '__main__':
     # 用于直接运行测试
     run_scrape_x()
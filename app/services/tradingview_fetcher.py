@@ -1,66 +1,131 @@
 import logging
-from tradingview_ta import TA_Handler, Interval
+from tradingview_ta import TA_Handler, Interval, get_multiple_analysis
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-import time
+import threading
+from app.core import config
+from app.core.cache import TTLCache
 
-_cache = {}
-CACHE_DURATION_SECONDS = 60  # 缓存60秒
+# 对 TradingView 的并发请求上限，所有线程共享
+_tradingview_slots = threading.BoundedSemaphore(config.TRADINGVIEW_MAX_CONCURRENCY)
 
-def get_tv_analysis(symbol, screener, exchange, interval=Interval.INTERVAL_1_DAY):
-    cache_key = f"{symbol}_{screener}_{exchange}_{interval}"
-    current_time = time.time()
+# 技术分析结果的缓存，调度线程与 Web 线程共享；历史K线由 bar_store 在本地存储并合并同步请求
+_analysis_cache = TTLCache(maxsize=config.TV_CACHE_MAXSIZE, ttl=config.TV_CACHE_TTL,
+                           stale_ttl=config.TV_CACHE_STALE_TTL, name="tv-analysis")
 
-    # 检查缓存
-    if cache_key in _cache and (current_time - _cache[cache_key]['timestamp']) < CACHE_DURATION_SECONDS:
-        logger.info(f"[Cache] Returning cached data for {symbol}")
-        return _cache[cache_key]['data']
+def get_tv_analysis(symbol, screener, exchange, interval=Interval.INTERVAL_1_DAY, timeout=None):
+    """获取单个标的的技术分析结果（经由缓存）。timeout 为单次请求的超时时间（秒），默认不限制。"""
+    def load():
+        logger.info(f"[API] Fetching new data for {symbol}")
+        handler = TA_Handler(symbol=symbol, screener=screener, exchange=exchange, interval=interval,
+                             timeout=timeout)
+        handler.add_indicators(EXTRA_INDICATORS)
+        with _tradingview_slots:
+            return handler.get_analysis()
 
-    logger.info(f"[API] Fetching new data for {symbol}")
     try:
-        handler = TA_Handler(symbol=symbol, screener=screener, exchange=exchange, interval=interval)
-        analysis = handler.get_analysis()
-        
-        # 更新缓存
-        _cache[cache_key] = {
-            'data': analysis,
-            'timestamp': current_time
-        }
-        return analysis
+        return _analysis_cache.get_or_load((symbol, screener, exchange, interval), load)
     except Exception as e:
         logger.error(f"[TradingView] Failed to create handler or get analysis for {symbol}: {e}")
         return None
 
+DEFAULT_SCREENER = "america"
+DEFAULT_EXCHANGE = "NASDAQ"
+
+# TradingView 的 "change" 是相对前收盘的涨跌幅（百分比），涨跌额需要额外请求 "change_abs"
+EXTRA_INDICATORS = ["change_abs"]
+
+def normalize_symbol(symbol: str, exchange: str = DEFAULT_EXCHANGE) -> str:
+    """将 'AAPL' 或 'nyse:docn' 统一为 TradingView 使用的 'EXCHANGE:SYMBOL' 形式。"""
+    symbol = symbol.strip().upper()
+    if ":" in symbol:
+        return symbol
+    return f"{exchange.upper()}:{symbol}"
+
+def _quote_from_analysis(symbol: str, analysis) -> dict:
+    indicators = analysis.indicators
+    return {
+        "symbol": symbol,
+        "last_price": indicators.get("close"),
+        "change": indicators.get("change_abs"),
+        "change_percent": indicators.get("change"),
+    }
+
+def get_multiple_quotes(symbols, interval=Interval.INTERVAL_1_DAY) -> dict:
+    """
+    批量获取多个标的的最新报价，每个 screener 只发出一次请求。
+
+    Args:
+        symbols: 标的列表。元素可以是 'AAPL' / 'NYSE:DOCN' 字符串（使用默认 screener），
+            也可以是 (symbol, screener) 元组。默认交易所 NASDAQ 只适用于 america，
+            其他 screener 的标的必须带交易所前缀，否则跳过。
+        interval: K 线周期。
+
+    Returns:
+        以 normalize_symbol 后的 'EXCHANGE:SYMBOL' 为键的报价字典，'AAPL' 与 'NASDAQ:AAPL' 对应同一项，
+        不同交易所的同名标的互不覆盖；获取失败的标的值为 None。
+    """
+    by_screener = {}
+    for entry in symbols:
+        symbol, screener = entry if isinstance(entry, tuple) else (entry, DEFAULT_SCREENER)
+        screener = (screener or DEFAULT_SCREENER).lower()
+        if screener != DEFAULT_SCREENER and ":" not in symbol:
+            logger.error(f"[TradingView] screener '{screener}' 的标的 '{symbol}' 缺少交易所前缀，已跳过。")
+            continue
+        by_screener.setdefault(screener, set()).add(normalize_symbol(symbol))
+
+    quotes = {}
+    for screener, tv_symbols in by_screener.items():
+        tv_symbols = sorted(tv_symbols)
+        logger.info(f"[API] Fetching {len(tv_symbols)} quotes from screener '{screener}' in one request")
+        try:
+            with _tradingview_slots:
+                analyses = get_multiple_analysis(screener=screener, interval=interval, symbols=tv_symbols,
+                                                 additional_indicators=EXTRA_INDICATORS,
+                                                 timeout=config.MARKET_FETCH_TIMEOUT)
+        except Exception as e:
+            logger.error(f"[TradingView] Failed to get multiple analysis for screener '{screener}': {e}")
+            analyses = {}
+        for tv_symbol in tv_symbols:
+            analysis = analyses.get(tv_symbol)
+            quotes[tv_symbol] = _quote_from_analysis(tv_symbol, analysis) if analysis else None
+    return quotes
+
+def get_stock_data(symbol: str, screener=DEFAULT_SCREENER) -> dict:
+    """获取单个标的的最新报价，是 get_multiple_quotes 的单标的版本。"""
+    return get_multiple_quotes([(symbol, screener)]).get(normalize_symbol(symbol))
+
 import pandas as pd
 
-def get_stock_data_as_df(symbol: str, screener="america", exchange="NASDAQ") -> pd.DataFrame:
+OHLCV_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+def fetch_hist(symbol: str, screener=DEFAULT_SCREENER, exchange=DEFAULT_EXCHANGE,
+               interval=Interval.INTERVAL_1_DAY, n_bars: int = 100, timeout=None) -> pd.DataFrame:
     """
-    使用 TradingView 获取单支股票最近100天的历史数据，并作为 DataFrame 返回。
+    直接从 TradingView 获取最近 n_bars 根K线（不经过缓存），列名统一为 Open/High/Low/Close/Volume。
+    获取失败或无数据时返回 None。
     """
-    logger.info(f"[TradingView] Getting historical data for stock: {symbol}")
-    try:
-        handler = TA_Handler(symbol=symbol, screener=screener, exchange=exchange, interval=Interval.INTERVAL_1_DAY)
-        df = handler.get_hist(n_bars=100)
-        if df is not None and not df.empty:
-            df.rename(columns={"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}, inplace=True)
-            return df
-    except Exception as e:
-        logger.error(f"[TradingView] Failed to get historical data for {symbol}: {e}")
-    return None
+    logger.info(f"[TradingView] Getting {n_bars} {interval} bars for: {symbol}")
+    handler = TA_Handler(symbol=symbol, screener=screener, exchange=exchange,
+                         interval=interval, timeout=timeout)
+    with _tradingview_slots:
+        df = handler.get_hist(n_bars=n_bars)
+    if df is None or df.empty:
+        return None
+    return df.rename(columns=OHLCV_COLUMNS)
 
-def get_index_data(symbol, screener, exchange):
+def get_index_data(symbol, screener, exchange, timeout=None):
     logger.info(f"[TradingView] Getting data for index: {symbol}")
-    handler = get_tv_analysis(symbol, screener, exchange)
-    if not handler: return None
+    analysis = get_tv_analysis(symbol, screener, exchange, timeout=timeout)
+    if not analysis: return None
     try:
-        analysis = handler.get_analysis()
         return {
             "symbol": symbol,
             "close": analysis.indicators.get("close"),
-            "change": analysis.indicators.get("change"),
-            "percent_change": analysis.indicators.get("change_percent|1D"),
+            "change": analysis.indicators.get("change_abs"),
+            "percent_change": analysis.indicators.get("change"),
         }
     except Exception as e:
         logger.error(f"[TradingView] Failed to get analysis for index {symbol}: {e}")
@@ -0,0 +1,136 @@
+import heapq
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.core import config
+from app.models.item import Item
+from app.models.trend import TrendStat
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Momentum:
+    """某个条目最近一次抓取时的热度及其变化速度（帖子数/小时）、加速度（帖子数/小时²）。"""
+    ts: int
+    hot_score: int
+    velocity: float = 0.0
+    acceleration: float = 0.0
+
+
+def advance(state: Momentum, ts: int, hot_score: int, half_life: float) -> Momentum:
+    """
+    用一次新的抓取结果更新动量。速度与加速度都是按时间间隔衰减的指数平均：
+    间隔越长，新观测的权重越大（间隔为一个半衰期时权重为 1/2），因此抓取频率变化不会扭曲排行。
+    首次出现的条目（state 为 None）速度为 0，从第二次抓取开始计算。
+    """
+    if state is None:
+        return Momentum(ts, hot_score)
+    dt = ts - state.ts
+    if dt <= 0:
+        return state
+    alpha = 1 - 0.5 ** (dt / half_life)
+    rate = (hot_score - state.hot_score) * 3600 / dt
+    velocity = state.velocity + alpha * (rate - state.velocity)
+    accel_rate = (velocity - state.velocity) * 3600 / dt
+    acceleration = state.acceleration + alpha * (accel_rate - state.acceleration)
+    return Momentum(ts, hot_score, velocity, acceleration)
+
+
+class TrendRanker:
+    """
+    增量维护所有活跃条目的动量，以及按速度排序的前 K 名。
+
+    每次抓取只更新本次出现的条目（O(n)），再用大小为 K 的堆重选前 K 名（O(n log K)）；
+    读取排行是 O(K)。状态同时写入 trend_stats 表，供其他 worker 读取并在重启后恢复。
+    """
+
+    def __init__(self, k: int = None, half_life: float = None, max_age: float = None):
+        self.k = config.TREND_RANK_TOP_K if k is None else k
+        self.half_life = config.TREND_VELOCITY_HALF_LIFE if half_life is None else half_life
+        self.max_age = config.TREND_RANK_MAX_AGE if max_age is None else max_age
+        self._states = {}
+        self._top = []
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session):
+        rows = db.execute(select(TrendStat)).scalars()
+        self._states = {row.item_id: Momentum(row.updated_at, row.hot_score, row.velocity, row.acceleration)
+                        for row in rows}
+        self._loaded = True
+
+    def observe(self, db: Session, scores: dict, scraped_at: float = None) -> list:
+        """
+        记录一次抓取的 {item_id: hot_score}，更新动量与排行并写入 trend_stats。
+        热度为 0 或缺失的条目视为本次没有观测值，保留其上一次的动量，不会被当作热度归零。
+        不在此处提交事务，由调用方决定何时 commit。
+
+        Returns:
+            更新后的前 K 名，同 top()。
+        """
+        ts = int(time.time() if scraped_at is None else scraped_at)
+        with self._lock:
+            if not self._loaded:
+                self._load(db)
+            updated = {item_id: advance(self._states.get(item_id), ts, score, self.half_life)
+                       for item_id, score in scores.items() if score}
+            self._states.update(updated)
+            # 长时间未出现的条目已退出趋势榜，丢弃其状态；再次出现时重新开始计算
+            cutoff = ts - self.max_age
+            self._states = {item_id: state for item_id, state in self._states.items() if state.ts >= cutoff}
+            self._top = heapq.nlargest(self.k, self._states.items(), key=lambda entry: entry[1].velocity)
+
+        if updated:
+            stmt = sqlite_insert(TrendStat)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[TrendStat.item_id],
+                set_={column: stmt.excluded[column] for column in ("updated_at", "hot_score", "velocity", "acceleration")},
+            ), [{"item_id": item_id, "updated_at": state.ts, "hot_score": state.hot_score,
+                 "velocity": state.velocity, "acceleration": state.acceleration}
+                for item_id, state in updated.items()])
+        db.execute(delete(TrendStat).where(TrendStat.updated_at < cutoff))
+        return self.top(now=ts)
+
+    def top(self, limit: int = None, now: float = None) -> list:
+        """
+        上升最快的条目 [(item_id, Momentum)]，按速度降序；只包含 max_age 内出现过的条目。
+        """
+        cutoff = (time.time() if now is None else now) - self.max_age
+        top = self._top
+        return [(item_id, state) for item_id, state in top[:limit or self.k] if state.ts >= cutoff]
+
+
+def load_ranked_items(db: Session, ranked: list) -> list:
+    """将 TrendRanker.top() 的结果与条目对应起来（一次主键 IN 查询），返回 [(Item, Momentum)]。"""
+    ids = [item_id for item_id, _ in ranked]
+    items = {item.id: item for item in db.execute(select(Item).where(Item.id.in_(ids))).scalars()} if ids else {}
+    return [(items[item_id], state) for item_id, state in ranked if item_id in items]
+
+
+def rising_items(db: Session, limit: int = None, now: float = None) -> list:
+    """
+    从 trend_stats 读取上升最快的条目（沿 velocity 索引从大到小读取，不扫描历史）。
+    供不维护内存排行的进程（仪表盘、接口）使用。
+
+    Returns:
+        [(Item, TrendStat)]，按速度降序。
+    """
+    limit = config.TREND_RANK_TOP_K if limit is None else limit
+    cutoff = int((time.time() if now is None else now) - config.TREND_RANK_MAX_AGE)
+    return [tuple(row) for row in db.execute(
+        select(Item, TrendStat)
+        .join(Item, Item.id == TrendStat.item_id)
+        .where(TrendStat.updated_at >= cutoff)
+        .order_by(TrendStat.velocity.desc())
+        .limit(limit)
+    )]
+
+
+# 进程级单例；只有运行抓取任务的 leader 进程会更新它
+trend_ranker = TrendRanker()
@@ -0,0 +1,104 @@
+import logging
+import time
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.core import config
+from app.db.database import SessionLocal
+from app.models.item import Item
+from app.models.trend import TrendPoint, RAW, HOURLY, DAILY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# SQLite 单条语句的绑定参数个数有上限，IN 查询按此大小分批
+_IN_CHUNK_SIZE = 500
+
+# 把某一粒度早于 cutoff 的点汇总为 target 粒度：每个 (条目, 区间) 取区间内最后一个点的热度。
+# SQLite 中与 MAX() 同时选出的裸列取自 MAX 所在的那一行。
+_ROLLUP_SQL = text("""
+    INSERT OR REPLACE INTO trend_points (item_id, ts, resolution, hot_score)
+    SELECT item_id, bucket, :target, hot_score FROM (
+        SELECT item_id, ts / :target * :target AS bucket, hot_score, MAX(ts)
+        FROM trend_points
+        WHERE resolution < :target AND ts < :cutoff
+        GROUP BY item_id, bucket
+    )
+""")
+
+
+def record_scrape(db: Session, records: list[dict], scraped_at: float = None) -> dict:
+    """
+    为一次抓取的所有条目追加原始热度点。条目须已写入（或 flush）数据库。
+    页面上没有显示帖子数的条目热度为 0 或缺失，这表示本次没有观测值，而不是热度为 0，因此不记录。
+    不在此处提交事务，由调用方决定何时 commit。
+
+    Returns:
+        本次抓取中有热度观测值的 {item_id: hot_score}。
+    """
+    scraped_at = int(time.time() if scraped_at is None else scraped_at)
+    scores = {record["url"]: int(round(record["hot_score"])) for record in records if record.get("hot_score")}
+    urls = list(scores)
+    rows = []
+    for i in range(0, len(urls), _IN_CHUNK_SIZE):
+        chunk = urls[i:i + _IN_CHUNK_SIZE]
+        rows += [
+            {"item_id": item_id, "ts": scraped_at, "resolution": RAW, "hot_score": scores[url]}
+            for item_id, url in db.execute(select(Item.id, Item.url).where(Item.url.in_(chunk)))
+        ]
+    if rows:
+        db.execute(sqlite_insert(TrendPoint).on_conflict_do_nothing(), rows)
+    return {row["item_id"]: row["hot_score"] for row in rows}
+
+
+def rollup(db: Session, now: float = None) -> dict:
+    """
+    逐级降采样并执行保留策略：超过 TREND_RAW_RETENTION 的原始点汇总为小时点，
+    超过 TREND_HOURLY_RETENTION 的小时点汇总为日点，超过 TREND_DAILY_RETENTION 的日点删除。
+    截止时间按区间边界对齐，只汇总完整的区间。
+
+    Returns:
+        {"hourly": 新汇总点数, "daily": 新汇总点数, "deleted": 删除的点数}
+    """
+    now = int(time.time() if now is None else now)
+    result = {"hourly": 0, "daily": 0, "deleted": 0}
+    for target, retention, key in ((HOURLY, config.TREND_RAW_RETENTION, "hourly"),
+                                   (DAILY, config.TREND_HOURLY_RETENTION, "daily")):
+        cutoff = (now - retention) // target * target
+        result[key] = db.execute(_ROLLUP_SQL, {"target": target, "cutoff": cutoff}).rowcount
+        result["deleted"] += db.execute(
+            delete(TrendPoint).where(TrendPoint.resolution < target, TrendPoint.ts < cutoff)
+        ).rowcount
+    result["deleted"] += db.execute(
+        delete(TrendPoint).where(TrendPoint.ts < now - config.TREND_DAILY_RETENTION)
+    ).rowcount
+    db.commit()
+    return result
+
+
+def get_series(db: Session, item_id: int, start: float = None, end: float = None) -> list[tuple]:
+    """
+    返回条目在 [start, end] 内的热度序列（主键范围扫描）。较早的部分为汇总点，较新的部分为原始点。
+
+    Returns:
+        [(ts, hot_score, resolution)]，按时间升序。
+    """
+    stmt = select(TrendPoint.ts, TrendPoint.hot_score, TrendPoint.resolution).where(TrendPoint.item_id == item_id)
+    if start is not None:
+        stmt = stmt.where(TrendPoint.ts >= int(start))
+    if end is not None:
+        stmt = stmt.where(TrendPoint.ts <= int(end))
+    return [tuple(row) for row in db.execute(stmt.order_by(TrendPoint.ts))]
+
+
+def run_rollup():
+    """定时任务入口。"""
+    db = SessionLocal()
+    try:
+        result = rollup(db)
+        logger.info(f"热度序列汇总完成: 小时点 {result['hourly']}，日点 {result['daily']}，删除 {result['deleted']}。")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"热度序列汇总失败: {e}", exc_info=True)
+    finally:
+        db.close()
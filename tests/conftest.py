@@ -0,0 +1,26 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.database import Base
+# 导入所有模型，使 create_all 建出全部表
+from app.models import alert_state, bar, item, outbox, trend  # noqa: F401
+
+
+@pytest.fixture(scope="function")
+def session_factory():
+    """每个测试使用独立的内存数据库；多个线程共享同一连接，可在线程池或投递线程中使用"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def db_session(session_factory):
+    """内存数据库上的一个会话"""
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,84 @@
+"""
+本地推送报价源替身，供测试与本地调试使用。
+
+协议与 StreamingQuoteSource 相同：客户端发送 {"action": "subscribe", "symbols": [...]}，
+服务器只向订阅了该标的的连接推送 {"symbol", "price", "change_percent", "ts"}。
+
+直接运行时在 ws://127.0.0.1:8765 上每秒为所有订阅的标的推送一笔随机游走的报价:
+    python tests/quote_feed_server.py
+"""
+import asyncio
+import json
+import random
+import time
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+
+class StandInFeedServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.subscriptions = []  # 收到的每条订阅消息中的标的列表
+        self._clients = {}  # connection -> set(symbols)
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, ws):
+        self._clients[ws] = set()
+        try:
+            async for message in ws:
+                data = json.loads(message)
+                if data.get("action") == "subscribe":
+                    self._clients[ws] = set(data["symbols"])
+                    self.subscriptions.append(sorted(data["symbols"]))
+                    await ws.send(json.dumps({"event": "subscribed", "symbols": sorted(data["symbols"])}))
+        except ConnectionClosed:
+            pass
+        finally:
+            self._clients.pop(ws, None)
+
+    async def start(self) -> str:
+        self._server = await serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def wait_for_subscribers(self, count: int = 1, timeout: float = 5):
+        deadline = time.monotonic() + timeout
+        while sum(1 for symbols in self._clients.values() if symbols) < count:
+            if time.monotonic() > deadline:
+                raise TimeoutError("等待订阅超时")
+            await asyncio.sleep(0.01)
+
+    async def publish(self, symbol: str, price: float, change_percent: float = None):
+        message = json.dumps({"symbol": symbol, "price": price, "change_percent": change_percent, "ts": time.time()})
+        for ws, symbols in list(self._clients.items()):
+            if symbol in symbols:
+                await ws.send(message)
+
+    async def drop_connections(self):
+        """模拟服务器故障：断开所有客户端连接。"""
+        for ws in list(self._clients):
+            await ws.close()
+
+
+async def _demo():
+    server = StandInFeedServer(port=8765)
+    print(f"推送源替身已启动: {await server.start()}")
+    prices = {}
+    while True:
+        await asyncio.sleep(1)
+        for symbol in set().union(*server._clients.values()) if server._clients else ():
+            prices[symbol] = prices.get(symbol, 100.0) * (1 + random.gauss(0, 0.002))
+            await server.publish(symbol, round(prices[symbol], 2))
+
+
+if __name__ == "__main__":
+    asyncio.run(_demo())
@@ -0,0 +1,107 @@
+"""
+本地 SMTP 服务器替身（aiosmtpd 风格），供测试使用。
+
+支持 EHLO/HELO、AUTH PLAIN、MAIL/RCPT/DATA、RSET、NOOP、QUIT；记录连接数、登录次数与收到的邮件，
+并可以主动断开所有连接，模拟服务器清理空闲连接。不支持 STARTTLS，客户端需关闭 TLS。
+"""
+import base64
+import socketserver
+import threading
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        server = self.server.stand_in
+        with server.lock:
+            server.connections += 1
+            server.sockets.append(self.request)
+        self._reply("220 stand-in ESMTP")
+        mail_from, rcpt_to = None, []
+        try:
+            for raw in self.rfile:
+                line = raw.decode().rstrip("\r\n")
+                verb = line.split(" ", 1)[0].upper()
+                server.commands.append(verb)
+                if verb == "EHLO":
+                    self._reply("250-stand-in")
+                    self._reply("250 AUTH PLAIN")
+                elif verb == "HELO":
+                    self._reply("250 stand-in")
+                elif verb == "AUTH":
+                    _, _, initial_response = line.split(" ", 2)
+                    _, user, _ = base64.b64decode(initial_response).decode().split("\0")
+                    with server.lock:
+                        server.logins.append(user)
+                    self._reply("235 2.7.0 Authentication successful")
+                elif verb == "MAIL":
+                    mail_from, rcpt_to = line[10:].strip("<>"), []
+                    self._reply("250 OK")
+                elif verb == "RCPT":
+                    address = line[8:].strip("<>")
+                    if address in server.reject:
+                        self._reply("550 No such user")
+                    else:
+                        rcpt_to.append(address)
+                        self._reply("250 OK")
+                elif verb == "DATA":
+                    self._reply("354 End data with <CR><LF>.<CR><LF>")
+                    body = []
+                    for data_line in self.rfile:
+                        if data_line in (b".\r\n", b".\n"):
+                            break
+                        body.append(data_line.decode())
+                    with server.lock:
+                        server.messages.append((mail_from, rcpt_to, "".join(body)))
+                    self._reply("250 OK: queued")
+                elif verb in ("RSET", "NOOP"):
+                    self._reply("250 OK")
+                elif verb == "QUIT":
+                    self._reply("221 Bye")
+                    return
+                else:
+                    self._reply("502 Command not implemented")
+        except (ConnectionError, OSError):
+            pass
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StandInSMTPServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.logins = []
+        self.messages = []
+        self.commands = []
+        self.reject = set()
+        self.sockets = []
+        self._server = _Server((host, port), _Handler)
+        self._server.stand_in = self
+        self.host, self.port = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.drop_connections()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def drop_connections(self):
+        """模拟服务器断开所有（空闲）连接。"""
+        with self.lock:
+            sockets, self.sockets = self.sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(2)
+                sock.close()
+            except OSError:
+                pass
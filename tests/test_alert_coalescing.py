@@ -0,0 +1,99 @@
+import pytest
+from app.models.alert_state import AlertState
+from app.models.outbox import OutboxMessage, PendingAlert, PRIORITY_NORMAL, PRIORITY_CRITICAL
+from app.services import alerter, pusher
+from app.services.monitor_config import parse_monitor_config
+
+
+@pytest.fixture(scope="function")
+def session_factory(session_factory, monkeypatch):
+    """推送服务使用测试的内存数据库"""
+    monkeypatch.setattr(pusher, "SessionLocal", session_factory)
+    monkeypatch.setattr(pusher.config, "MAIL_TO", ["a@example.com"])
+    return session_factory
+
+
+def _alert(symbol, rule_id, priority="normal"):
+    return {
+        "rule_id": rule_id, "symbol": symbol, "condition": "below", "description": "跌幅超过 5%",
+        "target_price": -5.0, "current_price": 10.0, "current_value": -6.2, "priority": priority,
+        "timestamp": "2024-01-02 10:00:00",
+    }
+
+
+def test_alerts_within_window_are_sent_as_one_digest(session_factory):
+    """窗口内触发的多条预警先持久化，窗口结束后合并为一封汇总邮件"""
+    for i in range(30):
+        pusher.push_price_alert(_alert(f"S{i:02d}", f"S{i:02d}:percent"))
+    db = session_factory()
+    created_at = db.query(PendingAlert).first().created_at
+    assert db.query(OutboxMessage).count() == 0
+
+    assert pusher.flush_pending_alerts(db, now=created_at + 30, window=60) == 0
+    assert pusher.flush_pending_alerts(db, now=created_at + 60, window=60) == 30
+
+    message = db.query(OutboxMessage).one()
+    assert message.subject.startswith("价格预警汇总: 30 条预警")
+    assert message.content.count("跌幅超过 5%") == 30
+    assert message.idempotency_key.startswith("price_alert_digest:")
+    assert message.priority == PRIORITY_NORMAL
+    assert db.query(PendingAlert).count() == 0
+
+
+def test_critical_alert_skips_coalescing(session_factory):
+    """critical 预警不等待合并窗口，立即以高优先级入队；窗口为 0 时普通预警逐条发送"""
+    pusher.push_price_alert(_alert("AAPL", "AAPL:normal"))
+    pusher.push_price_alert(_alert("TSLA", "TSLA:crash", priority="critical"))
+    db = session_factory()
+    message = db.query(OutboxMessage).one()
+    assert message.subject == "价格预警: TSLA 跌幅超过 5%"
+    assert message.idempotency_key == "price_alert:TSLA:crash:2024-01-02 10:00:00:a@example.com"
+    assert message.priority == PRIORITY_CRITICAL
+
+    assert pusher.flush_pending_alerts(db, window=0) == 1
+    assert db.query(OutboxMessage).filter_by(subject="价格预警: AAPL 跌幅超过 5%").count() == 1
+
+
+def test_fired_alert_survives_restart_inside_window(session_factory, monkeypatch):
+    """规则静默与待发送预警在同一事务中提交：合并窗口内进程退出，预警仍由下一个 leader 发出"""
+    config = parse_monitor_config({"price_alerts": [
+        {"symbol": "AAPL", "condition": "cross_above", "target_price": 220},
+    ]})
+    prices = iter([215.0, 225.0])
+    monkeypatch.setattr(alerter, "get_monitor_config", lambda: config)
+    monkeypatch.setattr(alerter, "SessionLocal", session_factory)
+    monkeypatch.setattr(alerter, "_last_metrics", {})
+    monkeypatch.setattr(alerter, "get_multiple_quotes",
+                        lambda symbols: {"NASDAQ:AAPL": {"symbol": "NASDAQ:AAPL", "last_price": next(prices)}})
+    alerter.check_price_alerts()
+    alerter.check_price_alerts()
+
+    # 模拟进程在窗口结束前被杀死：内存中没有任何待发送状态，全部在数据库中
+    db = session_factory()
+    assert db.query(AlertState).filter(AlertState.armed.is_(False)).count() == 1
+    pending = db.query(PendingAlert).one()
+    assert pusher.flush_pending_alerts(db, now=pending.created_at + 60, window=60) == 1
+    assert db.query(OutboxMessage).one().subject.startswith("价格预警: AAPL")
+
+
+def test_failed_alert_write_leaves_rule_armed(session_factory, monkeypatch):
+    """预警写入失败时整个事务回滚，规则保持待触发，下次求值会重新触发"""
+    config = parse_monitor_config({"price_alerts": [
+        {"symbol": "AAPL", "condition": "above", "target_price": 220},
+    ]})
+    monkeypatch.setattr(alerter, "get_monitor_config", lambda: config)
+    monkeypatch.setattr(alerter, "SessionLocal", session_factory)
+    monkeypatch.setattr(alerter, "_last_metrics", {})
+    monkeypatch.setattr(alerter, "get_multiple_quotes",
+                        lambda symbols: {"NASDAQ:AAPL": {"symbol": "NASDAQ:AAPL", "last_price": 225.0}})
+
+    def broken(alert, db=None):
+        raise RuntimeError("磁盘已满")
+    monkeypatch.setattr(alerter, "push_price_alert", broken)
+    alerter.check_price_alerts()
+    db = session_factory()
+    assert db.query(AlertState).count() == 0
+
+    monkeypatch.setattr(alerter, "push_price_alert", pusher.push_price_alert)
+    alerter.check_price_alerts()
+    assert db.query(PendingAlert).count() == 1
@@ -0,0 +1,201 @@
+import random
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.database import Base
+from app.models.alert_state import AlertState
+from app.services import alerter, tradingview_fetcher
+from app.services.alert_rules import PRICE, parse_rule
+from app.services.monitor_config import MonitorConfigService, parse_monitor_config
+
+
+def _ids(triggered):
+    return sorted(rule.id for rule, _ in triggered)
+
+
+def test_parse_rule_validates_fields():
+    """缺少字段或条件不支持的规则被拒绝；同一标的同方向不同价位的规则 id 不同"""
+    with pytest.raises(ValueError):
+        parse_rule({"symbol": "AAPL", "condition": "above"})
+    with pytest.raises(ValueError):
+        parse_rule({"symbol": "AAPL", "condition": "sideways", "target_price": 1})
+    with pytest.raises(ValueError):
+        parse_rule({"symbol": "AAPL", "indicator": "SMA_20", "condition": "above", "reference": "SMA_50"})
+
+    a = parse_rule({"symbol": "AAPL", "condition": "above", "target_price": 220})
+    b = parse_rule({"symbol": "AAPL", "condition": "above", "target_price": 230})
+    assert a.id != b.id
+    # 配置中任一规则无效时整份配置被拒绝，而不是跳过该规则
+    with pytest.raises(ValueError):
+        parse_monitor_config({"price_alerts": [{"symbol": "AAPL"}, {"symbol": "AAPL", "condition": "below", "target_price": 1}]})
+
+
+def test_non_us_screener_requires_exchange_prefix():
+    """america 以外的 screener 不能套用默认的 NASDAQ 前缀，缺少交易所前缀的规则被拒绝"""
+    with pytest.raises(ValueError):
+        parse_rule({"symbol": "BTCUSDT", "screener": "crypto", "condition": "above", "target_price": 1})
+    rule = parse_rule({"symbol": "BINANCE:BTCUSDT", "screener": "crypto", "condition": "above", "target_price": 1})
+    assert (rule.symbol, rule.screener) == ("BINANCE:BTCUSDT", "crypto")
+    assert parse_rule({"symbol": "AAPL", "screener": "america", "condition": "above", "target_price": 1})
+
+
+def test_crypto_rule_matches_its_quote(monkeypatch):
+    """带交易所前缀的加密货币规则按自己的 screener 请求报价并能触发"""
+    config = parse_monitor_config({"price_alerts": [
+        {"symbol": "BINANCE:BTCUSDT", "screener": "crypto", "condition": "below", "target_price": 50000},
+    ]})
+    requested = []
+
+    def fake_get_multiple_analysis(screener, interval, symbols, additional_indicators=(), timeout=None):
+        requested.append((screener, symbols))
+        return {s: SimpleNamespace(indicators={"close": 48000.0, "change": -4.0, "change_abs": -2000.0}) for s in symbols}
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[AlertState.__table__])
+    sent = []
+    monkeypatch.setattr(alerter, "get_monitor_config", lambda: config)
+    monkeypatch.setattr(alerter, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(alerter, "_last_metrics", {})
+    monkeypatch.setattr(alerter, "push_price_alert", lambda alert, db=None: sent.append(alert))
+    monkeypatch.setattr(tradingview_fetcher, "get_multiple_analysis", fake_get_multiple_analysis)
+
+    alerter.check_price_alerts()
+
+    assert requested == [("crypto", ["BINANCE:BTCUSDT"])]
+    assert [alert["symbol"] for alert in sent] == ["BINANCE:BTCUSDT"]
+
+
+def test_index_matches_linear_scan():
+    """二分索引找到的规则与逐条比较的结果一致"""
+    rng = random.Random(3)
+    conditions = ["above", "below", "cross_above", "cross_below"]
+    raw = [{"id": str(i), "symbol": "AAPL", "condition": rng.choice(conditions),
+            "target_price": round(rng.uniform(90, 110), 1)} for i in range(2000)]
+    ruleset = parse_monitor_config({"price_alerts": raw}).rules
+
+    def brute(prev, cur):
+        hits = []
+        for r in raw:
+            t, c = r["target_price"], r["condition"]
+            if (c == "above" and cur > t) or (c == "below" and cur < t) \
+                    or (c == "cross_above" and prev <= t < cur) or (c == "cross_below" and cur < t <= prev):
+                hits.append(r["id"])
+        return sorted(hits)
+
+    for _ in range(50):
+        prev, cur = round(rng.uniform(88, 112), 1), round(rng.uniform(88, 112), 1)
+        assert _ids(ruleset.evaluate("AAPL", {PRICE: cur}, {PRICE: prev})) == brute(prev, cur)
+
+
+def test_percent_and_indicator_conditions():
+    """涨跌幅、指标阈值与指标交叉规则"""
+    ruleset = parse_monitor_config({"price_alerts": [
+        {"id": "drop", "symbol": "TSLA", "condition": "move_down", "percent": 5},
+        {"id": "rsi", "symbol": "TSLA", "indicator": "RSI_14", "condition": "above", "value": 70},
+        {"id": "golden", "symbol": "TSLA", "indicator": "SMA_20", "condition": "cross_above", "reference": "SMA_50"},
+    ]}).rules
+    assert ruleset.needs_indicators("TSLA")
+
+    previous = {PRICE: 100, "percent": -1.0, "RSI_14": 65, "SMA_20": 99.0, "SMA_50": 100.0}
+    current = {PRICE: 94, "percent": -6.0, "RSI_14": 72, "SMA_20": 101.0, "SMA_50": 100.0}
+    assert _ids(ruleset.evaluate("TSLA", current, previous)) == ["drop", "golden", "rsi"]
+    # 没有上一次的值时，交叉规则不触发
+    assert _ids(ruleset.evaluate("TSLA", current)) == ["drop", "rsi"]
+
+
+def test_check_price_alerts_fires_crossings_once(monkeypatch, tmp_path):
+    """穿越规则只在价格穿越时触发，同一方向不同价位的规则互不影响"""
+    config_path = tmp_path / "monitor_config.yaml"
+    config_path.write_text(
+        "price_alerts:\n"
+        "  - {symbol: AAPL, condition: cross_above, target_price: 220}\n"
+        "  - {symbol: AAPL, condition: cross_above, target_price: 230}\n"
+    )
+    prices = iter([215.0, 225.0, 235.0])
+    sent = []
+    monkeypatch.setattr(alerter, "get_monitor_config", MonitorConfigService(str(config_path)).get)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[AlertState.__table__])
+    monkeypatch.setattr(alerter, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(alerter, "_last_metrics", {})
+    monkeypatch.setattr(alerter, "get_multiple_quotes",
+                        lambda symbols: {"NASDAQ:AAPL": {"symbol": "NASDAQ:AAPL", "last_price": next(prices)}})
+    monkeypatch.setattr(alerter, "push_price_alert", lambda alert, db=None: sent.append(alert))
+
+    for _ in range(3):
+        alerter.check_price_alerts()
+
+    assert [alert["target_price"] for alert in sent] == [220.0, 230.0]
+    assert [alert["current_price"] for alert in sent] == [225.0, 235.0]
+
+
+def test_move_rule_fires_from_tradingview_change(monkeypatch):
+    """轮询报价的涨跌幅取自 TradingView 的 change 指标，涨跌幅规则可以触发"""
+    config = parse_monitor_config({"price_alerts": [
+        {"symbol": "AAPL", "condition": "move_up", "percent": 3},
+    ]})
+    requested = []
+
+    def fake_get_multiple_analysis(screener, interval, symbols, additional_indicators=(), timeout=None):
+        requested.append(list(additional_indicators))
+        # 与 tradingview_ta 3.3.0 返回的字段一致：change 为涨跌幅（%），change_abs 为涨跌额
+        return {s: SimpleNamespace(indicators={"close": 206.0, "change": 3.5, "change_abs": 7.0}) for s in symbols}
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[AlertState.__table__])
+    sent = []
+    monkeypatch.setattr(alerter, "get_monitor_config", lambda: config)
+    monkeypatch.setattr(alerter, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(alerter, "_last_metrics", {})
+    monkeypatch.setattr(alerter, "push_price_alert", lambda alert, db=None: sent.append(alert))
+    monkeypatch.setattr(tradingview_fetcher, "get_multiple_analysis", fake_get_multiple_analysis)
+
+    alerter.check_price_alerts()
+
+    assert requested == [["change_abs"]]
+    assert [(alert["symbol"], alert["current_value"]) for alert in sent] == [("AAPL", 3.5)]
+    quote = tradingview_fetcher.get_stock_data("AAPL")
+    assert (quote["change"], quote["change_percent"]) == (7.0, 3.5)
+
+
+def test_indicator_rules_only_tick_on_the_hot_path(monkeypatch, tmp_path):
+    """K线同步与指标预热在定时任务中完成；报价求值只调用 engine.tick，不读取K线"""
+    import pandas as pd
+    from app.services import bar_store, indicator_engine
+
+    config = parse_monitor_config({"price_alerts": [
+        {"symbol": "TSLA", "indicator": "RSI_14", "condition": "above", "value": 70},
+    ]})
+    closes = [100.0 + i for i in range(40)]
+    bars = pd.DataFrame({"Close": closes}, index=pd.to_datetime([86400 * i for i in range(40)], unit="s"))
+    synced = []
+
+    def fake_get_bars_df(symbol, screener, timeout=None):
+        synced.append((symbol, timeout))
+        return bars
+
+    monkeypatch.setattr(alerter, "get_monitor_config", lambda: config)
+    monkeypatch.setattr(alerter, "_last_metrics", {})
+    monkeypatch.setattr(bar_store, "get_bars_df", fake_get_bars_df)
+    monkeypatch.setattr(indicator_engine, "_engine", indicator_engine.IndicatorEngine())
+    monkeypatch.setattr(indicator_engine.config, "INDICATOR_STATE_PATH", str(tmp_path / "state.json"))
+
+    alerter.warm_indicator_engine()
+    assert synced == [("NASDAQ:TSLA", alerter.config.MARKET_FETCH_TIMEOUT)]
+    assert (tmp_path / "state.json").exists()
+
+    for price in (140.0, 145.0, 150.0):
+        triggered = alerter.evaluate_quote(config.rules, "TSLA", None, {"last_price": price})
+        assert [rule.metric for rule, _ in triggered] == ["RSI_14"]
+    assert len(synced) == 1
+
+
+def test_config_reload_forgets_removed_symbols(monkeypatch):
+    """配置重新加载后删除的标的不保留上一次的值，再次加入时不会误判穿越"""
+    monkeypatch.setattr(alerter, "_last_metrics", {"AAPL": {PRICE: 215.0}, "TSLA": {PRICE: 180.0}})
+    alerter._on_config_reload(parse_monitor_config({"price_alerts": [
+        {"symbol": "TSLA", "condition": "below", "target_price": 170},
+    ]}))
+    assert list(alerter._last_metrics) == ["TSLA"]
+    assert alerter._on_config_reload in alerter.monitor_config._subscribers
@@ -0,0 +1,65 @@
+from app.models.alert_state import AlertState
+from app.services.alert_rules import PRICE
+from app.services.alert_state import AlertStateStore
+from app.services.monitor_config import parse_monitor_config
+
+
+RULES = parse_monitor_config({"price_alerts": [
+    {"id": "aapl-200", "symbol": "AAPL", "condition": "above", "target_price": 200, "hysteresis": 5},
+    {"id": "tsla-170", "symbol": "TSLA", "condition": "below", "target_price": 170},
+]}).rules
+
+
+def _fire_if_armed(store, symbol, price, now):
+    """模拟一次检查：先判断重新启用，再对触发的规则发送"""
+    metrics = {PRICE: price}
+    store.rearm(RULES, symbol, metrics, now=now)
+    fired = []
+    for rule, value in RULES.evaluate(symbol, metrics):
+        if store.is_armed(rule):
+            store.mark_fired(rule, value, price, now=now)
+            fired.append(rule.id)
+    store.db.commit()
+    return fired
+
+
+def test_rearms_only_after_moving_back_past_band(session_factory):
+    """触发后保持静默，价格回撤超过滞后带才重新启用"""
+    db = session_factory()
+    store = AlertStateStore(db)
+    assert _fire_if_armed(store, "AAPL", 201, now=1) == ["aapl-200"]
+    assert _fire_if_armed(store, "AAPL", 210, now=2) == []
+    # 回到阈值下方但仍在滞后带内：不重新启用
+    assert _fire_if_armed(store, "AAPL", 197, now=3) == []
+    assert _fire_if_armed(store, "AAPL", 201, now=4) == []
+    # 跌破 200 - 5 后重新启用，再次上穿时触发
+    assert _fire_if_armed(store, "AAPL", 194, now=5) == []
+    assert _fire_if_armed(store, "AAPL", 202, now=6) == ["aapl-200"]
+
+
+def test_state_survives_restart(session_factory):
+    """静默状态保存在数据库中，新进程（新的 store）不会重复发送"""
+    store = AlertStateStore(session_factory())
+    assert _fire_if_armed(store, "TSLA", 160, now=1) == ["tsla-170"]
+    store.db.close()
+
+    restarted = AlertStateStore(session_factory())
+    assert _fire_if_armed(restarted, "TSLA", 161, now=2) == []
+    state = restarted.db.get(AlertState, "tsla-170")
+    assert (state.armed, state.last_fired_at, state.last_price) == (False, 1, 160)
+
+
+def test_cleanup_removes_expired_armed_and_orphaned_states(session_factory):
+    """过期清理只删除已重新启用或已从配置中删除的规则，静默中的有效规则保留"""
+    db = session_factory()
+    db.add_all([
+        AlertState(rule_id="aapl-200", symbol="AAPL", armed=True, updated_at=0),
+        AlertState(rule_id="tsla-170", symbol="TSLA", armed=False, updated_at=0),
+        AlertState(rule_id="removed", symbol="NVDA", armed=False, updated_at=0),
+        AlertState(rule_id="recent", symbol="NVDA", armed=True, updated_at=990),
+    ])
+    db.commit()
+
+    assert AlertStateStore(db).cleanup(RULES, now=1000, ttl=100) == 2
+    db.commit()
+    assert sorted(s.rule_id for s in db.query(AlertState)) == ["recent", "tsla-170"]
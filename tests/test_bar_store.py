@@ -0,0 +1,70 @@
+import pandas as pd
+from app.services import bar_store, tradingview_fetcher
+
+DAY = 86400
+START = 1_700_006_400  # 2023-11-15 00:00:00 UTC
+
+
+def _frame(first_day: int, n: int, close_offset: float = 0.0) -> pd.DataFrame:
+    index = pd.to_datetime([START + (first_day + i) * DAY for i in range(n)], unit="s")
+    closes = [100.0 + first_day + i + close_offset for i in range(n)]
+    return pd.DataFrame({"Open": closes, "High": closes, "Low": closes, "Close": closes,
+                         "Volume": [1000.0] * n}, index=index)
+
+
+def test_backfill_then_incremental_tail_sync(db_session, monkeypatch):
+    """首次同步完整回溯，之后只请求缺失的尾部并覆盖最后一根K线"""
+    requests = []
+    upstream = {"df": _frame(0, 10)}
+
+    def fake_fetch_hist(symbol, screener, exchange, interval, n_bars, timeout=None):
+        requests.append(n_bars)
+        return upstream["df"].tail(n_bars)
+
+    monkeypatch.setattr(tradingview_fetcher, "fetch_hist", fake_fetch_hist)
+
+    assert bar_store.sync_bars(db_session, "AAPL", lookback=10, now=START + 9 * DAY + 60) == 10
+    assert requests == [10]
+
+    # 两天后：最后一根K线收盘价变化，并新增两根
+    upstream["df"] = pd.concat([_frame(0, 9), _frame(9, 3, close_offset=0.5)])
+    bar_store.sync_bars(db_session, "AAPL", lookback=10, now=START + 11 * DAY + 60)
+    assert requests[-1] == 2 + bar_store.TAIL_OVERLAP_BARS
+
+    df = bar_store.read_bars(db_session, "AAPL")
+    assert len(df) == 12
+    assert list(df.columns) == ["Open", "High", "Low", "Close", "Volume"]
+    assert df["Close"].iloc[-1] == 111.5
+    assert df["Close"].iloc[9] == 109.5
+    assert df.index[0] == pd.Timestamp(START, unit="s")
+
+
+def test_read_bars_array_and_limit(db_session):
+    """本地读取可限制条数并返回 NumPy 数组，无数据时返回空结果"""
+    bar_store.upsert_bars(db_session, _frame(0, 5), "AAPL", "NASDAQ", "1d")
+    db_session.commit()
+
+    ts, ohlcv = bar_store.read_bars_array(db_session, "AAPL", limit=3)
+    assert ts.tolist() == [START + i * DAY for i in (2, 3, 4)]
+    assert ohlcv.shape == (3, 5)
+    assert ohlcv[:, 3].tolist() == [102.0, 103.0, 104.0]
+
+    assert bar_store.read_bars(db_session, "TSLA") is None
+
+
+def test_get_bars_df_uses_exchange_prefix(db_session, monkeypatch):
+    """带交易所前缀的代码按前缀中的交易所同步与读取，不使用默认交易所"""
+    requests = []
+
+    def fake_fetch_hist(symbol, screener, exchange, interval, n_bars, timeout=None):
+        requests.append((exchange, symbol))
+        return _frame(0, 3)
+
+    monkeypatch.setattr(tradingview_fetcher, "fetch_hist", fake_fetch_hist)
+    monkeypatch.setattr(bar_store, "SessionLocal", lambda: db_session)
+    monkeypatch.setattr(bar_store, "_sync_cache", bar_store.TTLCache(maxsize=10, ttl=60))
+
+    df = bar_store.get_bars_df("nyse:docn")
+    assert requests == [("NYSE", "DOCN")]
+    assert df["Close"].tolist() == [100.0, 101.0, 102.0]
+    assert bar_store.read_bars(db_session, "DOCN", "NASDAQ") is None
@@ -0,0 +1,44 @@
+from app.services.browser_pool import BrowserPool, is_session_state_valid
+
+NOW = 1_700_000_000
+
+
+def _state(*cookies):
+    return {"cookies": list(cookies), "origins": []}
+
+
+def test_session_valid_with_unexpired_auth_cookie():
+    """关键 Cookie 未过期时视为有效"""
+    state = _state({"name": "auth_token", "value": "abc", "expires": NOW + 3600})
+    assert is_session_state_valid(state, "x", now=NOW)
+
+
+def test_session_invalid_when_auth_cookie_expired_or_missing():
+    """关键 Cookie 过期或缺失时视为无效"""
+    expired = _state({"name": "auth_token", "value": "abc", "expires": NOW - 1})
+    missing = _state({"name": "guest_id", "value": "abc", "expires": NOW + 3600})
+    assert not is_session_state_valid(expired, "x", now=NOW)
+    assert not is_session_state_valid(missing, "x", now=NOW)
+    assert not is_session_state_valid({}, "x", now=NOW)
+
+
+def test_session_cookie_without_expiry_is_valid():
+    """expires 为 -1 的会话 Cookie 视为有效"""
+    state = _state({"name": "auth_token", "value": "abc", "expires": -1})
+    assert is_session_state_valid(state, "x", now=NOW)
+
+
+def test_pool_runs_coroutines_on_persistent_loop():
+    """多次提交的协程运行在同一个常驻事件循环上"""
+    import asyncio
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    pool = BrowserPool()
+    try:
+        first = pool.run(current_loop(), timeout=5)
+        second = pool.run(current_loop(), timeout=5)
+        assert first is second
+    finally:
+        pool.close()
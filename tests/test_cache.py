@@ -0,0 +1,106 @@
+import threading
+import time
+import pytest
+from app.core.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_miss_and_ttl_expiry():
+    """新鲜期内命中，过期后重新加载"""
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_load("k", loader) == 1
+    assert cache.get_or_load("k", loader) == 1
+    clock.now = 11
+    assert cache.get_or_load("k", loader) == 2
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+
+def test_lru_eviction():
+    """超过容量时淘汰最久未使用的条目"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.get_or_load("a", lambda: "A")
+    cache.get_or_load("b", lambda: "B")
+    cache.get_or_load("a", lambda: "A")  # a 变为最近使用
+    cache.get_or_load("c", lambda: "C")
+
+    assert len(cache) == 2
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_or_load("a", lambda: "reloaded") == "A"
+    assert cache.get_or_load("b", lambda: "reloaded") == "reloaded"
+
+
+def test_concurrent_misses_are_coalesced():
+    """同一键的并发未命中只触发一次上游调用"""
+    cache = TTLCache(ttl=60)
+    calls = []
+    started = threading.Event()
+
+    def slow_loader():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", slow_loader)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["value"] * 8
+    assert cache.stats()["coalesced"] == 7
+
+
+def test_stale_while_revalidate():
+    """过期后在宽限期内立即返回旧值，并在后台刷新"""
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, stale_ttl=100, clock=clock)
+    refreshed = threading.Event()
+    cache.get_or_load("k", lambda: "old")
+
+    def refresh():
+        refreshed.set()
+        return "new"
+
+    clock.now = 20
+    assert cache.get_or_load("k", refresh) == "old"
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if cache.get_or_load("k", refresh) == "new":
+            break
+        time.sleep(0.01)
+    assert cache.get_or_load("k", refresh) == "new"
+    assert cache.stats()["stale_hits"] >= 1
+
+
+def test_failures_and_none_are_not_cached():
+    """加载失败或返回 None 时不写入缓存"""
+    cache = TTLCache(ttl=60)
+
+    def failing():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", failing)
+    assert cache.get_or_load("n", lambda: None) is None
+    assert len(cache) == 0
+    assert cache.get_or_load("k", lambda: "ok") == "ok"
@@ -2,21 +2,27 @@ import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 from app.models.item import Item
-from app.db.database import SessionLocal, Base, engine
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db import database
+from app.db.database import configure_sqlite, init_db
 
 client = TestClient(app)
 
 @pytest.fixture(scope="function")
-def db_session():
-    """为每个测试函数提供一个干净的数据库会话"""
-    Base.metadata.create_all(bind=engine)
-    db = SessionLocal()
+def db_session(tmp_path, monkeypatch):
+    """为每个测试函数提供一个干净的数据库会话，数据库建在临时目录中，不在仓库根目录生成 hotspot.db"""
+    engine = configure_sqlite(create_engine(f"sqlite:///{tmp_path / 'hotspot.db'}",
+                                            connect_args={"check_same_thread": False}))
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    init_db()
+    db = database.SessionLocal()
     try:
         yield db
     finally:
-        db.query(Item).delete() # 清理数据
-        db.commit()
         db.close()
+        engine.dispose()
 
 def test_view_dashboard_no_data(db_session):
     """测试数据库为空时访问后台页面"""
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.services import indicator_engine
+from app.services.indicator_engine import IndicatorEngine
+
+COLUMNS = ["RSI_14", "MACD_12_26_9", "MACDh_12_26_9", "MACDs_12_26_9", "SMA_20", "SMA_50"]
+
+
+def _closes(n=200, seed=7):
+    rng = np.random.default_rng(seed)
+    return 100 + np.cumsum(rng.normal(0, 1.5, n))
+
+
+def _reference(closes) -> pd.DataFrame:
+    """按 pandas_ta 的公式用 pandas 计算参考值"""
+    close = pd.Series(closes)
+
+    def rma(s, length):
+        return s.ewm(alpha=1.0 / length, min_periods=length).mean()
+
+    def ema(s, length):
+        s = s.copy()
+        s.iloc[length - 1] = s.iloc[:length].mean()
+        s.iloc[:length - 1] = np.nan
+        return s.ewm(span=length, adjust=False).mean()
+
+    diff = close.diff()
+    gain, loss = diff.clip(lower=0), (-diff).clip(lower=0)
+    gain[diff.isna()] = np.nan
+    loss[diff.isna()] = np.nan
+    rsi = 100 * rma(gain, 14) / (rma(gain, 14) + rma(loss, 14))
+    macd = ema(close, 12) - ema(close, 26)
+    valid = macd.loc[macd.first_valid_index():]
+    signal = ema(valid.reset_index(drop=True), 9)
+    signal.index = valid.index
+    return pd.DataFrame({
+        "RSI_14": rsi,
+        "MACD_12_26_9": macd,
+        "MACDh_12_26_9": macd - signal,
+        "MACDs_12_26_9": signal,
+        "SMA_20": close.rolling(20).mean(),
+        "SMA_50": close.rolling(50).mean(),
+    })
+
+
+def _stream(closes) -> pd.DataFrame:
+    engine = IndicatorEngine()
+    rows = [engine.update("AAPL", float(c), ts=i) for i, c in enumerate(closes)]
+    return pd.DataFrame(rows)[COLUMNS].astype(float)
+
+
+def test_streaming_matches_batch_reference():
+    """逐根增量计算的结果与整段批量计算一致"""
+    closes = _closes()
+    pd.testing.assert_frame_equal(_stream(closes), _reference(closes)[COLUMNS], rtol=1e-9, atol=1e-9)
+
+
+def test_linear_and_monotonic_series_exact_values():
+    """不依赖 pandas_ta 的数值校验：线性序列上各指标有解析解"""
+    engine = IndicatorEngine()
+    rows = [engine.update("AAPL", float(i), ts=i) for i in range(60)]
+    # 以 SMA 为种子的 EMA 在线性序列上恰好滞后 (length - 1) / 2，故 MACD = (26 - 1) / 2 - (12 - 1) / 2
+    assert rows[24]["MACD_12_26_9"] is None
+    assert rows[25]["MACD_12_26_9"] == pytest.approx(7.0, abs=1e-12)
+    assert rows[32]["MACDs_12_26_9"] is None
+    assert rows[59]["MACDs_12_26_9"] == pytest.approx(7.0, abs=1e-12)
+    assert rows[59]["MACDh_12_26_9"] == pytest.approx(0.0, abs=1e-12)
+    assert rows[59]["SMA_20"] == pytest.approx(59 - 9.5)
+    assert rows[59]["SMA_50"] == pytest.approx(59 - 24.5)
+    # 只涨不跌时 RSI 为 100，只跌不涨时为 0；前 length 个变化不足以计算
+    assert rows[13]["RSI_14"] is None
+    assert rows[14]["RSI_14"] == pytest.approx(100.0)
+    falling = IndicatorEngine().warm_up("TSLA", [float(100 - i) for i in range(30)])
+    assert falling["RSI_14"] == pytest.approx(0.0)
+
+
+def test_streaming_matches_pandas_ta():
+    """与 pandas_ta 的结果在容差范围内一致"""
+    pytest.importorskip("pandas_ta")
+    closes = _closes()
+    df = pd.DataFrame({"close": closes})
+    df.ta.rsi(length=14, append=True)
+    df.ta.macd(fast=12, slow=26, signal=9, append=True)
+    df.ta.sma(length=20, append=True)
+    df.ta.sma(length=50, append=True)
+    pd.testing.assert_frame_equal(_stream(closes), df[COLUMNS].astype(float), rtol=1e-6, atol=1e-6)
+
+
+def test_tick_does_not_advance_state():
+    """盘中报价只计算不推进；其结果等于以该价格收盘后的 update"""
+    closes = _closes(80)
+    engine = IndicatorEngine()
+    engine.warm_up("AAPL", closes[:-1])
+
+    peeked = engine.tick("AAPL", float(closes[-1]))
+    assert engine.tick("AAPL", float(closes[-1])) == peeked
+    assert engine.update("AAPL", float(closes[-1])) == peeked
+
+
+def test_state_survives_save_and_load(tmp_path):
+    """状态保存后重新加载，可以接着增量计算"""
+    closes = _closes(120)
+    path = str(tmp_path / "indicator_state.json")
+
+    engine = IndicatorEngine()
+    engine.warm_up("AAPL", closes[:100], timestamps=range(100))
+    engine.save(path)
+
+    restored = IndicatorEngine.load(path)
+    assert restored.last_ts("AAPL") == 99
+    # 已处理过的K线会被忽略
+    restored.warm_up("AAPL", closes, timestamps=range(120))
+    engine.warm_up("AAPL", closes[100:], timestamps=range(100, 120))
+    assert restored.to_dict() == engine.to_dict()
+
+
+def test_shared_engine_saved_and_restored(tmp_path, monkeypatch):
+    """共享引擎的状态写入 INDICATOR_STATE_PATH，下次启动时恢复"""
+    closes = _closes(60)
+    monkeypatch.setattr(indicator_engine.config, "INDICATOR_STATE_PATH", str(tmp_path / "state.json"))
+    monkeypatch.setattr(indicator_engine, "_engine", None)
+    indicator_engine.save_indicator_engine()  # 尚未使用时不写文件
+    assert not (tmp_path / "state.json").exists()
+
+    engine = indicator_engine.get_indicator_engine()
+    engine.warm_up("AAPL", closes, timestamps=range(60))
+    indicator_engine.save_indicator_engine()
+
+    monkeypatch.setattr(indicator_engine, "_engine", None)
+    restored = indicator_engine.get_indicator_engine()
+    assert restored is not engine
+    assert restored.to_dict() == engine.to_dict()
+    # 滑动窗口的累加和在恢复时重新求和，与持续累加的结果只有舍入误差
+    assert restored.tick("AAPL", 120.0) == pytest.approx(engine.tick("AAPL", 120.0), rel=1e-12)
@@ -0,0 +1,56 @@
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from app.db import database
+from app.main import app
+from app.models.item import Item, list_items
+
+
+@pytest.fixture(scope="function")
+def session_factory(session_factory, monkeypatch):
+    """接口使用测试的内存数据库"""
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    return session_factory
+
+
+def _seed(db, n):
+    # 一部分条目使用服务端默认时间（同一秒内写入，只能靠 id 区分顺序），一部分显式指定时间
+    for i in range(n):
+        created_at = datetime(2024, 1, 1, 0, 0, i % 3) if i % 2 else None
+        item = Item(title=f"t{i}", url=f"https://example.com/{i}", source="A" if i % 3 else "B")
+        if created_at:
+            item.created_at = created_at
+        db.add(item)
+    db.commit()
+
+
+def test_keyset_pagination_visits_every_item_once(session_factory):
+    """逐页翻完所有条目，没有重复或遗漏，且整体按 (created_at, id) 倒序"""
+    db = session_factory()
+    _seed(db, 23)
+    seen, cursor = [], None
+    while True:
+        items, cursor = list_items(db, limit=5, cursor=cursor)
+        seen.extend(items)
+        if cursor is None:
+            break
+    expected = db.query(Item).order_by(Item.created_at.desc(), Item.id.desc()).all()
+    assert [item.id for item in seen] == [item.id for item in expected]
+
+    items, cursor = list_items(db, limit=100, source="B")
+    assert cursor is None
+    assert {item.source for item in items} == {"B"} and len(items) == 8
+
+
+def test_items_api(session_factory):
+    """JSON 接口按来源过滤并通过 next_cursor 翻页；无效游标返回 400"""
+    _seed(session_factory(), 10)
+    client = TestClient(app)
+    first = client.get("/api/items", params={"limit": 4, "source": "A"}).json()
+    second = client.get("/api/items", params={"limit": 4, "source": "A", "cursor": first["next_cursor"]}).json()
+    assert len(first["items"]) == 4 and len(second["items"]) == 2
+    assert second["next_cursor"] is None
+    assert not {i["id"] for i in first["items"]} & {i["id"] for i in second["items"]}
+
+    assert client.get("/api/items", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/items", params={"limit": 0}).status_code == 422
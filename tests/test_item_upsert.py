@@ -0,0 +1,47 @@
+from sqlalchemy import event
+from app.models.item import Item, bulk_upsert_items
+
+
+def _record(title, hot_score=0.0):
+    return {"title": title, "url": f"https://x.com/search?q={title}", "source": "X 趋势", "hot_score": hot_score}
+
+
+def test_bulk_upsert_inserts_and_updates(db_session):
+    """已存在的链接只更新热度，新链接被插入并作为新条目返回"""
+    db_session.add(Item(title="a", url="https://x.com/search?q=a", source="X 趋势", hot_score=1.0))
+    db_session.commit()
+
+    new_items, updated = bulk_upsert_items(db_session, [_record("a", 10.0), _record("b", 20.0)])
+    db_session.commit()
+
+    assert [item.title for item in new_items] == ["b"]
+    assert updated == 1
+    rows = {item.title: item for item in db_session.query(Item).all()}
+    assert rows["a"].hot_score == 10.0
+    assert rows["a"].updated_at is not None
+    assert rows["b"].hot_score == 20.0
+
+
+def test_bulk_upsert_resolves_existing_urls_in_one_query(db_session):
+    """无论多少条记录，已存在链接的解析只发出一条 SELECT"""
+    db_session.add_all([Item(title=str(i), url=f"https://x.com/search?q={i}", source="X 趋势") for i in range(50)])
+    db_session.commit()
+
+    statements = []
+    event.listen(db_session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    bulk_upsert_items(db_session, [_record(str(i), i) for i in range(100)])
+    db_session.commit()
+
+    assert sum(1 for s in statements if s.lstrip().upper().startswith("SELECT")) == 1
+    assert db_session.query(Item).count() == 100
+
+
+def test_bulk_upsert_dedupes_within_batch(db_session):
+    """同一批次中重复的链接以最后一条为准"""
+    new_items, updated = bulk_upsert_items(db_session, [_record("a", 1.0), _record("a", 2.0)])
+    db_session.commit()
+
+    assert len(new_items) == 1
+    assert updated == 0
+    assert db_session.query(Item).one().hot_score == 2.0
@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from app.core import leader
+from app.core.leader import LeaderElector
+
+pytestmark = pytest.mark.skipif(leader.fcntl is None, reason="需要 fcntl")
+
+
+def test_only_one_elector_holds_the_lock(tmp_path):
+    """同一锁文件只能有一个 leader，释放后其他进程可以接任"""
+    lock_path = str(tmp_path / "hotspot.db.leader")
+    first = LeaderElector(lock_path)
+    second = LeaderElector(lock_path)
+    try:
+        assert first.try_acquire()
+        assert not second.try_acquire()
+        assert first.is_leader and not second.is_leader
+
+        first.release()
+        assert second.try_acquire()
+    finally:
+        first.release()
+        second.release()
+
+
+def test_campaign_fails_over_within_lease(tmp_path):
+    """leader 释放锁后，等待中的进程在一个租约周期内接管"""
+    lock_path = str(tmp_path / "hotspot.db.leader")
+    current = LeaderElector(lock_path)
+    standby = LeaderElector(lock_path, lease_seconds=0.05)
+    elected = []
+
+    async def main():
+        assert current.try_acquire()
+        task = asyncio.create_task(standby.campaign(lambda: elected.append(True)))
+        await asyncio.sleep(0.2)
+        assert not elected
+        current.release()
+        await asyncio.wait_for(task, timeout=1)
+
+    try:
+        asyncio.run(main())
+        assert elected == [True]
+    finally:
+        current.release()
+        standby.release()
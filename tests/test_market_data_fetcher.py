@@ -0,0 +1,65 @@
+import threading
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+from app.services import market_data_fetcher
+from app.services.market_data_fetcher import fetch_histories
+
+
+def test_fetch_histories_runs_concurrently_and_drops_slow_symbols(monkeypatch):
+    """各标的并发获取；超过截止时间的标的返回 None，不等待其完成"""
+    # 三个标的必须同时处于获取中才能越过屏障，顺序执行会在屏障处超时
+    barrier = threading.Barrier(3, timeout=5)
+    release = threading.Event()
+
+    def fake_get_bars_df(symbol, timeout=None):
+        if symbol == "SLOW":
+            release.wait(5)
+        else:
+            barrier.wait()
+        return f"bars-{symbol}"
+
+    monkeypatch.setattr(market_data_fetcher, "get_bars_df", fake_get_bars_df)
+    try:
+        results = fetch_histories(["AAPL", "TSLA", "NVDA", "SLOW"], timeout=1, deadline=0.5)
+    finally:
+        release.set()
+
+    assert results["AAPL"] == "bars-AAPL"
+    assert results["TSLA"] == "bars-TSLA"
+    assert results["NVDA"] == "bars-NVDA"
+    assert results["SLOW"] is None
+
+
+def test_fetch_histories_isolates_errors(monkeypatch):
+    """单个标的出错只影响该标的"""
+    def fake_get_bars_df(symbol, timeout=None):
+        if symbol == "BAD":
+            raise RuntimeError("boom")
+        return f"bars-{symbol}"
+
+    monkeypatch.setattr(market_data_fetcher, "get_bars_df", fake_get_bars_df)
+    results = fetch_histories(["AAPL", "BAD"], timeout=1, deadline=1)
+
+    assert results == {"AAPL": "bars-AAPL", "BAD": None}
+
+
+def test_market_summary_change_from_last_two_closes(monkeypatch):
+    """个股涨跌额与涨跌幅由最后两根K线的收盘价计算，K线不足两根时为 None"""
+    frames = {
+        "AAPL": pd.DataFrame({"Close": [100.0, 200.0, 210.0]}),
+        "TSLA": pd.DataFrame({"Close": [50.0, 45.0]}),
+        "NEW": pd.DataFrame({"Close": [10.0]}),
+    }
+    monkeypatch.setattr(market_data_fetcher, "get_monitor_config", lambda: SimpleNamespace(symbols=list(frames)))
+    monkeypatch.setattr(market_data_fetcher, "get_bars_df", lambda symbol, timeout=None: frames[symbol])
+    monkeypatch.setattr(market_data_fetcher, "get_index_data", lambda *args, **kwargs: None)
+
+    stocks = {stock["symbol"]: stock for stock in market_data_fetcher.get_market_summary()["monitored_stocks"]}
+
+    assert stocks["AAPL"]["change"] == pytest.approx(10.0)
+    assert stocks["AAPL"]["change_percent"] == pytest.approx(5.0)
+    assert stocks["TSLA"]["change"] == pytest.approx(-5.0)
+    assert stocks["TSLA"]["change_percent"] == pytest.approx(-10.0)
+    assert stocks["NEW"]["change"] is None
+    assert stocks["NEW"]["change_percent"] is None
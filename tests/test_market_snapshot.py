@@ -0,0 +1,114 @@
+import threading
+import time
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import market_snapshot as snapshot_module
+from app.services.market_snapshot import MarketSnapshotService
+
+SUMMARY = {"indices": {}, "monitored_stocks": []}
+
+
+class _SlowLoader:
+    def __init__(self, delay=0.2, results=None):
+        self.delay = delay
+        self.calls = 0
+        self.results = list(results or [])
+        # 设置后抓取阻塞到该事件被置位，用于模拟挂起的上游
+        self.gate = None
+
+    def __call__(self):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        else:
+            time.sleep(self.delay)
+        return self.results.pop(0) if self.results else {"call": self.calls}
+
+
+def test_concurrent_readers_share_one_refresh():
+    """多个读取方同时请求时只触发一次上游抓取"""
+    loader = _SlowLoader()
+    service = MarketSnapshotService(loader, max_age=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.refresh(5))) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loader.calls == 1
+    assert {snapshot.version for snapshot in results} == {1}
+    # 新鲜期内的读取不再抓取
+    for _ in range(100):
+        assert service.get().version == 1
+    assert loader.calls == 1
+
+
+def test_stale_snapshot_is_served_while_revalidating():
+    """快照过期时立即返回旧数据，后台刷新完成后读到新版本"""
+    now = [1000.0]
+    loader = _SlowLoader(delay=0.1)
+    service = MarketSnapshotService(loader, max_age=60, clock=lambda: now[0])
+    assert service.refresh(5).data == {"call": 1}
+
+    now[0] += 61
+    # 后台刷新挂起期间读取方仍立即拿到旧快照
+    loader.gate = threading.Event()
+    stale = service.get()
+    assert (stale.version, stale.age(now[0])) == (1, 61)
+    assert service.refreshing
+    assert service.get() is stale
+    loader.gate.set()
+    service.refresh(5)
+    assert service.get().data == {"call": 2}
+    assert loader.calls == 2
+
+
+def test_failed_refresh_keeps_last_good_snapshot():
+    """刷新失败时保留上一次的快照并记录错误"""
+    loader = _SlowLoader(delay=0, results=[SUMMARY, None])
+    service = MarketSnapshotService(loader, max_age=0)
+    assert service.refresh(5).version == 1
+    snapshot = service.refresh(5)
+    assert (snapshot.version, snapshot.data) == (1, SUMMARY)
+    assert service.last_error
+
+
+def test_financials_page_reads_snapshot(monkeypatch):
+    """金融仪表盘显示快照数据与数据年龄，不在请求中抓取"""
+    loader = _SlowLoader(delay=0, results=[SUMMARY])
+    service = MarketSnapshotService(loader, max_age=60)
+    monkeypatch.setattr(snapshot_module, "market_snapshot", service)
+    client = TestClient(app)
+    for _ in range(5):
+        response = client.get("/financials")
+        assert response.status_code == 200
+        assert "版本 1" in response.text
+    assert loader.calls == 1
+
+
+def test_summary_email_skipped_when_snapshot_is_stale(monkeypatch):
+    """刷新失败时不把过旧的快照当作最新行情发出，并记录刷新错误"""
+    from app.services import pusher
+
+    # 快照时间 = 当前时间 - shift，用于构造一个 700 秒前的快照
+    shift = [0]
+    # 邮件模板还需要涨跌榜
+    summary = {**SUMMARY, "gainers": [], "losers": []}
+    service = MarketSnapshotService(_SlowLoader(delay=0, results=[summary, summary, None]), max_age=60,
+                                    clock=lambda: time.time() - shift[0])
+    monkeypatch.setattr(snapshot_module, "market_snapshot", service)
+    monkeypatch.setattr(pusher.config, "MARKET_SUMMARY_MAX_STALENESS", 600)
+    enqueued = []
+    monkeypatch.setattr(pusher, "_enqueue", lambda *args: enqueued.append(args))
+
+    service.refresh(5)
+    pusher.push_market_summary()
+    assert len(enqueued) == 1
+
+    shift[0] = 700
+    service.refresh(5)
+    shift[0] = 0
+    pusher.push_market_summary()
+    assert service.refreshes == 3 and service.last_error
+    assert len(enqueued) == 1
@@ -0,0 +1,62 @@
+import os
+import yaml
+from app.services import monitor_config
+from app.services.monitor_config import MonitorConfigService
+
+
+def _write(path, text, mtime_ns):
+    path.write_text(text)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+GOOD = "price_alerts:\n  - {symbol: AAPL, condition: above, target_price: 220}\n  - {symbol: TSLA, condition: below, target_price: 170}\n"
+
+
+def test_parses_only_when_file_changes(tmp_path, monkeypatch):
+    """文件不变时直接返回已发布的配置，不重复解析 YAML"""
+    path = tmp_path / "monitor_config.yaml"
+    _write(path, GOOD, 1_000_000_000)
+    parses = []
+    real_load = yaml.load
+    monkeypatch.setattr(monitor_config.yaml, "load", lambda f, Loader: parses.append(1) or real_load(f, Loader))
+
+    service = MonitorConfigService(str(path))
+    first = service.get()
+    assert first.symbols == ["AAPL", "TSLA"]
+    assert service.get() is first
+    assert len(parses) == 1
+
+    _write(path, GOOD + "  - {symbol: NVDA, condition: above, target_price: 150}\n", 2_000_000_000)
+    second = service.get()
+    assert second.version == first.version + 1
+    assert second.symbols == ["AAPL", "TSLA", "NVDA"]
+    assert len(parses) == 2
+
+
+def test_bad_edit_keeps_last_good_config(tmp_path):
+    """任一规则无效时整份新配置被拒绝，继续使用上一次的有效配置，修复后重新生效"""
+    path = tmp_path / "monitor_config.yaml"
+    _write(path, GOOD, 1_000_000_000)
+    service = MonitorConfigService(str(path))
+    published = []
+    service.subscribe(published.append)
+    good = service.get()
+
+    _write(path, GOOD + "  - {symbol: NVDA, condition: above}\n", 2_000_000_000)
+    assert service.get() is good
+    _write(path, "price_alerts: [unclosed\n", 3_000_000_000)
+    assert service.get() is good
+    os.remove(path)
+    assert service.get() is good
+
+    _write(path, "price_alerts:\n  - {symbol: NVDA, condition: above, target_price: 150}\n", 4_000_000_000)
+    fixed = service.get()
+    assert fixed.symbols == ["NVDA"]
+    assert published == [good, fixed]
+
+
+def test_missing_file_gives_empty_config(tmp_path):
+    """配置文件从未存在时返回空配置"""
+    config = MonitorConfigService(str(tmp_path / "missing.yaml")).get()
+    assert config.symbols == []
+    assert len(config.rules) == 0
@@ -0,0 +1,152 @@
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.database import Base, configure_sqlite
+from app.db.migrations import run_migrations
+from app.core.rate_limit import KeyedRateLimiter
+from app.models.item import Item
+from app.models.outbox import OutboxMessage, PENDING, SENDING, SENT, DEAD, PRIORITY_CRITICAL
+from app.services import outbox
+from app.services.outbox import OutboxWorker, deliver_due, enqueue_email, requeue_in_flight
+
+
+@pytest.fixture(scope="function")
+def session_factory(session_factory, monkeypatch):
+    """发件箱服务使用测试的内存数据库"""
+    monkeypatch.setattr(outbox, "SessionLocal", session_factory)
+    return session_factory
+
+
+def test_enqueue_is_idempotent(session_factory):
+    """相同幂等键的邮件只入队一次"""
+    assert enqueue_email("s", "<p>x</p>", "key-1", ["a@example.com"], now=100)
+    assert not enqueue_email("s", "<p>x</p>", "key-1", ["a@example.com"], now=101)
+    db = session_factory()
+    assert db.query(OutboxMessage).count() == 1
+
+
+def test_fans_out_per_recipient(session_factory):
+    """每个收件人一条消息，重复入队仍然只有一份"""
+    assert enqueue_email("s", "c", "k", ["a@example.com", "b@example.com"], now=0)
+    assert not enqueue_email("s", "c", "k", ["a@example.com", "b@example.com"], now=1)
+    db = session_factory()
+    assert sorted(m.recipients for m in db.query(OutboxMessage)) == ["a@example.com", "b@example.com"]
+
+
+def test_enqueue_on_outbox_created_before_priority(monkeypatch):
+    """优先级列加入之前创建的发件箱，在启动迁移后可以照常按优先级入队与投递"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE outbox (id INTEGER PRIMARY KEY, idempotency_key VARCHAR UNIQUE, subject VARCHAR, "
+            "content TEXT, recipients VARCHAR, status VARCHAR, attempts INTEGER, next_attempt_at INTEGER, "
+            "last_error TEXT, created_at INTEGER, sent_at INTEGER)"))
+    # 与 init_db 相同：先建出缺少的表，再执行迁移
+    Base.metadata.create_all(bind=engine, tables=[Item.__table__, OutboxMessage.__table__])
+    run_migrations(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(outbox, "SessionLocal", factory)
+
+    assert enqueue_email("normal", "c", "n", ["a@example.com"], now=0)
+    assert enqueue_email("critical", "c", "c", ["a@example.com"], now=0, priority=PRIORITY_CRITICAL)
+    sent = []
+    deliver_due(factory(), send=lambda subject, content, recipients: sent.append(subject), now=0)
+    assert sent == ["critical", "normal"]
+    engine.dispose()
+
+
+def test_recipient_rate_limit_defers_normal_and_passes_critical(session_factory):
+    """超出收件人额度的普通邮件顺延且不计为失败；紧急邮件优先投递并透支额度"""
+    clock = [0.0]
+    limiter = KeyedRateLimiter(rate=1 / 60, capacity=2, clock=lambda: clock[0])
+    for i in range(4):
+        enqueue_email(f"normal {i}", "c", f"n{i}", ["a@example.com"], now=0)
+    enqueue_email("critical", "c", "c0", ["a@example.com"], now=0, priority=PRIORITY_CRITICAL)
+    db = session_factory()
+    sent = []
+
+    def send(subject, content, recipients):
+        sent.append(subject)
+
+    # 紧急邮件排在最前，并占用了一个令牌
+    assert deliver_due(db, send, now=0, limiter=limiter) == {"sent": 2, "retry": 0, "dead": 0, "throttled": 3}
+    assert sent == ["critical", "normal 0"]
+    deferred = db.query(OutboxMessage).filter(OutboxMessage.status == PENDING).all()
+    assert [(m.attempts, m.next_attempt_at) for m in deferred] == [(0, 60)] * 3
+
+    clock[0] = 60.0
+    assert deliver_due(db, send, now=60, limiter=limiter) == {"sent": 1, "retry": 0, "dead": 0, "throttled": 2}
+    assert sent[-1] == "normal 1"
+
+
+def test_retries_with_backoff_then_dead_letters(session_factory, monkeypatch):
+    """失败后按指数退避重试，超过最大次数进入死信；到期前不会重试"""
+    monkeypatch.setattr(outbox.config, "OUTBOX_RETRY_BASE", 10)
+    monkeypatch.setattr(outbox.config, "OUTBOX_MAX_ATTEMPTS", 3)
+    enqueue_email("s", "c", "k", ["a@example.com"], now=0)
+    db = session_factory()
+
+    def failing_send(subject, content, recipients):
+        raise ConnectionRefusedError("smtp down")
+
+    assert deliver_due(db, failing_send, now=0) == {"sent": 0, "retry": 1, "dead": 0, "throttled": 0}
+    message = db.query(OutboxMessage).one()
+    assert (message.status, message.attempts, message.next_attempt_at) == (PENDING, 1, 10)
+    assert deliver_due(db, failing_send, now=9) == {"sent": 0, "retry": 0, "dead": 0, "throttled": 0}
+    assert deliver_due(db, failing_send, now=10) == {"sent": 0, "retry": 1, "dead": 0, "throttled": 0}
+    assert db.query(OutboxMessage).one().next_attempt_at == 30
+    assert deliver_due(db, failing_send, now=30) == {"sent": 0, "retry": 0, "dead": 1, "throttled": 0}
+    message = db.query(OutboxMessage).one()
+    assert (message.status, message.last_error) == (DEAD, "smtp down")
+
+
+def test_in_flight_messages_are_requeued(session_factory):
+    """进程在投递中途退出后，发送中的消息重新排队"""
+    enqueue_email("s", "c", "k", ["a@example.com"], now=0)
+    db = session_factory()
+    db.query(OutboxMessage).update({"status": SENDING})
+    db.commit()
+    assert requeue_in_flight(db) == 1
+    sent = []
+    deliver_due(db, lambda *args: sent.append(args), now=1)
+    assert sent == [("s", "c", ["a@example.com"])]
+    assert db.query(OutboxMessage).one().status == SENT
+
+
+def test_producers_return_immediately_when_smtp_is_slow(tmp_path, monkeypatch):
+    """生产者只入队；投递线程被唤醒后在后台完成慢速发送"""
+    # 生产者与投递线程并发写入，各自使用独立连接（共享单连接的内存库会出现嵌套事务错误）
+    engine = configure_sqlite(create_engine(f"sqlite:///{tmp_path / 'outbox.db'}"))
+    Base.metadata.create_all(bind=engine, tables=[OutboxMessage.__table__])
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(outbox, "SessionLocal", session_factory)
+    delivered = []
+    smtp_stuck = threading.Event()
+
+    def slow_send(subject, content, recipients):
+        smtp_stuck.wait(5)
+        delivered.append(subject)
+
+    worker = OutboxWorker(session_factory, send=slow_send, poll_interval=60, collect=lambda db: 0)
+    outbox_worker = outbox.outbox_worker
+    outbox.outbox_worker = worker
+    worker.start()
+    try:
+        # SMTP 挂起期间入队照常返回，且没有任何邮件在生产者线程中发送
+        for i in range(3):
+            assert enqueue_email(f"alert {i}", "c", f"k{i}", ["a@example.com"])
+        assert delivered == []
+        smtp_stuck.set()
+        deadline = time.monotonic() + 5
+        while len(delivered) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        smtp_stuck.set()
+        worker.stop()
+        outbox.outbox_worker = outbox_worker
+        engine.dispose()
+
+    assert delivered == ["alert 0", "alert 1", "alert 2"]
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from app.services.indicator_engine import IndicatorEngine
+from app.services.quant_analyzer import PANEL_COLUMNS, build_close_panel, compute_indicator_panel
+
+
+def _random_closes(n, seed):
+    rng = np.random.default_rng(seed)
+    return 100 + np.cumsum(rng.normal(0, 1.5, n))
+
+
+def _streamed(closes) -> dict:
+    engine = IndicatorEngine()
+    rows = [engine.update("X", float(c)) for c in closes]
+    return {name: np.array([np.nan if r[name] is None else r[name] for r in rows]) for name in PANEL_COLUMNS}
+
+
+def test_panel_matches_per_symbol_computation_with_ragged_history():
+    """面板计算与逐标的计算结果一致，历史较短的标的左侧填充 NaN"""
+    frames = {
+        "AAPL": pd.DataFrame({"Close": _random_closes(150, 1)}),
+        "TSLA": pd.DataFrame({"Close": _random_closes(90, 2)}),
+        "EMPTY": pd.DataFrame({"Close": []}),
+    }
+    symbols, panel = build_close_panel(frames)
+    assert symbols == ["AAPL", "TSLA"]
+    assert panel.shape == (2, 150)
+    assert np.isnan(panel[1, :60]).all()
+
+    result = compute_indicator_panel(panel)
+    for row, symbol in enumerate(symbols):
+        closes = frames[symbol]["Close"].to_numpy()
+        expected = _streamed(closes)
+        for name in PANEL_COLUMNS:
+            actual = result[name][row, -len(closes):]
+            np.testing.assert_allclose(actual, expected[name], rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_latest_only_and_process_pool_agree():
+    """只取最新值与进程池并行计算的结果与完整计算一致"""
+    panel = np.vstack([_random_closes(120, seed) for seed in range(10)])
+    full = compute_indicator_panel(panel)
+    latest = compute_indicator_panel(panel, latest_only=True)
+    pooled = compute_indicator_panel(panel, latest_only=True, processes=2, chunk_size=3)
+
+    for name in PANEL_COLUMNS:
+        assert latest[name].shape == (10,)
+        np.testing.assert_allclose(latest[name], full[name][:, -1])
+        np.testing.assert_allclose(pooled[name], latest[name])
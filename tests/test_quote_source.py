@@ -0,0 +1,166 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.database import Base
+from app.models.alert_state import AlertState
+from app.services import alerter
+from app.services.monitor_config import parse_monitor_config
+from app.services.quote_source import PollingQuoteSource, QuoteSource, StreamingQuoteSource, parse_tick
+
+pytest.importorskip("websockets")
+from quote_feed_server import StandInFeedServer  # noqa: E402
+
+SYMBOLS = [("AAPL", None), ("TSLA", None)]
+
+
+async def _next_batch(ticks, timeout=5):
+    return await asyncio.wait_for(ticks.__anext__(), timeout)
+
+
+def test_parse_tick_ignores_non_quotes():
+    """订阅确认、心跳与格式错误的消息被忽略"""
+    assert parse_tick('{"event": "subscribed"}') is None
+    assert parse_tick('not json') is None
+    assert parse_tick('{"symbol": "AAPL", "price": "x"}') is None
+    assert parse_tick('{"symbol": "AAPL", "price": 1}')["last_price"] == 1.0
+
+
+def test_quote_source_requires_ticks():
+    """QuoteSource 是抽象基类，未实现 ticks 的子类不能实例化"""
+    class Incomplete(QuoteSource):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_silent_stream_is_unhealthy():
+    """连接仍在但长时间没有报价时视为不健康，轮询恢复兜底"""
+    source = StreamingQuoteSource("ws://unused", stale_after=60)
+    assert not source.is_healthy(now=1000)
+
+    source.connected, source.connected_at = True, 1000
+    assert source.is_healthy(now=1050)
+    assert not source.is_healthy(now=1061)
+
+    source.last_tick_at = 1100
+    assert source.is_healthy(now=1150)
+    assert not source.is_healthy(now=1200)
+
+
+def test_stream_reconnects_and_resubscribes():
+    """断线后自动重连并重新订阅，订阅集合变化时发送新的订阅"""
+    async def main():
+        server = StandInFeedServer()
+        url = await server.start()
+        symbols = list(SYMBOLS)
+        source = StreamingQuoteSource(url, reconnect_min=0.05, reconnect_max=0.1, resubscribe_interval=0.05)
+        ticks = source.ticks(lambda: symbols)
+        try:
+            first = asyncio.ensure_future(_next_batch(ticks))
+            await server.wait_for_subscribers()
+            assert source.is_healthy()
+            await server.publish("AAPL", 100.0)
+            assert (await first)["AAPL"]["last_price"] == 100.0
+
+            await server.drop_connections()
+            second = asyncio.ensure_future(_next_batch(ticks))
+            await asyncio.sleep(0.02)
+            await server.wait_for_subscribers()
+            await server.publish("TSLA", 200.0)
+            assert (await second)["TSLA"]["last_price"] == 200.0
+            assert source.connections == 2
+
+            symbols.append(("NVDA", None))
+            await asyncio.sleep(0.2)
+            assert server.subscriptions[-1] == ["AAPL", "NVDA", "TSLA"]
+        finally:
+            await ticks.aclose()
+            await server.stop()
+        assert not source.is_healthy()
+
+    asyncio.run(main())
+
+
+def test_slow_consumer_gets_latest_tick_per_symbol():
+    """消费者跟不上时，每个标的只保留最新一笔报价，内存不随积压增长"""
+    async def main():
+        server = StandInFeedServer()
+        source = StreamingQuoteSource(await server.start())
+        ticks = source.ticks(lambda: SYMBOLS)
+        try:
+            first = asyncio.ensure_future(_next_batch(ticks))
+            await server.wait_for_subscribers()
+            await server.publish("AAPL", 1.0)
+            await first
+            # 消费者暂停期间推送大量报价
+            for i in range(500):
+                await server.publish("AAPL", 100.0 + i)
+                await server.publish("TSLA", 200.0 + i)
+            await asyncio.sleep(0.2)
+            batch = await _next_batch(ticks)
+            assert {s: q["last_price"] for s, q in batch.items()} == {"AAPL": 599.0, "TSLA": 699.0}
+        finally:
+            await ticks.aclose()
+            await server.stop()
+
+    asyncio.run(main())
+
+
+def test_stream_ticks_fire_alerts_and_pause_polling(monkeypatch):
+    """推送的报价直接进入预警求值；推送源连接正常时轮询任务跳过"""
+    config = parse_monitor_config({"price_alerts": [
+        {"symbol": "AAPL", "condition": "cross_above", "target_price": 220},
+    ]})
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[AlertState.__table__])
+    sent = []
+    polls = []
+    monkeypatch.setattr(alerter, "get_monitor_config", lambda: config)
+    monkeypatch.setattr(alerter, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(alerter, "_last_metrics", {})
+    monkeypatch.setattr(alerter, "push_price_alert", lambda alert, db=None: sent.append(alert))
+    monkeypatch.setattr(alerter, "get_multiple_quotes", lambda symbols: polls.append(symbols) or {})
+
+    async def main():
+        server = StandInFeedServer()
+        source = StreamingQuoteSource(await server.start())
+        task = asyncio.create_task(alerter.run_alert_stream(source))
+        try:
+            await server.wait_for_subscribers()
+            await asyncio.to_thread(alerter.check_price_alerts)
+            await server.publish("AAPL", 215.0)
+            await asyncio.sleep(0.1)
+            await server.publish("AAPL", 225.0)
+            for _ in range(100):
+                if sent:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+            await server.stop()
+
+    asyncio.run(main())
+    assert polls == []
+    assert [alert["current_price"] for alert in sent] == [225.0]
+
+    # 推送源已停止，轮询恢复
+    alerter.check_price_alerts()
+    assert polls == [[("AAPL", None)]]
+
+
+def test_polling_source_yields_batches():
+    """轮询来源按间隔批量获取报价"""
+    calls = []
+    source = PollingQuoteSource(interval=0.01, fetch=lambda symbols: calls.append(symbols) or {"AAPL": {}})
+
+    async def main():
+        ticks = source.ticks(lambda: SYMBOLS)
+        batches = [await _next_batch(ticks) for _ in range(2)]
+        await ticks.aclose()
+        return batches
+
+    assert asyncio.run(main()) == [{"AAPL": {}}, {"AAPL": {}}]
+    assert calls == [SYMBOLS, SYMBOLS]
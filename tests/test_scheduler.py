@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import time
+from app.core.scheduler import create_scheduler, BLOCKING_EXECUTOR
+
+
+def test_blocking_job_does_not_overlap():
+    """阻塞任务执行时间超过触发间隔时，后续触发被跳过而不是并发堆积"""
+    state = {"running": 0, "max_running": 0, "runs": 0}
+    lock = threading.Lock()
+
+    def slow_job():
+        with lock:
+            state["running"] += 1
+            state["runs"] += 1
+            state["max_running"] = max(state["max_running"], state["running"])
+        time.sleep(0.5)
+        with lock:
+            state["running"] -= 1
+
+    async def main():
+        scheduler = create_scheduler(max_workers=4)
+        scheduler.add_job(slow_job, 'interval', seconds=0.1, executor=BLOCKING_EXECUTOR, id="slow")
+        scheduler.start()
+        await asyncio.sleep(1.2)
+        scheduler.shutdown(wait=False)
+
+    asyncio.run(main())
+    assert state["runs"] >= 1
+    assert state["max_running"] == 1
+
+
+def test_coroutine_job_runs_on_app_loop():
+    """协程任务直接运行在启动调度器的事件循环上"""
+    seen = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+
+        async def async_job():
+            seen.append(asyncio.get_running_loop() is loop)
+
+        scheduler = create_scheduler()
+        scheduler.add_job(async_job, 'interval', seconds=0.1, id="async")
+        scheduler.start()
+        await asyncio.sleep(0.35)
+        scheduler.shutdown(wait=False)
+
+    asyncio.run(main())
+    assert seen and all(seen)
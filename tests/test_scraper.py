@@ -0,0 +1,185 @@
+import asyncio
+from pathlib import Path
+import pytest
+from app.services import scraper
+from app.services.scraper import (
+    _parse_hot_score,
+    parse_trend_records,
+    extract_trend_records,
+    extract_trend_records_per_locator,
+    parse_trend_payload,
+    should_block_request,
+    is_trends_api_response,
+    TIMELINE_SELECTOR,
+)
+
+FIXTURE = Path(__file__).parent / "data" / "x_explore_timeline.html"
+
+
+def test_parse_hot_score_formats():
+    """测试英文与中文两种帖子数文本的解析"""
+    assert _parse_hot_score("5,123 posts") == 5123
+    assert _parse_hot_score("45.1K posts") == 45100
+    assert _parse_hot_score("1.2M posts") == 1_200_000
+    assert _parse_hot_score("18.9万 条帖子") == 189_000
+    assert _parse_hot_score("") == 0.0
+
+
+def test_parse_trend_records_filters_and_dedupes():
+    """测试批量解析：跳过空标题，按链接去重，保持原始顺序"""
+    records = [
+        {"title": " WNBA ", "post_count_text": "18.9万 条帖子", "rank": 2, "category": "美国 的趋势"},
+        {"title": "", "post_count_text": "1 posts"},
+        {"title": "WNBA", "post_count_text": "1 posts"},
+        {"title": "$RUFOUS", "post_count_text": "7,124 条帖子", "rank": 1},
+    ]
+    trends = parse_trend_records(records)
+    assert [t["title"] for t in trends] == ["WNBA", "$RUFOUS"]
+    assert trends[0]["hot_score"] == 189_000
+    assert trends[0]["url"] == "https://x.com/search?q=WNBA"
+    assert trends[0]["category"] == "美国 的趋势"
+    assert trends[1]["url"] == "https://x.com/search?q=%24RUFOUS"
+
+
+def test_parse_trend_payload_graphql_and_guide_formats():
+    """测试从 GraphQL 与 guide.json 两种接口负载中解析趋势"""
+    graphql = {"data": {"explore_page": {"body": {"timelines": [{"timeline": {"instructions": [
+        {"type": "TimelineAddEntries", "entries": [{"content": {"items": [
+            {"item": {"itemContent": {"__typename": "TimelineTrend", "name": "WNBA", "rank": "2",
+                                      "trend_metadata": {"meta_description": "18.9K posts",
+                                                         "domain_context": "Trending in United States"}}}},
+            {"item": {"itemContent": {"__typename": "TimelineTrend", "name": "$RUFOUS", "rank": "1",
+                                      "trend_metadata": {"domain_context": "Business & finance"}}}},
+        ]}}]},
+    ]}}]}}}}
+    guide = {"timeline": {"instructions": [{"addEntries": {"entries": [{"content": {"timelineModule": {"items": [
+        {"item": {"content": {"trend": {"name": "Scottie",
+                                        "trendMetadata": {"metaDescription": "21.3K posts"}}}}},
+    ]}}}]}}]}}
+
+    records = parse_trend_payload(graphql)
+    assert [(r["title"], r["post_count_text"], r["rank"]) for r in records] == [
+        ("WNBA", "18.9K posts", 2), ("$RUFOUS", "", 1)]
+    assert records[0]["category"] == "Trending in United States"
+
+    records = parse_trend_payload(guide)
+    assert [(r["title"], r["post_count_text"]) for r in records] == [("Scottie", "21.3K posts")]
+    assert parse_trend_records(records)[0]["hot_score"] == 21300
+
+
+def test_resource_blocking_and_api_matching():
+    """测试资源屏蔽规则与趋势接口识别"""
+    assert should_block_request("https://pbs.twimg.com/media/a.jpg", "image")
+    assert should_block_request("https://abs.twimg.com/fonts/a.woff2", "font")
+    assert should_block_request("https://www.google-analytics.com/collect", "xhr")
+    assert should_block_request("https://x.com/i/api/1.1/jot/client_event.json", "xhr")
+    assert not should_block_request("https://x.com/i/api/graphql/abc/ExplorePage", "xhr")
+    assert not should_block_request("https://abs.twimg.com/responsive-web/main.js", "script")
+
+    assert is_trends_api_response("https://x.com/i/api/graphql/abc/ExplorePage?variables=%7B%7D")
+    assert is_trends_api_response("https://x.com/i/api/2/guide.json?count=20")
+    assert not is_trends_api_response("https://x.com/i/api/graphql/abc/HomeTimeline")
+
+
+async def _extract_with_both(timeline_html: str):
+    playwright_api = pytest.importorskip("playwright.async_api")
+    async with playwright_api.async_playwright() as p:
+        try:
+            browser = await p.chromium.launch(headless=True)
+        except Exception as e:
+            pytest.skip(f"Chromium 不可用: {e}")
+        try:
+            page = await browser.new_page()
+            await page.set_content(timeline_html)
+            timeline = page.locator(TIMELINE_SELECTOR)
+            return {name: await extract(timeline) for name, extract in
+                    (("bulk", extract_trend_records), ("locator", extract_trend_records_per_locator))}
+        finally:
+            await browser.close()
+
+
+def test_bulk_extraction_matches_locator():
+    """单次 evaluate 提取与逐个 locator 提取的结果一致"""
+    results = asyncio.run(_extract_with_both(FIXTURE.read_text(encoding="utf-8")))
+    assert len(results["bulk"]) == 30
+    assert parse_trend_records(results["bulk"]) == parse_trend_records(results["locator"])
+
+
+def test_bulk_extraction_is_one_round_trip():
+    """无论时间线中有多少趋势，批量提取只向浏览器发出一次 evaluate_all"""
+    calls = []
+
+    class _Timeline:
+        def locator(self, selector):
+            return self
+
+        async def evaluate_all(self, script):
+            calls.append(script)
+            return [{"title": f"t{i}"} for i in range(30)]
+
+    records = asyncio.run(extract_trend_records(_Timeline()))
+    assert len(records) == 30
+    assert calls == [scraper.EXTRACT_TRENDS_JS]
+
+
+class _FakePage:
+    def is_closed(self):
+        return False
+
+    async def screenshot(self, path):
+        pass
+
+
+class _FakePool:
+    def __init__(self):
+        self.invalidated = []
+        self.submitted = []
+
+    def page(self, name):
+
+        class _Page:
+            async def __aenter__(self):
+                return _FakePage()
+
+            async def __aexit__(self, *exc):
+                return False
+        return _Page()
+
+    async def invalidate(self, name):
+        self.invalidated.append(name)
+
+    def submit(self, coro):
+        self.submitted.append(coro)
+        coro.close()
+
+
+class _FakeDb:
+    def rollback(self):
+        pass
+
+
+def test_extraction_timeout_keeps_login_session(monkeypatch):
+    """等待趋势数据超时不丢弃已登录的上下文，其他错误仍会丢弃"""
+    pool = _FakePool()
+    monkeypatch.setattr(scraper, "browser_pool", pool)
+
+    async def timeout(page):
+        raise asyncio.TimeoutError()
+    monkeypatch.setattr(scraper, "capture_trend_records", timeout)
+    asyncio.run(scraper.scrape_x_trends(_FakeDb(), "network"))
+    assert pool.invalidated == []
+
+    async def broken(page):
+        raise RuntimeError("登录页")
+    monkeypatch.setattr(scraper, "capture_trend_records", broken)
+    asyncio.run(scraper.scrape_x_trends(_FakeDb(), "network"))
+    assert pool.invalidated == ["x"]
+
+
+def test_invalid_scrape_mode_skips_browser_pool(monkeypatch):
+    """X_SCRAPE_MODE 配置错误时直接跳过，不访问浏览器池"""
+    pool = _FakePool()
+    monkeypatch.setattr(scraper, "browser_pool", pool)
+    monkeypatch.setattr(scraper.config, "X_SCRAPE_MODE", "dom")
+    asyncio.run(scraper.run_scrape_x_async())
+    assert pool.submitted == []
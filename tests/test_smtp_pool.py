@@ -0,0 +1,92 @@
+import smtplib
+import time
+import pytest
+from app.core.smtp_pool import SMTPPool
+from smtp_stand_in import StandInSMTPServer
+
+MAIL = ("from@example.com", ["to@example.com"], "Subject: hi\r\n\r\nbody\r\n")
+
+
+def _pool(server, **kwargs):
+    return SMTPPool(server.host, server.port, "user", "secret", use_tls=False, **kwargs)
+
+
+def test_reuses_one_authenticated_session():
+    """多次发送复用同一条已登录连接，只连接、登录一次"""
+    with StandInSMTPServer() as server:
+        pool = _pool(server)
+        for _ in range(5):
+            pool.send(*MAIL)
+        pool.send_many([MAIL] * 3)
+        pool.close()
+
+    assert len(server.messages) == 8
+    assert server.connections == 1
+    assert server.logins == ["user"]
+    assert pool.stats()["connects"] == 1
+
+
+def test_probes_idle_connection_and_reconnects_after_server_drop():
+    """空闲连接复用前先 NOOP 探测；服务器断开后透明重连"""
+    with StandInSMTPServer() as server:
+        pool = _pool(server, noop_after=0)
+        pool.send(*MAIL)
+        pool.send(*MAIL)
+        assert "NOOP" in server.commands
+        server.drop_connections()
+        time.sleep(0.05)
+        pool.send(*MAIL)
+        pool.close()
+
+    assert len(server.messages) == 3
+    assert server.connections == 2
+    # 探测发现连接失效，直接新建连接，没有发送失败后的重试
+    assert pool.stats()["reconnects"] == 0
+
+
+def test_reconnects_when_connection_dies_mid_batch():
+    """批量发送中途连接断开时，换新连接继续发送剩余邮件"""
+    with StandInSMTPServer() as server:
+        # 不探测，直接在已断开的连接上发送
+        pool = _pool(server, noop_after=3600)
+        pool.send(*MAIL)
+        server.drop_connections()
+        time.sleep(0.05)
+        pool.send_many([MAIL] * 3)
+        pool.close()
+
+    assert len(server.messages) == 4
+    assert pool.stats()["reconnects"] == 1
+
+
+def test_rejected_recipient_keeps_connection_reusable():
+    """收件人被拒等协议层错误直接抛出，连接重置后继续复用"""
+    with StandInSMTPServer() as server:
+        server.reject.add("bad@example.com")
+        pool = _pool(server)
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            pool.send("from@example.com", ["bad@example.com"], "Subject: x\r\n\r\nx\r\n")
+        pool.send(*MAIL)
+        pool.close()
+
+    assert server.connections == 1
+    assert len(server.messages) == 1
+
+
+def test_pool_reuses_one_connection_for_many_messages():
+    """每封邮件新建连接时每封都要连接、登录一次；连接池发送同样多的邮件只连接、登录一次"""
+    n = 30
+    with StandInSMTPServer() as server:
+        for _ in range(n):
+            with smtplib.SMTP(server.host, server.port, timeout=5) as smtp:
+                smtp.login("user", "secret")
+                smtp.sendmail(*MAIL)
+        assert (server.connections, len(server.logins)) == (n, n)
+
+        pool = _pool(server)
+        for _ in range(n):
+            pool.send(*MAIL)
+        pool.close()
+
+    assert (server.connections, len(server.logins)) == (n + 1, n + 1)
+    assert len(server.messages) == 2 * n
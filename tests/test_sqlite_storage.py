@@ -0,0 +1,76 @@
+from sqlalchemy import create_engine, insert, inspect, text
+from sqlalchemy.orm import sessionmaker
+from app.db.database import Base, configure_sqlite
+from app.db.migrations import MIGRATIONS, run_migrations, schema_version
+from app.models.item import Item, list_items
+from app.models.outbox import OutboxMessage
+
+LEGACY_SCHEMA = [
+    "CREATE TABLE items (id INTEGER PRIMARY KEY, title VARCHAR, url VARCHAR, source VARCHAR, "
+    "hot_score FLOAT, created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME)",
+    "CREATE INDEX ix_items_id ON items (id)",
+    "CREATE INDEX ix_items_title ON items (title)",
+    "CREATE INDEX ix_items_source ON items (source)",
+    "CREATE UNIQUE INDEX ix_items_url ON items (url)",
+    "CREATE TABLE outbox (id INTEGER PRIMARY KEY, idempotency_key VARCHAR UNIQUE, subject VARCHAR, content TEXT, "
+    "recipients VARCHAR, status VARCHAR, attempts INTEGER, next_attempt_at INTEGER, last_error TEXT, "
+    "created_at INTEGER, sent_at INTEGER)",
+    "INSERT INTO outbox (idempotency_key, subject, content, recipients, status, attempts, next_attempt_at, created_at) "
+    "VALUES ('k', 's', 'c', 'a@example.com', 'pending', 0, 0, 0)",
+]
+
+
+def test_migrations_upgrade_legacy_database(tmp_path):
+    """旧数据库补上 outbox.priority 列并按查询模式调整索引；重复执行无副作用"""
+    engine = configure_sqlite(create_engine(f"sqlite:///{tmp_path / 'legacy.db'}"))
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+
+    assert run_migrations(engine) == MIGRATIONS[-1][0]
+    assert run_migrations(engine) == MIGRATIONS[-1][0]
+    indexes = {index["name"] for index in inspect(engine).get_indexes("items")}
+    assert indexes == {"ix_items_url", "ix_items_created_at", "ix_items_source_created_at",
+                       "ix_items_updated_at_hot_score"}
+    with sessionmaker(bind=engine)() as db:
+        assert db.query(OutboxMessage).one().priority == 0
+    engine.dispose()
+
+
+def test_fresh_database_matches_migrated_schema(tmp_path):
+    """新建的数据库直接按模型建表，迁移在其上执行不出错；每个连接都启用 WAL 与连接参数"""
+    engine = configure_sqlite(create_engine(f"sqlite:///{tmp_path / 'fresh.db'}"))
+    Base.metadata.create_all(bind=engine, tables=[Item.__table__, OutboxMessage.__table__])
+    run_migrations(engine)
+    with engine.connect() as conn:
+        assert schema_version(conn) == MIGRATIONS[-1][0]
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+    assert "ix_items_title" not in {index["name"] for index in inspect(engine).get_indexes("items")}
+    engine.dispose()
+
+
+def _rows(start: int, stop: int) -> list:
+    return [{"title": f"t{i}", "url": f"https://example.com/{i}", "source": "X", "hot_score": 1.0}
+            for i in range(start, stop)]
+
+
+def test_reads_proceed_during_long_write_transaction(tmp_path):
+    """WAL 下长写事务未提交期间，仪表盘查询照常返回已提交的数据，不会报 database is locked"""
+    engine = configure_sqlite(create_engine(f"sqlite:///{tmp_path / 'wal.db'}",
+                                            connect_args={"check_same_thread": False}))
+    Base.metadata.create_all(bind=engine, tables=[Item.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(Item), _rows(0, 10))
+
+    with engine.connect() as writer:
+        transaction = writer.begin()
+        # 超出页缓存的大事务：回滚日志模式下写入方会提前拿到排他锁，读取被阻塞直至超时
+        writer.execute(insert(Item), _rows(10, 50010))
+        with sessionmaker(bind=engine)() as db:
+            items, _ = list_items(db, limit=50)
+        transaction.rollback()
+    engine.dispose()
+
+    assert len(items) == 10
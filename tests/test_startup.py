@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from app.core.leader import LeaderElector
+
+pytestmark = pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="需要 /proc 统计内存峰值")
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 启动内存预算：超过即视为回归
+RSS_BUDGET_MB = 120
+HEAVY_MODULES = ["pandas", "numpy", "pandas_ta", "tradingview_ta", "playwright"]
+
+BOOT_SCRIPT = """
+import json, sys
+import app.main
+loaded_on_import = [m for m in {heavy!r} if m in sys.modules]
+
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    assert client.get("/").status_code == 200
+    # VmHWM 是本进程的内存峰值；ru_maxrss 会继承父进程 (pytest) 的峰值，不能用
+    with open("/proc/self/status") as f:
+        rss_mb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+    loaded_after_boot = [m for m in {heavy!r} if m in sys.modules]
+
+print(json.dumps({{"rss_mb": rss_mb,
+                  "loaded_on_import": loaded_on_import, "loaded_after_boot": loaded_after_boot}}))
+"""
+
+
+def test_startup_skips_heavy_modules(tmp_path):
+    """导入 app.main 并完成启动（非 leader worker）时不加载重量级依赖，内存峰值在预算内"""
+    lock_path = str(tmp_path / "hotspot.db.leader")
+    # 先占住 leader 锁，使被测进程以普通 worker 身份启动，不注册定时任务
+    leader = LeaderElector(lock_path)
+    assert leader.try_acquire()
+    try:
+        env = dict(os.environ, PYTHONPATH=str(ROOT), LEADER_LOCK_PATH=lock_path)
+        output = subprocess.run(
+            [sys.executable, "-c", BOOT_SCRIPT.format(heavy=HEAVY_MODULES)],
+            cwd=tmp_path, env=env, capture_output=True, text=True, timeout=60, check=True,
+        ).stdout
+    finally:
+        leader.release()
+
+    stats = json.loads(output.strip().splitlines()[-1])
+    assert stats["loaded_on_import"] == []
+    assert stats["loaded_after_boot"] == []
+    assert stats["rss_mb"] < RSS_BUDGET_MB
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+from app.services import tradingview_fetcher
+from app.services.tradingview_fetcher import get_multiple_quotes, normalize_symbol
+
+
+def _analysis(close):
+    return SimpleNamespace(indicators={"close": close, "change": 0.5, "change_abs": 1.0})
+
+
+def test_normalize_symbol():
+    """测试标的统一为 EXCHANGE:SYMBOL 形式"""
+    assert normalize_symbol("aapl") == "NASDAQ:AAPL"
+    assert normalize_symbol("nyse:docn") == "NYSE:DOCN"
+    assert normalize_symbol("BTCUSDT", "binance") == "BINANCE:BTCUSDT"
+
+
+def test_get_multiple_quotes_one_request_per_screener(monkeypatch):
+    """同一 screener 的所有标的合并为一次请求，缺失的标的返回 None"""
+    calls = []
+
+    def fake_get_multiple_analysis(screener, interval, symbols, additional_indicators=(), timeout=None):
+        calls.append((screener, symbols))
+        prices = {"NASDAQ:AAPL": 230.0, "NASDAQ:TSLA": 160.0, "BINANCE:BTCUSDT": 60000.0}
+        return {s: _analysis(prices[s]) if s in prices else None for s in symbols}
+
+    monkeypatch.setattr(tradingview_fetcher, "get_multiple_analysis", fake_get_multiple_analysis)
+    quotes = get_multiple_quotes(["AAPL", "TSLA", "NASDAQ:MISSING", ("BINANCE:BTCUSDT", "crypto")])
+
+    assert sorted(calls) == [
+        ("america", ["NASDAQ:AAPL", "NASDAQ:MISSING", "NASDAQ:TSLA"]),
+        ("crypto", ["BINANCE:BTCUSDT"]),
+    ]
+    assert quotes["NASDAQ:AAPL"]["last_price"] == 230.0
+    assert quotes["NASDAQ:TSLA"]["last_price"] == 160.0
+    assert quotes["BINANCE:BTCUSDT"]["last_price"] == 60000.0
+    assert quotes["NASDAQ:MISSING"] is None
+
+
+def test_get_multiple_quotes_skips_non_us_symbols_without_exchange(monkeypatch):
+    """非 america screener 的标的缺少交易所前缀时不请求，避免被补成 NASDAQ 代码"""
+    calls = []
+
+    def fake_get_multiple_analysis(screener, interval, symbols, additional_indicators=(), timeout=None):
+        calls.append((screener, symbols))
+        return {s: _analysis(1.0) for s in symbols}
+
+    monkeypatch.setattr(tradingview_fetcher, "get_multiple_analysis", fake_get_multiple_analysis)
+    quotes = get_multiple_quotes([("BTCUSDT", "crypto"), ("FX:EURUSD", "forex")])
+
+    assert calls == [("forex", ["FX:EURUSD"])]
+    assert list(quotes) == ["FX:EURUSD"]
+
+
+def test_get_multiple_quotes_same_ticker_on_different_exchanges(monkeypatch):
+    """不同交易所的同名标的分别返回报价，不互相覆盖"""
+    prices = {"NASDAQ:ABC": 10.0, "NYSE:ABC": 20.0}
+    monkeypatch.setattr(tradingview_fetcher, "get_multiple_analysis",
+                        lambda screener, interval, symbols, additional_indicators=(), timeout=None: {s: _analysis(prices[s]) for s in symbols})
+    quotes = get_multiple_quotes(["ABC", "nyse:abc", "NASDAQ:ABC"])
+
+    assert {symbol: quote["last_price"] for symbol, quote in quotes.items()} == prices
+
+
+def test_index_lookup_passes_request_timeout(monkeypatch):
+    """指数请求带单次超时，挂起的请求不会永久占用线程与并发名额"""
+    handlers = []
+
+    class FakeHandler:
+        def __init__(self, **kwargs):
+            self.kwargs = kwargs
+            handlers.append(self)
+
+        def add_indicators(self, indicators):
+            self.extra = indicators
+
+        def get_analysis(self):
+            return SimpleNamespace(indicators={"close": 5000.0, "change": 1.0, "change_abs": 50.0})
+
+    monkeypatch.setattr(tradingview_fetcher, "TA_Handler", FakeHandler)
+    data = tradingview_fetcher.get_index_data("TIMEOUT_TEST", "america", "TVC", timeout=3)
+
+    assert handlers[0].kwargs["timeout"] == 3
+    assert data == {"symbol": "TIMEOUT_TEST", "close": 5000.0, "change": 50.0, "percent_change": 1.0}
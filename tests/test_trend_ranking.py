@@ -0,0 +1,83 @@
+import pytest
+from app.models.item import Item
+from app.models.trend import TrendStat
+from app.services.trend_ranking import Momentum, TrendRanker, advance, rising_items
+from app.services.trend_store import get_series, record_scrape
+
+HOUR = 3600
+
+
+def test_velocity_and_acceleration_follow_the_rate_of_change():
+    """恒定增长时速度收敛到增长率、加速度趋近 0；增长加快时加速度为正"""
+    state = None
+    for hour in range(20):
+        state = advance(state, hour * HOUR, 1000 * hour, half_life=HOUR)
+    assert state.velocity == pytest.approx(1000, rel=1e-3)
+    assert abs(state.acceleration) < 1
+
+    state = advance(state, 20 * HOUR, state.hot_score + 5000, half_life=HOUR)
+    assert state.velocity > 1000 and state.acceleration > 0
+    # 同一时间点的重复抓取不改变状态
+    assert advance(state, 20 * HOUR, 0, half_life=HOUR) is state
+
+
+def test_breaking_trend_outranks_evergreen(db_session):
+    """累计热度小但增长快的话题排在累计热度巨大但增长平稳的话题之前；排行写入数据库供其他进程读取"""
+    db_session.add_all([Item(id=1, title="常青", url="u1", source="X 趋势", hot_score=1_000_000),
+                        Item(id=2, title="爆发", url="u2", source="X 趋势", hot_score=5_000),
+                        Item(id=3, title="消失", url="u3", source="X 趋势", hot_score=9_000)])
+    db_session.commit()
+    ranker = TrendRanker(k=2, half_life=HOUR, max_age=3 * HOUR)
+    ranker.observe(db_session, {1: 1_000_000, 2: 5_000, 3: 9_000}, scraped_at=0)
+    for hour in range(1, 5):
+        scores = {1: 1_000_000 + 1_000 * hour, 2: 5_000 + 20_000 * hour}
+        top = ranker.observe(db_session, scores, scraped_at=hour * HOUR)
+    db_session.commit()
+
+    assert [item_id for item_id, _ in top] == [2, 1]
+    rising = rising_items(db_session, limit=10, now=4 * HOUR)
+    assert [(item.title, round(stat.velocity)) for item, stat in rising] == \
+        [("爆发", round(top[0][1].velocity)), ("常青", round(top[1][1].velocity))]
+    # 超过 max_age 未出现的条目已从内存与数据库中移除
+    assert db_session.get(TrendStat, 3) is None
+
+    # 新进程从数据库恢复状态，继续增量计算
+    restored = TrendRanker(k=2, half_life=HOUR, max_age=3 * HOUR)
+    top = restored.observe(db_session, {2: 5_000 + 20_000 * 5}, scraped_at=5 * HOUR)
+    assert top[0] == (2, advance(ranker._states[2], 5 * HOUR, 105_000, HOUR))
+
+
+def test_missing_counts_are_not_observations(db_session):
+    """帖子数时有时无的条目：缺失的抓取不写入序列、不重置动量，恢复显示后不会产生虚假的暴涨"""
+    db_session.add(Item(id=1, title="时有时无", url="u1", source="X 趋势", hot_score=1_000_000))
+    db_session.commit()
+    ranker = TrendRanker(k=5, half_life=HOUR, max_age=10 * HOUR)
+    for hour, count in enumerate([1_000_000, 0, None, 1_003_000]):
+        scores = record_scrape(db_session, [{"url": "u1", "hot_score": count}], scraped_at=hour * HOUR)
+        top = ranker.observe(db_session, scores, scraped_at=hour * HOUR)
+        if not count:
+            assert scores == {}
+            assert top[0][1].hot_score == 1_000_000
+    db_session.commit()
+
+    assert [score for _, score, _ in get_series(db_session, 1)] == [1_000_000, 1_003_000]
+    expected = advance(advance(None, 0, 1_000_000, HOUR), 3 * HOUR, 1_003_000, HOUR)
+    assert top == [(1, expected)]
+    assert expected.velocity < 1_000
+    # 直接传入的 0 分同样被忽略
+    assert ranker.observe(db_session, {1: 0}, scraped_at=4 * HOUR) == [(1, expected)]
+
+
+def test_observe_ranks_a_large_scrape(db_session):
+    """每次抓取 2000 个条目时排行只保留前 K 名，按动量从高到低排列"""
+    db_session.add_all(Item(id=i, title=f"t{i}", url=f"u{i}", source="X 趋势") for i in range(2000))
+    db_session.commit()
+    ranker = TrendRanker(k=20, half_life=HOUR, max_age=3 * HOUR)
+    for scrape in range(5):
+        ranker.observe(db_session, {i: i * scrape * 10 for i in range(2000)}, scraped_at=scrape * 600)
+        db_session.commit()
+
+    top = ranker.top(now=2400)
+    assert len(top) == 20
+    assert [item_id for item_id, _ in top[:3]] == [1999, 1998, 1997]
+    assert isinstance(top[0][1], Momentum)
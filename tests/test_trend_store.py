@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import insert, text
+from app.models.item import Item
+from app.models.trend import TrendPoint, RAW, HOURLY, DAILY
+from app.services import trend_store
+from app.services.trend_store import get_series, record_scrape, rollup
+
+DAY = 86400
+
+
+@pytest.fixture(autouse=True)
+def retention(monkeypatch):
+    """保留期固定为 2 天原始点 / 30 天小时点 / 365 天日点"""
+    monkeypatch.setattr(trend_store.config, "TREND_RAW_RETENTION", 2 * DAY)
+    monkeypatch.setattr(trend_store.config, "TREND_HOURLY_RETENTION", 30 * DAY)
+    monkeypatch.setattr(trend_store.config, "TREND_DAILY_RETENTION", 365 * DAY)
+
+
+def _records(n, score):
+    return [{"title": f"t{i}", "url": f"https://x.com/search?q=t{i}", "source": "X 趋势", "hot_score": score}
+            for i in range(n)]
+
+
+def _seed(db, n):
+    db.add_all(Item(**record) for record in _records(n, 0))
+    db.flush()
+
+
+def test_rollup_downsamples_and_enforces_retention(db_session):
+    """原始点逐级汇总为小时点、日点，每个区间取最后一次抓取的值；超出保留期的数据被删除"""
+    _seed(db_session, 1)
+    item_id = db_session.query(Item.id).scalar()
+    # 400 天内每 20 分钟抓取一次，热度随时间递增
+    now = 400 * DAY
+    record_scrape(db_session, [{"url": "https://x.com/search?q=t0", "hot_score": 0}], scraped_at=0)
+    db_session.execute(insert(TrendPoint), [{"item_id": item_id, "ts": ts, "resolution": RAW, "hot_score": ts // 1200}
+                                            for ts in range(1200, now, 1200)])
+    db_session.commit()
+
+    rollup(db_session, now=now)
+    series = get_series(db_session, item_id)
+    resolutions = [resolution for _, _, resolution in series]
+    assert resolutions == sorted(resolutions, reverse=True)  # 越早的数据粒度越粗
+    assert series[0][0] == now - 365 * DAY
+    assert resolutions.count(DAILY) == 335
+    assert resolutions.count(HOURLY) == 28 * 24
+    assert resolutions.count(RAW) == 2 * 24 * 3
+    # 日点取当天最后一次抓取（23:40）的热度
+    day_start = series[0][0]
+    assert series[0][1] == (day_start + DAY - 1200) // 1200
+
+    # 再次汇总不会改变结果
+    rollup(db_session, now=now)
+    assert get_series(db_session, item_id) == series
+
+    window = get_series(db_session, item_id, start=now - DAY, end=now)
+    assert len(window) == 24 * 3 and all(resolution == RAW for _, _, resolution in window)
+
+
+def test_series_query_is_one_primary_key_range_scan(db_session):
+    """按条目取序列走主键范围扫描，不需要额外索引或排序"""
+    plan = " ".join(row[-1] for row in db_session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT ts, hot_score, resolution FROM trend_points "
+        "WHERE item_id = 1 AND ts >= 0 AND ts <= 100 ORDER BY ts")))
+    assert "USING PRIMARY KEY" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_storage_stays_small_after_a_year(db_session):
+    """50 个条目按小时抓取一年，汇总后热度序列的点数只取决于保留期，不随抓取次数增长"""
+    _seed(db_session, 50)
+    item_ids = [item_id for item_id, in db_session.query(Item.id)]
+    now = 365 * DAY
+    for day in range(0, now, DAY):
+        db_session.execute(insert(TrendPoint), [{"item_id": item_id, "ts": ts, "resolution": RAW, "hot_score": 12345}
+                                                for ts in range(day, day + DAY, 3600) for item_id in item_ids])
+        if day % (30 * DAY) == 0:
+            rollup(db_session, now=day + DAY)
+    rollup(db_session, now=now)
+    assert db_session.query(TrendPoint).count() == 50 * (335 + 28 * 24 + 2 * 24)